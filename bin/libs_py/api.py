@@ -1,14 +1,28 @@
 import os
-from typing import Optional, Dict, Any
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+import functools
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List, Set, Tuple, Union
 from pathlib import Path
 from datetime import date
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Form
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response, Form
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import uvicorn
-from model import AnalyzeDocs, ReadDocs
+from model import AnalyzeDocs, ReadDocs, FlashCard
+from jobs import Job, JobStore
+from cache import ResponseCache
+from card_store import CardStore, EXPORTS
+from chunking import split_sections, section_hash
+from language import document_language, resolve_target, DEFAULT_OCR_LANGUAGES
+from metrics import REGISTRY, HTTP_REQUEST_SECONDS, POOL_PENDING
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -45,7 +59,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 class Config:
+    HOST = os.getenv("HOST", "127.0.0.1")
+    PORT = int(os.getenv("PORT", 8000))
+    # Server processes started by `python api.py`. Each one has its own thread and OCR pools
+    # and its share of the Groq limits; caches, cards and jobs are shared through SQLite files.
+    WORKERS = int(os.getenv("WORKERS", 1))
     MAX_FILE_SIZE = 100 * 1024 * 1024  # 100 MB
+    UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+    # Add a Server-Timing header with per-stage durations to /upload/ responses.
+    TIMING_HEADERS = os.getenv("TIMING_HEADERS", "0") == "1"
+    # Processes OCR'ing pages, shared by every document being read in a server process.
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", max(1, (os.cpu_count() or 1) // WORKERS)))
+    # Documents read concurrently; their pages interleave on the OCR workers.
+    OCR_DOCUMENTS = int(os.getenv("OCR_DOCUMENTS", 2))
+    LLM_WORKERS = int(os.getenv("LLM_WORKERS", 8))
+    # Jobs allowed to wait or run in each pool before new uploads are rejected with 503.
+    OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", 2 * OCR_WORKERS))
+    LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", 2 * LLM_WORKERS))
+    # "groq", "openai" for an OpenAI-compatible server at LLM_BASE_URL (e.g. llama.cpp or
+    # vLLM on a local machine) or "fake" for deterministic offline answers; see backends.py.
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+    LLM_MODEL = os.getenv("LLM_MODEL", "mixtral-8x7b-32768")
+    # Models for single stages, e.g. "categorize=llama-3.1-8b-instant,summarize=llama-3.1-8b-instant";
+    # the stages are listed in model.STAGES.
+    STAGE_MODELS = dict(item.strip().split("=", 1) for item in os.getenv("STAGE_MODELS", "").split(",") if item.strip())
+    # Concurrent LLM requests shared by all uploads.
+    GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", 8))
+    # The account's Groq limits, split evenly between the server processes; 0 disables the
+    # corresponding limiter.
+    GROQ_RPM = int(os.getenv("GROQ_RPM", 30))
+    GROQ_TPM = int(os.getenv("GROQ_TPM", 0))
+    # One structured request per chunk instead of separate category/summary/concepts/cards calls.
+    FUSED_GENERATION = os.getenv("FUSED_GENERATION", "0") == "1"
+    # "json_schema", "json_object" or "none", depending on what the model supports.
+    STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "json_schema")
+    # Background jobs started through /jobs/ and how long finished ones are kept.
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+    JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 4 * JOB_WORKERS))
+    JOB_TTL = int(os.getenv("JOB_TTL", 3600))
+    # Unfinished jobs that report no progress for this long are failed, e.g. after their worker crashed.
+    JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", 900))
+    # Job state shared by the server processes; an empty string keeps jobs in memory, which
+    # only works with a single worker.
+    JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "../store/jobs.sqlite3")
+    # Set LLM_CACHE_PATH to an empty string to always call Groq.
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "../cache/llm_responses.sqlite3")
+    LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", 200))
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 30 * 24 * 3600))
+    # OCR output per page; set OCR_CACHE_PATH to an empty string to disable.
+    OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "../cache/ocr_pages.sqlite3")
+    OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", 500))
+    OCR_CACHE_TTL = int(os.getenv("OCR_CACHE_TTL", 90 * 24 * 3600))
+    # Scan preprocessing preset: "fast", "balanced", "accurate" or "legacy" (see ocr_preprocess.py).
+    OCR_PRESET = os.getenv("OCR_PRESET", "legacy")
+    # Languages of scanned documents, e.g. "english,italian"; each document's language is
+    # detected among those whose Tesseract pack is installed, the first being the fallback.
+    OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", ",".join(DEFAULT_OCR_LANGUAGES)).split(",")
+    # Every generated deck is kept here; set CARD_STORE_PATH to an empty string to disable.
+    CARD_STORE_PATH = os.getenv("CARD_STORE_PATH", "../store/cards.sqlite3")
+    CARDS_PAGE_SIZE = int(os.getenv("CARDS_PAGE_SIZE", 50))
+    CARDS_MAX_PAGE_SIZE = int(os.getenv("CARDS_MAX_PAGE_SIZE", 500))
+    # Similarity above which cards count as near-duplicates, within a deck and against the
+    # card store; 0 disables deduplication.
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.6))
+    # Reuse the cards of unchanged sections when a document with the same name is uploaded again.
+    INCREMENTAL_REGENERATION = os.getenv("INCREMENTAL_REGENERATION", "1") == "1"
+    # Check every deck locally and regenerate the cards that fail (see quality.py).
+    QUALITY_CHECK = os.getenv("QUALITY_CHECK", "1") == "1"
+    # Largest card count a request may ask for; "auto" budgets stay within quality.MAX_AUTO_CARDS.
+    MAX_FLASHCARDS = int(os.getenv("MAX_FLASHCARDS", 100))
+
+
+class WorkerPool:
+    """An executor with a cap on the number of jobs it accepts at once."""
+
+    def __init__(self, name: str, executor: Executor, max_pending: int):
+        self.name = name
+        self.executor = executor
+        self.max_pending = max_pending
+        self.pending = 0
+        # Jobs are released from the executor's threads, as they finish.
+        self._lock = threading.Lock()
+        POOL_PENDING.set_function(lambda: self.pending, pool=name)
+
+    def submit(self, func: Callable, *args, **kwargs) -> asyncio.Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                logger.warning(f"{self.name} queue full ({self.pending} jobs), rejecting request")
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy, please try again later",
+                    headers={"Retry-After": "5"},
+                )
+            self.pending += 1
+        # The slot is released when the work itself is done (or cancelled before it started),
+        # not when the request awaiting it goes away: a thread that is still running counts.
+        try:
+            future = self.executor.submit(functools.partial(func, *args, **kwargs))
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        return await self.submit(func, *args, **kwargs)
+
+    def _release(self, future: Optional[Future]):
+        with self._lock:
+            self.pending -= 1
+
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template rather than raw path so job ids don't explode cardinality.
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, path=path, status=status)
+
 
 @app.middleware("http")
 async def file_size_middleware(request: Request, call_next):
@@ -64,8 +202,68 @@ class User(BaseModel):
     password: str
 
 
-analyze_docs = AnalyzeDocs()
-read_docs = ReadDocs()
+def per_worker(limit: int) -> int:
+    """Split an account-wide rate limit between the server processes."""
+    return max(1, limit // Config.WORKERS) if limit else 0
+
+
+if Config.WORKERS > 1 and not Config.JOB_STORE_PATH:
+    raise ValueError("JOB_STORE_PATH must be set when running more than one worker")
+if Config.WORKERS > 1:
+    # /metrics is answered by whichever worker gets the request, from its own counters.
+    REGISTRY.labels["worker"] = str(os.getpid())
+
+llm_cache = None
+if Config.LLM_CACHE_PATH:
+    llm_cache = ResponseCache(Config.LLM_CACHE_PATH, Config.LLM_CACHE_MAX_MB * 1024 * 1024, Config.LLM_CACHE_TTL)
+analyze_docs = AnalyzeDocs(
+    model=Config.LLM_MODEL,
+    backend=Config.LLM_BACKEND,
+    stage_models=Config.STAGE_MODELS,
+    max_workers=Config.GROQ_CONCURRENCY,
+    cache=llm_cache,
+    requests_per_minute=per_worker(Config.GROQ_RPM),
+    tokens_per_minute=per_worker(Config.GROQ_TPM),
+    fused=Config.FUSED_GENERATION,
+    structured_output=None if Config.STRUCTURED_OUTPUT == "none" else Config.STRUCTURED_OUTPUT,
+    dedup_threshold=Config.DEDUP_THRESHOLD or None,
+    quality_check=Config.QUALITY_CHECK,
+)
+ocr_cache = None
+if Config.OCR_CACHE_PATH:
+    ocr_cache = ResponseCache(Config.OCR_CACHE_PATH, Config.OCR_CACHE_MAX_MB * 1024 * 1024, Config.OCR_CACHE_TTL,
+                              name="ocr")
+read_docs = ReadDocs(max_workers=Config.OCR_WORKERS, ocr_cache=ocr_cache, ocr_preset=Config.OCR_PRESET,
+                     ocr_languages=Config.OCR_LANGUAGES)
+card_store = CardStore(Config.CARD_STORE_PATH) if Config.CARD_STORE_PATH else None
+os.makedirs(read_docs.data_dir, exist_ok=True)
+
+# ReadDocs OCRs pages in its own process pool, so documents only need a thread to drive
+# it. LLM calls are network bound and only need threads too. Plain text files are cheap
+# to read and go to the LLM thread pool.
+ocr_pool = WorkerPool("OCR", ThreadPoolExecutor(max_workers=Config.OCR_DOCUMENTS), Config.OCR_QUEUE_SIZE)
+llm_pool = WorkerPool("LLM", ThreadPoolExecutor(max_workers=Config.LLM_WORKERS), Config.LLM_QUEUE_SIZE)
+# Jobs run the whole pipeline in one thread so progress callbacks can reach the job.
+job_pool = WorkerPool("Job", ThreadPoolExecutor(max_workers=Config.JOB_WORKERS), Config.JOB_QUEUE_SIZE)
+job_store = JobStore(ttl=Config.JOB_TTL, path=Config.JOB_STORE_PATH or None, stale_after=Config.JOB_STALE_AFTER)
+# Jobs left behind by workers that crashed are failed now rather than on the next job.
+job_store.purge()
+# Jobs of this process not yet finished, failed on shutdown so their clients are not left waiting.
+active_jobs: Set[str] = set()
+
+
+@app.on_event("shutdown")
+def shutdown_pools():
+    ocr_pool.executor.shutdown(wait=False, cancel_futures=True)
+    llm_pool.executor.shutdown(wait=False, cancel_futures=True)
+    job_pool.executor.shutdown(wait=False, cancel_futures=True)
+    # Queued jobs were just cancelled and running ones die with the process.
+    job_store.fail_unfinished("Server shut down", job_ids=list(active_jobs))
+    read_docs.close()
+    job_store.close()
+    if card_store is not None:
+        card_store.close()
+
 
 @app.post("/login")
 async def login(user: User):
@@ -91,29 +289,105 @@ async def register(user: User):
         raise HTTPException(status_code=500, detail="Internal server error")
     
 
+async def save_upload(document: UploadFile) -> str:
+    """Stream an upload into a uniquely named file in the input directory, one chunk at a time.
+
+    Args:
+        document (UploadFile): The uploaded file.
+
+    Returns:
+        str: The name of the saved file inside `read_docs.data_dir`.
+    """
+    suffix = Path(document.filename or "").suffix
+    fd, path = tempfile.mkstemp(dir=read_docs.data_dir, prefix="upload_", suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await document.read(Config.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                # Content-Length is checked by the middleware, but it can be missing or wrong.
+                if size > Config.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large. Maximum size is {Config.MAX_FILE_SIZE // (1024 * 1024)} MB"
+                    )
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return os.path.basename(path)
+
+
+def remove_upload(file_name: str):
+    try:
+        os.remove(os.path.join(read_docs.data_dir, file_name))
+    except FileNotFoundError:
+        pass
+
+
+def parse_num_flashcards(value: str) -> Union[int, str]:
+    """Accept a card count or "auto", which sizes the deck from the document."""
+    if value.strip().lower() == "auto":
+        return "auto"
+    try:
+        num_flashcards = int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="num_flashcards must be a number or 'auto'")
+    if not 1 <= num_flashcards <= Config.MAX_FLASHCARDS:
+        raise HTTPException(status_code=400,
+                            detail=f"num_flashcards must be between 1 and {Config.MAX_FLASHCARDS}")
+    return num_flashcards
+
+
 @app.post("/upload/")
-async def upload_file(document: UploadFile = File(...), language: str = Form(...), num_flashcards: int = Form(...)) -> Dict[str, Any]:
+async def upload_file(response: Response, document: UploadFile = File(...), language: str = Form(...),
+                      num_flashcards: str = Form(...), use_cache: bool = Form(True)) -> Dict[str, Any]:
     try:
+        start = time.perf_counter()
         logger.info(f"Received file: {document.filename}, Language: {language}, Num Flashcards: {num_flashcards}")
+        num_flashcards = parse_num_flashcards(num_flashcards)
 
         if document.content_type not in ["application/pdf", "text/plain"]:
             raise HTTPException(status_code=400, detail="Invalid file type. Only PDF and text files are allowed.")
 
-        file_content = await document.read()
-        with open(f"input/{document.filename}", "wb") as f:
-            f.write(file_content)
+        file_name = await save_upload(document)
+        logger.info(f"File saved: {document.filename} as {file_name}")
 
-        logger.info(f"File saved: {document.filename}")
+        try:
+            file_type = "pdf" if document.content_type == "application/pdf" else "text"
+            read_pool = ocr_pool if file_type == "pdf" else llm_pool
+            pages = await read_pool.run(read_docs.read_document_pages, file_type, file_name)
+        finally:
+            remove_upload(file_name)
+        read_done = time.perf_counter()
+        text = "\n".join(page.text for page in pages)
+        source_language = document_language(pages)
+        language = resolve_target(language, source_language)
+        logger.info(f"Text extracted from {document.filename}: {len(pages)} pages, {len(text)} characters, "
+                    f"language {source_language}")
+        # Documents can be confidential: the log gets a fingerprint, never the text.
+        logger.debug(f"Text extracted from {document.filename}: {len(text)} characters, "
+                     f"sha256 {hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}")
+        json_flashcards, deck = await llm_pool.run(
+            generate_and_store, text, num_flashcards, language, document.filename, source_language=source_language,
+            use_cache=use_cache
+        )
+        logger.info(f"Generated {len(json_flashcards)} flashcards for {document.filename}")
+        if Config.TIMING_HEADERS:
+            end = time.perf_counter()
+            response.headers["Server-Timing"] = (
+                f"read;dur={(read_done - start) * 1000:.1f}, "
+                f"generate;dur={(end - read_done) * 1000:.1f}, "
+                f"total;dur={(end - start) * 1000:.1f}"
+            )
 
-        file_type = "pdf" if document.content_type == "application/pdf" else "text"
-        text = read_docs.read_document(file_type, document.filename)
-        logging.info(f"Text extracted from {document.filename}:\n{text}")
-        generated_flashcards = analyze_docs.generate_flashcards(text, num_flashcards, language)
-        json_flashcards = analyze_docs.flashcards_to_json(generated_flashcards)
-        logger.info(f"Generated flashcards: {json_flashcards}")
-        os.remove(f"input/{document.filename}")
-
-        return {"flashcards": json_flashcards}
+        return {
+            "flashcards": json_flashcards,
+            "deck": deck,
+            "language": language,
+            "source_language": source_language,
+            "pages": [{"page": page.page, "method": page.method, "language": page.language} for page in pages],
+        }
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -121,6 +395,206 @@ async def upload_file(document: UploadFile = File(...), language: str = Form(...
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def generate_and_store(text: str, num_flashcards: Union[int, str], language: str, source: str,
+                       on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       source_language: Optional[str] = None,
+                       use_cache: bool = True) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Generate the cards of a document and save them as a new deck in the card store.
+
+    If the latest deck generated from `source` in this language is a previous version of the
+    document asked for the same number of cards, the cards of its unchanged sections are
+    reused; `use_cache` False regenerates the whole deck instead. New cards that repeat a stored
+    card in the same language are flagged with 'duplicate_of'. Cards for a document already
+    in the target language (`source_language`) are written in it directly, without translation.
+    With `use_cache` False every LLM request also goes to the model instead of the response cache.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]]: The cards and the deck id (None without a store).
+    """
+    previous = {}
+    if card_store is not None and Config.INCREMENTAL_REGENERATION and use_cache:
+        revision_of = card_store.latest_deck(source, language.lower())
+        if revision_of is not None and card_store.requested_cards(revision_of) == str(num_flashcards):
+            for section, stored in card_store.deck_sections(revision_of).items():
+                previous[section] = [FlashCard(card["prompt"], card["answer"], card["category"], card["difficulty"],
+                                               section) for card in stored]
+    cards = analyze_docs.flashcards_to_json(
+        analyze_docs.generate_flashcards(text, num_flashcards, language=language, on_progress=on_progress,
+                                         previous=previous, source_language=source_language, use_cache=use_cache)
+    )
+    deck = None
+    if card_store is not None and cards:
+        if Config.DEDUP_THRESHOLD:
+            reused = {card.prompt for stored in previous.values() for card in stored}
+            matches = card_store.find_duplicates(cards, Config.DEDUP_THRESHOLD, language=language.lower())
+            for card, match in zip(cards, matches):
+                if match is not None and card["prompt"] not in reused:
+                    card["duplicate_of"] = match
+        sections = [section_hash(section) for section in split_sections(text) or [text]]
+        deck = card_store.add_cards(cards, source=source, language=language.lower(), sections=sections,
+                                    num_cards=num_flashcards)
+    return cards, deck
+
+
+def run_job(job: Job, file_type: str, file_name: str, language: str, num_flashcards: Union[int, str],
+            use_cache: bool = True):
+    try:
+        pages = read_docs.read_document_pages(file_type, file_name, on_progress=job.report)
+        text = "\n".join(page.text for page in pages)
+        source_language = document_language(pages)
+        language = resolve_target(language, source_language)
+        job.report({
+            "stage": "read",
+            "chars": len(text),
+            "methods": [{"page": page.page, "method": page.method} for page in pages],
+        })
+        job.report({"stage": "language", "source": source_language, "language": language})
+        cards, deck = generate_and_store(text, num_flashcards, language, job.filename, on_progress=job.report,
+                                         source_language=source_language, use_cache=use_cache)
+        job.finish(cards, deck)
+        logger.info(f"Job {job.id} finished with {len(job.cards)} flashcards")
+    except Exception as e:
+        logger.error(f"Job {job.id} error: {str(e)}")
+        job.fail("Internal server error")
+    finally:
+        active_jobs.discard(job.id)
+        remove_upload(file_name)
+
+
+@app.post("/jobs/", status_code=202)
+async def create_job(document: UploadFile = File(...), language: str = Form(...), num_flashcards: str = Form(...),
+                     use_cache: bool = Form(True)) -> Dict[str, Any]:
+    """Start generating flash cards in the background and return the job id right away."""
+    try:
+        logger.info(f"New job for file: {document.filename}, Language: {language}, Num Flashcards: {num_flashcards}")
+        num_flashcards = parse_num_flashcards(num_flashcards)
+
+        if document.content_type not in ["application/pdf", "text/plain"]:
+            raise HTTPException(status_code=400, detail="Invalid file type. Only PDF and text files are allowed.")
+
+        file_name = await save_upload(document)
+        job = job_store.create(document.filename)
+
+        file_type = "pdf" if document.content_type == "application/pdf" else "text"
+        active_jobs.add(job.id)
+        try:
+            job_pool.submit(run_job, job, file_type, file_name, language, num_flashcards, use_cache)
+        except HTTPException:
+            active_jobs.discard(job.id)
+            remove_upload(file_name)
+            job.fail("Server is busy")
+            raise
+        return {"job_id": job.id, "status": job.status}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Job creation error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """Return the status, latest progress event and the cards generated so far."""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_json()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Stream the job's progress events, including each card, as server-sent events."""
+    # The job store is SQLite, possibly waiting on another process's write; keep it off the event loop.
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        index = 0
+        last_event = time.monotonic()
+        while True:
+            events, finished = await run_in_threadpool(job.events_since, index)
+            for event in events:
+                yield f"data: {json.dumps(event)}\n\n"
+            index += len(events)
+            if finished:
+                break
+            if events:
+                last_event = time.monotonic()
+            elif time.monotonic() - last_event > Config.JOB_STALE_AFTER:
+                # Nothing has reported progress for the job in a long time: fail it and send the
+                # final events rather than waiting forever.
+                await run_in_threadpool(job_store.fail_unfinished, "Job stopped responding", job_ids=[job_id])
+                events, _ = await run_in_threadpool(job.events_since, index)
+                for event in events:
+                    yield f"data: {json.dumps(event)}\n\n"
+                break
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/cache/stats")
+async def cache_stats() -> Dict[str, Any]:
+    stats = {}
+    for name, cache in (("llm", llm_cache), ("ocr", ocr_cache)):
+        stats[name] = {"enabled": False} if cache is None else {"enabled": True, **cache.stats()}
+    return stats
+
+
+def card_filters(deck: Optional[str], source: Optional[str], language: Optional[str], category: Optional[str],
+                 difficulty: Optional[str]) -> Dict[str, Optional[str]]:
+    if card_store is None:
+        raise HTTPException(status_code=404, detail="Card store is disabled")
+    return {"deck": deck, "source": source, "language": language, "category": category, "difficulty": difficulty}
+
+
+@app.get("/cards")
+async def list_cards(deck: Optional[str] = None, source: Optional[str] = None, language: Optional[str] = None,
+                     category: Optional[str] = None, difficulty: Optional[str] = None, after: int = 0,
+                     limit: int = Config.CARDS_PAGE_SIZE) -> Dict[str, Any]:
+    """Return a page of stored cards. Pass the returned `next` as `after` to get the following page."""
+    filters = card_filters(deck, source, language, category, difficulty)
+    limit = max(1, min(limit, Config.CARDS_MAX_PAGE_SIZE))
+    cards = await asyncio.to_thread(card_store.query, after, limit, **filters)
+    page = {"cards": cards, "next": cards[-1]["id"] if len(cards) == limit else None}
+    if after == 0:
+        # Only counted for the first page; later pages don't need it again.
+        page["total"] = await asyncio.to_thread(card_store.count, **filters)
+    return page
+
+
+@app.get("/cards/export")
+async def export_cards(format: str = "json", deck: Optional[str] = None, source: Optional[str] = None,
+                       language: Optional[str] = None, category: Optional[str] = None,
+                       difficulty: Optional[str] = None):
+    """Stream the matching cards as JSON, CSV or an Anki text import file."""
+    filters = card_filters(deck, source, language, category, difficulty)
+    if format not in EXPORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown format. Use one of: {', '.join(EXPORTS)}")
+    exporter, media_type, extension = EXPORTS[format]
+    # A sync generator, so Starlette reads the store from its thread pool.
+    return StreamingResponse(
+        exporter(card_store.iter_cards(**filters)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="flashcards.{extension}"'},
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage and request latencies, LLM usage, caches and queue depths.
+
+    Each server process keeps its own metrics and answers for itself only; with WORKERS > 1
+    every sample carries a `worker` label, so sum over it rather than reading one scrape.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/download")
 async def download_file(file_name: str):
     try:
@@ -135,4 +609,8 @@ async def download_file(file_name: str):
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    import uvicorn
+
+    # Several workers need the app as an import string so each process can load it.
+    uvicorn.run("api:app" if Config.WORKERS > 1 else app, host=Config.HOST, port=Config.PORT,
+                workers=Config.WORKERS)
\ No newline at end of file
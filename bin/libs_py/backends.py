@@ -0,0 +1,97 @@
+import os
+import functools
+from types import SimpleNamespace
+from typing import List, Dict, Optional
+
+# "groq" is the hosted Groq API, "openai" any server speaking the OpenAI chat completions API
+# (llama.cpp's llama-server, vLLM, Ollama, ...), "fake" fake_groq.FakeGroq, which answers
+# instantly and deterministically without network access.
+BACKENDS = ("groq", "openai", "fake")
+
+
+class BackendError(Exception):
+    """An error response from an OpenAI-compatible server."""
+
+    def __init__(self, message: str, response=None):
+        super().__init__(message)
+        # Kept for RateLimitedClient, which reads Retry-After from it.
+        self.response = response
+
+
+class BackendRateLimitError(BackendError):
+    pass
+
+
+class BackendServerError(BackendError):
+    pass
+
+
+class OpenAICompatibleClient:
+    """Chat completions from a server implementing the OpenAI HTTP API.
+
+    Offers the same `chat.completions.create` call as the Groq client, so RateLimitedClient
+    drives either one: 429 responses raise BackendRateLimitError and 5xx responses raise
+    BackendServerError, which it retries.
+    """
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, timeout: float = 300.0):
+        import httpx
+
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        # Local models on CPU can take minutes on a long prompt; the timeout is generous.
+        self._http = httpx.Client(base_url=base_url, headers=headers, timeout=timeout)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.7, **kwargs):
+        response = self._http.post("chat/completions", json={"model": model, "messages": messages,
+                                                             "temperature": temperature, **kwargs})
+        if response.status_code == 429:
+            raise BackendRateLimitError(f"Rate limit reached: {response.text[:200]}", response)
+        if response.status_code >= 500:
+            raise BackendServerError(f"Server error {response.status_code}: {response.text[:200]}", response)
+        if response.status_code >= 400:
+            raise BackendError(f"Request failed with {response.status_code}: {response.text[:200]}", response)
+        data = response.json()
+        usage = data.get("usage") or {}
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=choice["message"]["content"]))
+                     for choice in data["choices"]],
+            usage=SimpleNamespace(prompt_tokens=usage.get("prompt_tokens"),
+                                  completion_tokens=usage.get("completion_tokens"),
+                                  total_tokens=usage.get("total_tokens")),
+        )
+
+    def close(self):
+        self._http.close()
+
+
+@functools.lru_cache(maxsize=None)
+def make_client(backend: str = "groq"):
+    """Return the process-wide client of a backend, creating it on first use.
+
+    One client, and with it one HTTP connection pool, is shared by every AnalyzeDocs. The
+    SDKs are imported here, so processes that never call a backend do not pay for them.
+
+    Args:
+        backend (str): One of BACKENDS. "openai" reads the server address from LLM_BASE_URL
+            (e.g. http://localhost:8080/v1) and an optional key from LLM_API_KEY.
+
+    Returns:
+        Any: A client with a `chat.completions.create` method.
+
+    Raises:
+        ValueError: If the backend is unknown or its environment variables are not set.
+    """
+    if backend == "groq":
+        if not os.getenv("GROQ_API_KEY"):
+            raise ValueError("GROQ_API_KEY environment variable not set")
+        from groq import Groq
+        return Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
+    if backend == "openai":
+        if not os.getenv("LLM_BASE_URL"):
+            raise ValueError("LLM_BASE_URL environment variable not set")
+        return OpenAICompatibleClient(os.getenv("LLM_BASE_URL"), os.getenv("LLM_API_KEY"))
+    if backend == "fake":
+        from fake_groq import FakeGroq
+        return FakeGroq(latency=0.0)
+    raise ValueError(f"Unknown LLM backend: {backend}. Use one of: {', '.join(BACKENDS)}")
@@ -0,0 +1,288 @@
+"""Generate flash cards for many documents at once.
+
+Run from this directory:
+
+    python batch.py "../data/*.pdf" ../data/notes --output ../output/term.jsonl --num-cards 10
+
+Every finished document is appended to the output as one JSON line, so an interrupted
+or rate-limited run picks up where it stopped when started again with the same output:
+documents already in the file (same path and content) are skipped.
+"""
+import os
+import glob
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
+
+from cache import ResponseCache
+from model import AnalyzeDocs, ReadDocs, STAGES
+from backends import BACKENDS
+from ocr_preprocess import PRESETS, DEFAULT_PRESET
+from language import document_language, resolve_target, DEFAULT_OCR_LANGUAGES
+
+FILE_TYPES = {".pdf": "pdf", ".txt": "text", ".md": "text"}
+
+
+def find_documents(inputs: List[str]) -> List[str]:
+    """Expand files, directories (recursively) and glob patterns into supported documents.
+
+    Args:
+        inputs (List[str]): Paths or glob patterns.
+
+    Returns:
+        List[str]: The absolute paths of the documents, sorted and without duplicates.
+    """
+    paths = set()
+    for pattern in inputs:
+        for match in glob.glob(pattern, recursive=True) or [pattern]:
+            if os.path.isdir(match):
+                for root, _, files in os.walk(match):
+                    paths.update(os.path.join(root, name) for name in files)
+            elif os.path.isfile(match):
+                paths.add(match)
+            else:
+                print(f"Warning: {match} does not exist")
+    return sorted(os.path.abspath(path) for path in paths
+                  if os.path.splitext(path)[1].lower() in FILE_TYPES)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_finished(output: str) -> Set[Tuple[str, str]]:
+    """Return the (source, sha256) pairs already written to `output`.
+
+    A last line cut short by a crash is ignored; that document is simply processed again.
+    """
+    finished = set()
+    if not os.path.exists(output):
+        return finished
+    with open(output, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            finished.add((record["source"], record["sha256"]))
+    return finished
+
+
+class BatchWriter:
+    """Appends records to a JSONL file from several threads, durably, one line per record."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+", encoding="utf-8")
+        # Terminate a line left incomplete by a crash so the next record starts cleanly.
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def process_file(read_docs: ReadDocs, analyze_docs: AnalyzeDocs, path: str, sha256: str, num_cards: Union[int, str],
+                 language: str, translate_in_prompt: bool, use_cache: bool = True) -> Dict[str, Any]:
+    """Read and generate the cards of one document.
+
+    Returns:
+        Dict[str, Any]: The output record for the document.
+    """
+    start = time.perf_counter()
+    file_type = FILE_TYPES[os.path.splitext(path)[1].lower()]
+    pages = read_docs.read_document_pages(file_type, path)
+    text = "\n".join(page.text for page in pages)
+    source_language = document_language(pages)
+    language = resolve_target(language, source_language)
+    cards = analyze_docs.generate_flashcards(text, num_cards, language=language,
+                                             translate_in_prompt=translate_in_prompt, source_language=source_language,
+                                             use_cache=use_cache)
+    methods = {}
+    for page in pages:
+        methods[page.method] = methods.get(page.method, 0) + 1
+    return {
+        "source": path,
+        "sha256": sha256,
+        "language": language,
+        "source_language": source_language,
+        "pages": len(pages),
+        "page_methods": methods,
+        "chars": len(text),
+        "seconds": round(time.perf_counter() - start, 3),
+        "cards": analyze_docs.flashcards_to_json(cards),
+    }
+
+
+def run_batch(paths: List[str], output: str, read_docs: ReadDocs, analyze_docs: AnalyzeDocs, num_cards: Union[int, str],
+              language: str, documents: int = 2, translate_in_prompt: bool = False,
+              use_cache: bool = True) -> Dict[str, Any]:
+    """Process `paths`, `documents` at a time, appending results to `output`.
+
+    OCR concurrency is bounded by the ReadDocs worker processes and LLM concurrency by the
+    AnalyzeDocs pool and rate limits, however many documents are in progress.
+
+    Args:
+        paths (List[str]): The documents to process.
+        output (str): The JSONL file results are appended to.
+        read_docs (ReadDocs): The document reader.
+        analyze_docs (AnalyzeDocs): The card generator.
+        num_cards (Union[int, str]): The number of cards per document, or "auto".
+        language (str): The target language of the cards.
+        documents (int): The number of documents processed concurrently.
+        translate_in_prompt (bool): Generate the cards directly in the target language.
+        use_cache (bool): Look LLM requests up in the response cache; False always calls the model.
+
+    Returns:
+        Dict[str, Any]: Aggregate counts and throughput of the run.
+    """
+    finished = load_finished(output)
+    todo = []
+    for path in paths:
+        sha256 = file_digest(path)
+        if (path, sha256) not in finished:
+            todo.append((path, sha256))
+    summary = {"documents": len(paths), "skipped": len(paths) - len(todo), "processed": 0, "failed": [],
+               "pages": 0, "chars": 0, "cards": 0}
+    llm_before = analyze_docs.llm.get_stats()
+    writer = BatchWriter(output)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=documents, thread_name_prefix="batch") as executor:
+            futures = {executor.submit(process_file, read_docs, analyze_docs, path, sha256, num_cards, language,
+                                       translate_in_prompt, use_cache): path
+                       for path, sha256 in todo}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    # Left out of the output, so the next run retries it.
+                    print(f"Failed {path}: {e}")
+                    summary["failed"].append(path)
+                    continue
+                writer.write(record)
+                summary["processed"] += 1
+                summary["pages"] += record["pages"]
+                summary["chars"] += record["chars"]
+                summary["cards"] += len(record["cards"])
+                print(f"[{summary['processed'] + len(summary['failed'])}/{len(todo)}] {path}: "
+                      f"{len(record['cards'])} cards in {record['seconds']:.1f}s")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    llm_after = analyze_docs.llm.get_stats()
+    summary.update({
+        "wall_time": round(elapsed, 3),
+        "documents_per_minute": round(summary["processed"] * 60 / elapsed, 2) if elapsed else 0.0,
+        "pages_per_second": round(summary["pages"] / elapsed, 2) if elapsed else 0.0,
+        "cards_per_minute": round(summary["cards"] * 60 / elapsed, 2) if elapsed else 0.0,
+        "llm": {name: llm_after[name] - llm_before[name] for name in llm_after},
+    })
+    return summary
+
+
+def card_budget(value: str) -> Union[int, str]:
+    if value == "auto":
+        return value
+    return int(value)
+
+
+def stage_model(value: str) -> Tuple[str, str]:
+    stage, _, model = value.partition("=")
+    if stage not in STAGES or not model:
+        raise argparse.ArgumentTypeError(f"expected STAGE=MODEL with a stage among {', '.join(STAGES)}")
+    return stage, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate flash cards for a set of PDF and text documents.")
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns.")
+    parser.add_argument("--output", required=True, help="JSONL file to append results to; reused to resume.")
+    parser.add_argument("--num-cards", type=card_budget, default=10,
+                        help='Cards per document; "auto" sizes each deck from the document.')
+    parser.add_argument("--no-quality-check", action="store_true",
+                        help="Keep the cards as generated instead of regenerating those that fail the checks.")
+    parser.add_argument("--language", default="english",
+                        help='Language of the cards; "auto" uses the language of each document.')
+    parser.add_argument("--translate-in-prompt", action="store_true",
+                        help="Generate the cards directly in the target language.")
+    parser.add_argument("--fused", action="store_true", help="Generate each chunk with a single structured request.")
+    parser.add_argument("--documents", type=int, default=2, help="Documents processed concurrently.")
+    parser.add_argument("--ocr-workers", type=int, default=None, help="OCR processes (default: CPU count).")
+    parser.add_argument("--ocr-preset", choices=list(PRESETS), default=DEFAULT_PRESET,
+                        help="How scanned pages are preprocessed, from fast to accurate.")
+    parser.add_argument("--ocr-languages", nargs="+", default=None,
+                        help=f"Languages of scanned documents (default: {' '.join(DEFAULT_OCR_LANGUAGES)}), "
+                             "detected among those with an installed Tesseract pack; the first is the fallback.")
+    parser.add_argument("--backend", choices=BACKENDS, default=os.getenv("LLM_BACKEND", "groq"),
+                        help='LLM backend; "openai" calls the OpenAI-compatible server at LLM_BASE_URL.')
+    parser.add_argument("--model", default=os.getenv("LLM_MODEL", "mixtral-8x7b-32768"))
+    parser.add_argument("--stage-model", action="append", default=[], type=stage_model, metavar="STAGE=MODEL",
+                        help=f"Run one stage on another model; repeatable. Stages: {', '.join(STAGES)}.")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="Concurrent LLM requests.")
+    parser.add_argument("--rpm", type=int, default=int(os.getenv("GROQ_RPM", 30)),
+                        help="Requests per minute allowed by the LLM account; 0 disables the limiter.")
+    parser.add_argument("--tpm", type=int, default=int(os.getenv("GROQ_TPM", 0)),
+                        help="Tokens per minute allowed by the LLM account; 0 disables the limiter.")
+    parser.add_argument("--cache-dir", default="../cache",
+                        help="Directory of the LLM and OCR caches shared with the API; empty to disable.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Send every LLM request to the model instead of the response cache.")
+    args = parser.parse_args()
+
+    paths = find_documents(args.inputs)
+    if not paths:
+        parser.error("no PDF or text documents found")
+
+    llm_cache: Optional[ResponseCache] = None
+    ocr_cache: Optional[ResponseCache] = None
+    if args.cache_dir:
+        llm_cache = ResponseCache(os.path.join(args.cache_dir, "llm_responses.sqlite3"))
+        ocr_cache = ResponseCache(os.path.join(args.cache_dir, "ocr_pages.sqlite3"), ttl=90 * 24 * 3600, name="ocr")
+    analyze_docs = AnalyzeDocs(model=args.model, backend=args.backend, stage_models=dict(args.stage_model),
+                               max_workers=args.llm_concurrency, cache=llm_cache, requests_per_minute=args.rpm,
+                               tokens_per_minute=args.tpm, fused=args.fused,
+                               quality_check=not args.no_quality_check)
+    read_docs = ReadDocs(data_dir=".", max_workers=args.ocr_workers, ocr_cache=ocr_cache,
+                         ocr_preset=args.ocr_preset, ocr_languages=args.ocr_languages)
+    try:
+        summary = run_batch(paths, args.output, read_docs, analyze_docs, args.num_cards, args.language,
+                            args.documents, args.translate_in_prompt, not args.no_cache)
+    finally:
+        read_docs.close()
+
+    print(f"\n{summary['processed']} processed, {summary['skipped']} already done, "
+          f"{len(summary['failed'])} failed in {summary['wall_time']:.1f}s")
+    print(f"{summary['pages']} pages, {summary['cards']} cards: {summary['documents_per_minute']} documents/min, "
+          f"{summary['pages_per_second']} pages/s, {summary['cards_per_minute']} cards/min")
+    print(f"LLM: {summary['llm']['requests']} requests, {summary['llm']['retries']} retries, "
+          f"{summary['llm']['tokens']} tokens")
+    if summary["failed"]:
+        print("Run the same command again to retry the failed documents.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Benchmark the extraction and generation pipeline against the offline fake Groq backend.
+
+Run from this directory:
+
+    python benchmark.py --sizes 2000 20000 200000 --latency 0.2 --output ../bench
+
+Results are written as JSON, named after the current commit, so runs can be compared.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from typing import List, Dict, Any
+
+from fake_groq import FakeGroq
+from model import AnalyzeDocs, ReadDocs
+from ocr_preprocess import PRESETS, DEFAULT_PRESET
+
+WORDS = ("revolution empire government parliament industry economy treaty army science energy "
+         "molecule reaction element theory experiment history culture language society climate "
+         "population territory resource network system process function structure evidence").split()
+
+
+def synthetic_text(num_chars: int, seed: int = 0) -> str:
+    """Build deterministic prose with headings and paragraphs of roughly `num_chars` characters."""
+    rng = random.Random(seed)
+    parts, size, section = [], 0, 1
+    while size < num_chars:
+        if rng.random() < 0.1:
+            block = f"{section}. {rng.choice(WORDS).title()} and {rng.choice(WORDS)}"
+            section += 1
+        else:
+            sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+                         for _ in range(rng.randint(3, 7))]
+            block = " ".join(sentences)
+        parts.append(block)
+        size += len(block) + 2
+    return "\n\n".join(parts)[:num_chars]
+
+
+def make_corpus(data_dir: str, sizes: List[int], with_pdf: bool) -> List[Dict[str, Any]]:
+    os.makedirs(data_dir, exist_ok=True)
+    corpus = []
+    for size in sizes:
+        text = synthetic_text(size, seed=size)
+        name = f"bench_{size}.txt"
+        with open(os.path.join(data_dir, name), "w") as f:
+            f.write(text)
+        corpus.append({"file_type": "text", "file_name": name, "chars": size})
+        if with_pdf:
+            import pymupdf
+            doc = pymupdf.open()
+            page_chars = 2500
+            for start in range(0, len(text), page_chars):
+                page = doc.new_page()
+                page.insert_textbox(page.rect + (50, 50, -50, -50), text[start:start + page_chars], fontsize=8)
+            name = f"bench_{size}.pdf"
+            doc.save(os.path.join(data_dir, name))
+            corpus.append({"file_type": "pdf", "file_name": name, "chars": size, "pages": len(doc)})
+    return corpus
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def stage_latencies(start: float, timeline: List[tuple]) -> Dict[str, float]:
+    """Turn timestamped progress events into the time spent in each stage."""
+    def first(stage):
+        return next((t for t, event in timeline if event["stage"] == stage), None)
+
+    cards = [t for t, event in timeline if event["stage"] == "card"]
+    translation, first_card, last_card = first("translation"), first("card"), max(cards) if cards else None
+    # The quality review and deduplication report after the first cards; they count as generation.
+    analysis = [t for t, event in timeline if event["stage"] == "analysis" and (first_card is None or t <= first_card)]
+    analysis_done = max(analysis) if analysis else start
+    generation_done = translation or last_card or analysis_done
+    stages = {"analysis": analysis_done - start, "generation": generation_done - analysis_done}
+    if first_card:
+        # Cards are reported as each chunk finishes, long before the whole deck is final.
+        stages["first_card"] = first_card - start
+    if translation and last_card:
+        stages["translation"] = last_card - translation
+    return {name: round(seconds, 4) for name, seconds in stages.items()}
+
+
+def bench_document(read_docs: ReadDocs, analyze_docs: AnalyzeDocs, fake: FakeGroq, item: Dict[str, Any],
+                   num_cards: int, language: str) -> Dict[str, Any]:
+    calls_before, llm_before = fake.calls, analyze_docs.llm.get_stats()
+    start = time.perf_counter()
+    pages = read_docs.read_document_pages(item["file_type"], item["file_name"])
+    text = "\n".join(page.text for page in pages)
+    read_done = time.perf_counter()
+
+    timeline = []
+    cards = analyze_docs.process_document(
+        text, num_cards, language=language, on_progress=lambda event: timeline.append((time.perf_counter(), event))
+    )
+    end = time.perf_counter()
+    llm_after = analyze_docs.llm.get_stats()
+
+    methods = {}
+    for page in pages:
+        methods[page.method] = methods.get(page.method, 0) + 1
+    return {
+        **item,
+        "wall_time": round(end - start, 4),
+        "stages": {"read": round(read_done - start, 4), **stage_latencies(read_done, timeline)},
+        "page_methods": methods,
+        "cards": len(cards),
+        "llm_calls": fake.calls - calls_before,
+        "llm_retries": llm_after["retries"] - llm_before["retries"],
+        "tokens": llm_after["tokens"] - llm_before["tokens"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def bench_upload(corpus: List[Dict[str, Any]], fake: FakeGroq, data_dir: str, concurrency: int,
+                       num_requests: int, num_cards: int, language: str) -> Dict[str, Any]:
+    """Fire `num_requests` uploads at the in-process API, `concurrency` at a time."""
+    import httpx
+    import api
+
+    api.analyze_docs.llm.client = fake
+    calls_before = fake.calls
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def upload(client: httpx.AsyncClient, item: Dict[str, Any]):
+        with open(os.path.join(data_dir, item["file_name"]), "rb") as f:
+            content = f.read()
+        content_type = "application/pdf" if item["file_type"] == "pdf" else "text/plain"
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                "/upload/",
+                files={"document": (item["file_name"], content, content_type)},
+                data={"language": language, "num_flashcards": str(num_cards)},
+            )
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(upload(client, corpus[i % len(corpus)]) for i in range(num_requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": num_requests,
+        "statuses": {str(code): count for code, count in statuses.items()},
+        "wall_time": round(elapsed, 4),
+        "throughput_rps": round(num_requests / elapsed, 3),
+        "llm_calls_per_request": round((fake.calls - calls_before) / num_requests, 2),
+        "latency_p50": round(latencies[len(latencies) // 2], 4),
+        "latency_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ReadDocs and AnalyzeDocs with a fake Groq backend.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 100000],
+                        help="Document sizes in characters.")
+    parser.add_argument("--no-pdf", action="store_true", help="Only benchmark text documents.")
+    parser.add_argument("--ocr", action="store_true", help="Ignore PDF text layers and OCR every page.")
+    parser.add_argument("--ocr-preset", choices=list(PRESETS), default=DEFAULT_PRESET)
+    parser.add_argument("--num-cards", type=int, default=10)
+    parser.add_argument("--language", default="english")
+    parser.add_argument("--fused", action="store_true", help="Generate each chunk with a single structured request.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency per call in seconds.")
+    parser.add_argument("--seconds-per-token", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=None, help="Fake server requests-per-minute limit.")
+    parser.add_argument("--client-rpm", type=int, default=0, help="Client-side requests-per-minute limit.")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 16],
+                        help="Concurrent /upload/ requests; pass no values to skip the API benchmark.")
+    parser.add_argument("--requests", type=int, default=16, help="/upload/ requests per concurrency level.")
+    parser.add_argument("--data-dir", default="../bench/corpus")
+    parser.add_argument("--output", default="../bench")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.data_dir, args.sizes, not args.no_pdf)
+    fake = FakeGroq(args.latency, args.seconds_per_token, args.rpm)
+    analyze_docs = AnalyzeDocs(client=fake, requests_per_minute=args.client_rpm, fused=args.fused)
+    read_docs = ReadDocs(data_dir=args.data_dir, use_text_layer=not args.ocr, ocr_preset=args.ocr_preset)
+
+    documents = []
+    for item in corpus:
+        result = bench_document(read_docs, analyze_docs, fake, item, args.num_cards, args.language)
+        print(f"{item['file_name']:>22}: {result['wall_time']:.2f}s, {result['llm_calls']} LLM calls, "
+              f"stages {result['stages']}")
+        documents.append(result)
+    read_docs.close()
+
+    upload = []
+    if args.concurrency:
+        # The API builds its own clients from the environment; keep caches and limits out of the
+        # way. Its card and job stores go to a scratch directory, and decks are never reused:
+        # otherwise every upload after the first of each file would make no LLM calls at all.
+        store_dir = tempfile.TemporaryDirectory(prefix="benchmark_store_")
+        os.environ.setdefault("GROQ_API_KEY", "benchmark")
+        os.environ["LLM_CACHE_PATH"] = ""
+        os.environ["OCR_CACHE_PATH"] = ""
+        os.environ["CARD_STORE_PATH"] = os.path.join(store_dir.name, "cards.sqlite3")
+        os.environ["JOB_STORE_PATH"] = os.path.join(store_dir.name, "jobs.sqlite3")
+        os.environ["INCREMENTAL_REGENERATION"] = "0"
+        os.environ["OCR_PRESET"] = args.ocr_preset
+        os.environ["GROQ_RPM"] = str(args.client_rpm)
+        os.environ["FUSED_GENERATION"] = "1" if args.fused else "0"
+        try:
+            for concurrency in args.concurrency:
+                result = asyncio.run(bench_upload(corpus, fake, args.data_dir, concurrency, args.requests,
+                                                  args.num_cards, args.language))
+                print(f"/upload/ x{concurrency}: {result['throughput_rps']} req/s, p95 {result['latency_p95']}s, "
+                      f"statuses {result['statuses']}")
+                upload.append(result)
+        finally:
+            store_dir.cleanup()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": vars(args),
+        "documents": documents,
+        "upload": upload,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Dict, Optional, Any
+
+from metrics import CACHE_REQUESTS
+
+
+class ResponseCache:
+    """Persistent cache of text results (LLM responses, OCR output) in a local SQLite file.
+
+    Entries are keyed by a hash of whatever produced them, expire after `ttl` seconds and
+    the least recently used ones are evicted once the stored values exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 100 * 1024 * 1024, ttl: Optional[int] = 30 * 24 * 3600,
+                 name: str = "llm"):
+        self.path = path
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Server workers share the file; wait for another process's write rather than failing.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+        # Running total of the stored sizes, kept by triggers in the transaction of each write,
+        # so eviction does not sum the whole table on every set().
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                           "total INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO cache_size SELECT 0, COALESCE(SUM(size), 0) FROM responses")
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+                UPDATE cache_size SET total = total + NEW.size;
+            END""")
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+                UPDATE cache_size SET total = total - OLD.size;
+            END""")
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN
+                UPDATE cache_size SET total = total - OLD.size + NEW.size;
+            END""")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], temperature: float,
+                 response_format: Optional[Dict[str, Any]] = None) -> str:
+        """Hash a request into a cache key.
+
+        Args:
+            model (str): The model name.
+            messages (List[Dict[str, str]]): The chat messages.
+            temperature (float): The sampling temperature.
+            response_format (Dict[str, Any]): The structured output format, if any.
+
+        Returns:
+            str: The hex digest identifying the request.
+        """
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        if response_format is not None:
+            # Only added when set, so keys of plain requests stay valid.
+            request["response_format"] = response_format
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache=self.name, result="miss")
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return row[0]
+
+    def set(self, key: str, value: str):
+        """Store a response, evicting the least recently used entries if over the size cap."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete does not fire the size trigger.
+            self._conn.execute(
+                "INSERT INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, value, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        total = self._conn.execute("SELECT total FROM cache_size").fetchone()[0]
+        while total > self.max_bytes:
+            # The oldest entries a batch at a time, rather than reading the whole table.
+            rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit/miss counts of this process and the current size of the cache."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            size = self._conn.execute("SELECT total FROM cache_size").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
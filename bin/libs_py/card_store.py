@@ -0,0 +1,292 @@
+import io
+import os
+import csv
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import List, Dict, Optional, Any, Iterator, Iterable, Union
+
+from dedup import shingles, minhash, lsh_buckets, jaccard, distinguishing_tokens
+
+# Columns cards can be filtered on; each one is indexed.
+FILTERS = ("deck", "source", "language", "category", "difficulty")
+
+
+class CardStore:
+    """Flash cards of every generated deck in one indexed SQLite file.
+
+    Cards are inserted in bulk, read a page at a time with keyset pagination (so deep pages
+    cost the same as the first) and exported as a stream, so no deck is ever loaded or
+    rewritten as a whole. The LSH buckets of every prompt are stored too, so new cards can
+    be matched against the whole corpus without scanning it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Server workers share the file; wait for another process's write rather than failing.
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cards (
+                id INTEGER PRIMARY KEY,
+                deck TEXT NOT NULL,
+                source TEXT,
+                language TEXT,
+                category TEXT,
+                difficulty TEXT,
+                prompt TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                section TEXT,
+                created_at REAL NOT NULL
+            )""")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cards)")}
+        if "section" not in columns:
+            # Stores created before cards were tagged with their section.
+            self._conn.execute("ALTER TABLE cards ADD COLUMN section TEXT")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS card_buckets (
+                bucket INTEGER NOT NULL,
+                card_id INTEGER NOT NULL
+            )""")
+        # Every section of the document a deck was generated from, including those without cards.
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS deck_sections (
+                deck TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                section TEXT NOT NULL,
+                PRIMARY KEY (deck, position)
+            )""")
+        # The number of cards asked for when each deck was generated ("auto" or a count).
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS deck_requests (
+                deck TEXT PRIMARY KEY,
+                num_cards TEXT NOT NULL
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS card_buckets_bucket ON card_buckets (bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS card_buckets_card_id ON card_buckets (card_id)")
+        for column in FILTERS:
+            # Filters are combined with id order, so (column, id) serves both the WHERE and the paging.
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS cards_{column} ON cards ({column}, id)")
+        self._conn.commit()
+
+    def add_cards(self, cards: Iterable[Dict[str, Any]], source: Optional[str] = None,
+                  language: Optional[str] = None, deck: Optional[str] = None,
+                  sections: Optional[List[str]] = None, num_cards: Optional[Union[int, str]] = None) -> str:
+        """Insert a deck of cards in a single transaction.
+
+        Args:
+            cards (Iterable[Dict[str, Any]]): Cards as returned by AnalyzeDocs.flashcards_to_json.
+            source (str): The document the cards were generated from.
+            language (str): The language of the cards.
+            deck (str): The deck to add the cards to. A new deck is created by default.
+            sections (List[str]): The section hashes of the source document, in order.
+            num_cards (Union[int, str]): The number of cards requested for the deck, or "auto".
+
+        Returns:
+            str: The deck id.
+        """
+        deck = deck or uuid.uuid4().hex
+        now = time.time()
+        cards = list(cards)
+        buckets = [lsh_buckets(minhash(shingles(card["prompt"]))) for card in cards]
+        with self._lock, self._conn:
+            if num_cards is not None:
+                self._conn.execute("INSERT OR REPLACE INTO deck_requests (deck, num_cards) VALUES (?, ?)",
+                                   (deck, str(num_cards)))
+            if sections:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO deck_sections (deck, position, section) VALUES (?, ?, ?)",
+                    [(deck, position, section) for position, section in enumerate(sections)])
+            for card, card_buckets in zip(cards, buckets):
+                card_id = self._conn.execute(
+                    "INSERT INTO cards (deck, source, language, category, difficulty, prompt, answer, section, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (deck, source, language, card.get("category"), card.get("difficulty"),
+                     card["prompt"], card["answer"], card.get("section"), now)).lastrowid
+                self._conn.executemany("INSERT INTO card_buckets (bucket, card_id) VALUES (?, ?)",
+                                       [(bucket, card_id) for bucket in card_buckets])
+        return deck
+
+    def find_duplicates(self, cards: List[Dict[str, Any]], threshold: float = 0.6,
+                        language: Optional[str] = None, answer_threshold: float = 0.5) -> List[Optional[int]]:
+        """Match cards against the stored cards, as dedup.deduplicate does within a deck.
+
+        Only cards sharing an LSH bucket with a prompt are compared, so the cost depends on
+        the number of similar cards rather than the size of the store. A stored card is a
+        duplicate when its prompt and its answer are both similar and the two cards mention
+        the same numbers and ordinals, so "World War I" and "World War II" stay apart.
+
+        Args:
+            cards (List[Dict[str, Any]]): The cards to look up, with 'prompt' and 'answer'.
+            threshold (float): The minimum shingle Jaccard similarity of the prompts.
+            language (str): Only compare with cards in this language.
+            answer_threshold (float): The minimum shingle Jaccard similarity of the answers.
+
+        Returns:
+            List[Optional[int]]: For each card, the id of the stored card with the most similar prompt, or None.
+        """
+        matches = []
+        for card in cards:
+            features = shingles(card["prompt"])
+            answer_features = shingles(card["answer"])
+            tokens = distinguishing_tokens(f"{card['prompt']} {card['answer']}")
+            buckets = lsh_buckets(minhash(features))
+            sql = ("SELECT DISTINCT cards.id, cards.prompt, cards.answer FROM card_buckets "
+                   "JOIN cards ON cards.id = card_buckets.card_id "
+                   f"WHERE card_buckets.bucket IN ({', '.join('?' * len(buckets))})")
+            params: List[Any] = list(buckets)
+            if language is not None:
+                sql += " AND cards.language = ?"
+                params.append(language)
+            with self._lock:
+                candidates = self._conn.execute(sql, params).fetchall()
+            best, best_similarity = None, threshold
+            for card_id, prompt, answer in candidates:
+                similarity = jaccard(features, shingles(prompt))
+                if similarity < best_similarity or distinguishing_tokens(f"{prompt} {answer}") != tokens:
+                    continue
+                if jaccard(answer_features, shingles(answer)) >= answer_threshold:
+                    best, best_similarity = card_id, similarity
+            matches.append(best)
+        return matches
+
+    @staticmethod
+    def _where(filters: Dict[str, Optional[str]], after: int = 0) -> tuple:
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown card filters: {', '.join(sorted(unknown))}")
+        clauses, params = ["id > ?"], [after]
+        for column, value in filters.items():
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    def query(self, after: int = 0, limit: int = 50, **filters) -> List[Dict[str, Any]]:
+        """Return one page of cards in insertion order.
+
+        Args:
+            after (int): The id of the last card of the previous page, 0 for the first page.
+            limit (int): The page size.
+            **filters: Exact matches on deck, source, language, category or difficulty.
+
+        Returns:
+            List[Dict[str, Any]]: The cards, each with its 'id'.
+        """
+        where, params = self._where(filters, after)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, deck, source, language, category, difficulty, prompt, answer, section FROM cards "
+                f"WHERE {where} ORDER BY id LIMIT ?", params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_deck(self, source: str, language: Optional[str] = None) -> Optional[str]:
+        """Return the most recent deck generated from `source`, or None."""
+        where, params = self._where({"source": source, "language": language})
+        with self._lock:
+            row = self._conn.execute(f"SELECT deck FROM cards WHERE {where} ORDER BY id DESC LIMIT 1",
+                                     params).fetchone()
+        return row[0] if row is not None else None
+
+    def requested_cards(self, deck: str) -> Optional[str]:
+        """Return the number of cards requested for `deck` as stored ("auto" or digits), or None if unknown."""
+        with self._lock:
+            row = self._conn.execute("SELECT num_cards FROM deck_requests WHERE deck = ?", (deck,)).fetchone()
+        return row[0] if row is not None else None
+
+    def deck_sections(self, deck: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Return the cards of a deck grouped by the hash of the section they came from.
+
+        Sections of the source document that produced no cards map to an empty list; cards
+        stored without a section are left out.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT section FROM deck_sections WHERE deck = ? ORDER BY position",
+                                      (deck,)).fetchall()
+        sections: Dict[str, List[Dict[str, Any]]] = {row[0]: [] for row in rows}
+        for card in self.iter_cards(deck=deck):
+            if card["section"] is not None:
+                sections.setdefault(card["section"], []).append(card)
+        return sections
+
+    def count(self, **filters) -> int:
+        where, params = self._where(filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM cards WHERE {where}", params).fetchone()[0]
+
+    def iter_cards(self, batch_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+        """Yield every matching card, reading `batch_size` rows at a time."""
+        after = 0
+        while True:
+            page = self.query(after, batch_size, **filters)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after = page[-1]["id"]
+
+    def delete_deck(self, deck: str) -> int:
+        """Remove a deck and return the number of cards deleted."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM card_buckets WHERE card_id IN (SELECT id FROM cards WHERE deck = ?)",
+                               (deck,))
+            self._conn.execute("DELETE FROM deck_sections WHERE deck = ?", (deck,))
+            self._conn.execute("DELETE FROM deck_requests WHERE deck = ?", (deck,))
+            return self._conn.execute("DELETE FROM cards WHERE deck = ?", (deck,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def export_json(cards: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Stream cards as a JSON array, one card per chunk.
+
+    Args:
+        cards (Iterable[Dict[str, Any]]): The cards to export.
+
+    Returns:
+        Iterator[str]: Pieces of the JSON document.
+    """
+    yield "["
+    for index, card in enumerate(cards):
+        yield ("," if index else "") + "\n" + json.dumps(card, ensure_ascii=False)
+    yield "\n]\n"
+
+
+def export_csv(cards: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Stream cards as CSV with a header row."""
+    columns = ["id", "deck", "source", "language", "category", "difficulty", "prompt", "answer"]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for card in cards:
+        writer.writerow(card)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_anki(cards: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Stream cards in Anki's tab-separated text import format.
+
+    Each note has the front, the back and tags built from the category and difficulty.
+    """
+    yield "#separator:tab\n#html:false\n#tags column:3\n"
+    for card in cards:
+        tags = " ".join(value.replace(" ", "_") for value in (card.get("category"), card.get("difficulty")) if value)
+        fields = [card["prompt"], card["answer"], tags]
+        yield "\t".join(field.replace("\t", " ").replace("\n", " ") for field in fields) + "\n"
+
+
+EXPORTS = {
+    "json": (export_json, "application/json", "json"),
+    "csv": (export_csv, "text/csv", "csv"),
+    "anki": (export_anki, "text/plain", "txt"),
+}
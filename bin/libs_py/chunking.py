@@ -0,0 +1,186 @@
+import re
+import zlib
+import hashlib
+from typing import List
+
+
+# Rough size of a token for English and most European languages. Good enough to keep
+# each request well inside the model's context without shipping a tokenizer.
+CHARS_PER_TOKEN = 4
+
+SECTION_HEADING = re.compile(r"^(#{1,6}\s|\d+(\.\d+)*[.)]?\s+\S|[A-Z][A-Z0-9 ,:'-]{3,}$)")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The approximate token count.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_blocks(text: str) -> List[str]:
+    """Split text into paragraphs, also breaking before lines that look like section headings.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The non-empty blocks, in order.
+    """
+    blocks = []
+    for paragraph in re.split(r"\n\s*\n|\f", text):
+        current = []
+        for line in paragraph.splitlines():
+            if current and SECTION_HEADING.match(line.strip()):
+                blocks.append("\n".join(current))
+                current = []
+            current.append(line)
+        if current:
+            blocks.append("\n".join(current))
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def split_oversized(block: str, max_tokens: int) -> List[str]:
+    """Split a block that is larger than `max_tokens` on sentence boundaries, or by size as a last resort.
+
+    Args:
+        block (str): The block to split.
+        max_tokens (int): The maximum size of each piece.
+
+    Returns:
+        List[str]: The pieces, in order.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces, current = [], ""
+    for sentence in re.split(r"(?<=[.!?])\s+", block):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = 8000) -> List[str]:
+    """Split text into chunks of at most `max_tokens`, keeping paragraphs and sections together.
+
+    Args:
+        text (str): The text to split.
+        max_tokens (int): The maximum estimated size of each chunk.
+
+    Returns:
+        List[str]: The chunks, in document order. Short texts come back as a single chunk.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    chunks, current, current_tokens = [], [], 0
+    for block in split_blocks(text):
+        pieces = [block] if estimate_tokens(block) <= max_tokens else split_oversized(block, max_tokens)
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece) + 1
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def split_sections(text: str, min_tokens: int = 200, max_tokens: int = 1000) -> List[str]:
+    """Split text into small sections whose boundaries survive edits elsewhere in the text.
+
+    A section ends before a heading, or after a paragraph whose content hash marks it as a
+    boundary once the section has `min_tokens`. Boundaries depend on the paragraphs
+    themselves rather than on offsets, so an edit only changes the section it falls in.
+
+    Args:
+        text (str): The text to split.
+        min_tokens (int): The size below which content-defined boundaries are ignored.
+        max_tokens (int): The size at which a section is closed regardless.
+
+    Returns:
+        List[str]: The sections, in document order.
+    """
+    sections, current, current_tokens = [], [], 0
+    for block in split_blocks(text):
+        if current and SECTION_HEADING.match(block):
+            sections.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += estimate_tokens(block)
+        boundary = zlib.crc32(block.encode("utf-8")) % 4 == 0
+        if current_tokens >= max_tokens or (boundary and current_tokens >= min_tokens):
+            sections.append("\n\n".join(current))
+            current, current_tokens = [], 0
+    if current:
+        sections.append("\n\n".join(current))
+    return sections
+
+
+def section_hash(section: str) -> str:
+    """Identify a section by its content, ignoring differences in whitespace."""
+    return hashlib.sha256(" ".join(section.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def allocate_cards(weights: List[int], total: int) -> List[int]:
+    """Spread `total` cards across chunks in proportion to their weights.
+
+    Each chunk gets the cards whose positions fall within its share of the running total,
+    so when there are fewer cards than chunks they are spaced evenly through the document
+    instead of all going to its first chunks.
+
+    Args:
+        weights (List[int]): The size of each chunk.
+        total (int): The number of cards to spread.
+
+    Returns:
+        List[int]: The number of cards for each chunk, summing to `total`.
+    """
+    weight_sum = sum(weights)
+    if weight_sum == 0:
+        weights, weight_sum = [1] * len(weights), len(weights)
+    counts, cumulative, assigned = [], 0, 0
+    for weight in weights:
+        cumulative += weight
+        # Half-up rounding of the running share; exact integer arithmetic, so the counts
+        # always add up to `total`.
+        boundary = (2 * total * cumulative + weight_sum) // (2 * weight_sum)
+        counts.append(boundary - assigned)
+        assigned = boundary
+    return counts
+
+
+def group_chunks(counts: List[int]) -> List[List[int]]:
+    """Attach every chunk without cards to the nearest chunk that has some.
+
+    Args:
+        counts (List[int]): The number of cards of each chunk, e.g. from allocate_cards.
+
+    Returns:
+        List[List[int]]: The chunk indices of each group, in document order. Every group
+        has exactly one chunk with cards; ties go to the earlier one.
+    """
+    bearers = [index for index, count in enumerate(counts) if count > 0]
+    groups: List[List[int]] = [[] for _ in bearers]
+    position = 0
+    for index in range(len(counts) if bearers else 0):
+        while position + 1 < len(bearers) and bearers[position + 1] - index < index - bearers[position]:
+            position += 1
+        groups[position].append(index)
+    return groups
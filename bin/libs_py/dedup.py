@@ -0,0 +1,164 @@
+import re
+import zlib
+import random
+from typing import List, Dict, Optional, Set, Tuple, Callable
+
+# Minhash permutations and how they are split into LSH bands. With 16 bands of 4 rows,
+# pairs above ~0.5 Jaccard similarity almost always share a bucket; candidates are then
+# checked exactly, so the threshold itself is applied precisely.
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 4
+# Each "permutation" XORs the 32-bit shingle hashes with a random mask: several times
+# cheaper in pure Python than universal hashing, with about the same LSH recall. The seed is
+# fixed because signatures are stored on disk and must match across processes.
+_rng = random.Random(1)
+_MASKS = [_rng.getrandbits(32) for _ in range(NUM_PERM)]
+
+# Question boilerplate shared by most cards; left in, it makes unrelated short questions
+# such as "What is the capital of France/Spain?" look alike.
+STOPWORDS = set("""a an the of in on at to for from by with and or is are was were be been does do did
+what which who whom whose when where why how this that these those it its as about into describe define
+explain name list give main""".split())
+# Numbers, Roman numerals and ordinals tell apart questions that are otherwise the same, such
+# as "When did World War I/II begin?" or "Who was the first/second president?".
+ORDINALS = set("""first second third fourth fifth sixth seventh eighth ninth tenth eleventh twelfth last""".split())
+ROMAN = re.compile(r"^[ivxlc]+$")
+
+
+def normalize(text: str) -> str:
+    """Lowercase the text, drop punctuation and stopwords and collapse whitespace."""
+    words = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    content = [word for word in words if word not in STOPWORDS]
+    return " ".join(content or words)
+
+
+def distinguishing_tokens(text: str) -> Set[str]:
+    """Return the numbers, Roman numerals and ordinals of a text."""
+    words = re.sub(r"[^\w\s]", " ", text.lower()).split()
+    return {word for word in words if word.isdigit() or word in ORDINALS or ROMAN.match(word)}
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Hash the character n-grams of the normalized text.
+
+    Args:
+        text (str): The text to shingle.
+        size (int): The n-gram length.
+
+    Returns:
+        Set[int]: Stable 32-bit hashes of the n-grams.
+    """
+    text = normalize(text)
+    if len(text) <= size:
+        return {zlib.crc32(text.encode("utf-8"))} if text else set()
+    return {zlib.crc32(text[i:i + size].encode("utf-8")) for i in range(len(text) - size + 1)}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(features: Set[int]) -> List[int]:
+    """Return the minhash signature of a set of shingles."""
+    if not features:
+        return [0] * NUM_PERM
+    return [min([value ^ mask for value in features]) for mask in _MASKS]
+
+
+def lsh_buckets(signature: List[int]) -> List[int]:
+    """Hash each band of a signature into a bucket id; similar texts share at least one bucket.
+
+    The band index is part of the hash, so buckets of different bands never collide.
+    """
+    rows = NUM_PERM // BANDS
+    buckets = []
+    for band in range(BANDS):
+        values = ",".join(str(value) for value in signature[band * rows:(band + 1) * rows])
+        buckets.append((band << 32) | zlib.crc32(values.encode("ascii")))
+    return buckets
+
+
+class DuplicateIndex:
+    """In-memory LSH index of texts for finding near-duplicates without comparing every pair."""
+
+    def __init__(self, threshold: float = 0.6):
+        self.threshold = threshold
+        self.shingles: Dict[int, Set[int]] = {}
+        self.buckets: Dict[int, List[int]] = {}
+
+    def add(self, key: int, features: Set[int], buckets: Optional[List[int]] = None):
+        """Index the shingles of a text under `key`."""
+        self.shingles[key] = features
+        for bucket in buckets or lsh_buckets(minhash(features)):
+            self.buckets.setdefault(bucket, []).append(key)
+
+    def find(self, features: Set[int], buckets: Optional[List[int]] = None,
+             accept: Optional[Callable[[int], bool]] = None) -> Optional[Tuple[int, float]]:
+        """Return the key and similarity of the closest indexed text above the threshold, if any.
+
+        Args:
+            features (Set[int]): The shingles of the text to look up.
+            buckets (List[int]): Its LSH buckets, if already computed.
+            accept (Callable[[int], bool]): Further check a candidate key must pass.
+
+        Returns:
+            Optional[Tuple[int, float]]: The best match, or None.
+        """
+        candidates = set()
+        for bucket in buckets or lsh_buckets(minhash(features)):
+            candidates.update(self.buckets.get(bucket, ()))
+        best = None
+        for key in candidates:
+            similarity = jaccard(features, self.shingles[key])
+            if similarity < self.threshold or (best is not None and similarity <= best[1]):
+                continue
+            if accept is None or accept(key):
+                best = (key, similarity)
+        return best
+
+
+def deduplicate(cards: List[Dict[str, str]], threshold: float = 0.6,
+                answer_threshold: float = 0.5) -> Tuple[List[Dict[str, str]], List[Tuple[Dict[str, str], int]]]:
+    """Drop cards that ask the same thing as an earlier card and give the same answer.
+
+    Questions alone are not enough: "When did World War I begin?" and "When did World War II
+    begin?" share most of their text. A card is a duplicate only when its question and its
+    answer are both similar to those of an earlier card, and they mention the same numbers
+    and ordinals.
+
+    Args:
+        cards (List[Dict[str, str]]): The cards, in order of preference.
+        threshold (float): The Jaccard similarity of character shingles above which two
+            questions are considered the same.
+        answer_threshold (float): The same for the answers.
+
+    Returns:
+        Tuple[List[Dict[str, str]], List[Tuple[Dict[str, str], int]]]: The cards kept, and
+            each dropped card with the index (in the kept list) of the card it duplicates.
+    """
+    index = DuplicateIndex(threshold)
+    kept, duplicates = [], []
+    answers: List[Set[int]] = []
+    tokens: List[Set[str]] = []
+    for card in cards:
+        question, answer = card.get("question", ""), card.get("answer", "")
+        features = shingles(question)
+        answer_features = shingles(answer)
+        card_tokens = distinguishing_tokens(f"{question} {answer}")
+        buckets = lsh_buckets(minhash(features))
+
+        def same_answer(key: int) -> bool:
+            return tokens[key] == card_tokens and jaccard(answer_features, answers[key]) >= answer_threshold
+
+        match = index.find(features, buckets, accept=same_answer)
+        if match is not None:
+            duplicates.append((card, match[0]))
+            continue
+        index.add(len(kept), features, buckets)
+        kept.append(card)
+        answers.append(answer_features)
+        tokens.append(card_tokens)
+    return kept, duplicates
@@ -0,0 +1,93 @@
+import re
+import json
+import time
+import threading
+from collections import deque
+from types import SimpleNamespace
+from typing import List, Dict, Optional
+
+import httpx
+
+from backends import BackendRateLimitError
+from chunking import estimate_tokens
+
+
+class FakeGroq:
+    """Offline stand-in for the Groq client with deterministic answers.
+
+    Mimics `client.chat.completions.create` closely enough for AnalyzeDocs: every call
+    sleeps for `latency` seconds plus a per-token cost, answers in the shape each prompt
+    asks for, and raises `backends.BackendRateLimitError` once more than `requests_per_minute`
+    calls arrive within a minute, so it runs without the groq SDK installed.
+    """
+
+    def __init__(self, latency: float = 0.2, seconds_per_token: float = 0.0,
+                 requests_per_minute: Optional[int] = None):
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.requests_per_minute = requests_per_minute
+        self.calls = 0
+        self.rate_limited = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _check_rate_limit(self):
+        if self.requests_per_minute is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.requests_per_minute:
+                self.rate_limited += 1
+                retry_after = 60 - (now - self._recent[0])
+                request = httpx.Request("POST", "https://fake.groq/openai/v1/chat/completions")
+                response = httpx.Response(429, headers={"retry-after": f"{retry_after:.2f}"}, request=request)
+                raise BackendRateLimitError("Rate limit reached", response)
+            self._recent.append(now)
+
+    def create(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.7, **kwargs):
+        self._check_rate_limit()
+        with self._lock:
+            self.calls += 1
+        system, user = messages[0]["content"], messages[-1]["content"]
+        content = self._answer(system, user)
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        completion_tokens = estimate_tokens(content)
+        time.sleep(self.latency + self.seconds_per_token * (prompt_tokens + completion_tokens))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens),
+        )
+
+    @staticmethod
+    def _answer(system: str, user: str) -> str:
+        words = re.findall(r"[A-Za-z]{5,}", user)
+        match = re.search(r"(?:Generate )?(\d+) (?:flash cards|relevant question-answer pairs|objects)", system)
+        count = int(match.group(1)) if match else 3
+        if "'key_concepts'" in system:
+            return json.dumps({"category": "History", "key_concepts": sorted(set(words), key=words.index)[:10],
+                               "cards": FakeGroq._cards(words, count)})
+        if "JSON array to" in system:
+            items = json.loads(user)
+            return json.dumps([{"id": item["id"], "question": f"[T] {item['question']}",
+                                "answer": f"[T] {item['answer']}"} for item in items])
+        if system.startswith("Translate"):
+            return f"[T] {user}"
+        if "subject category" in system:
+            return "History"
+        if system.startswith("Summarize"):
+            return "\n".join(f"- {' '.join(words[i:i + 8])}" for i in range(0, min(len(words), 80), 8))
+        if system.startswith("Extract key concepts"):
+            return json.dumps(sorted(set(words), key=words.index)[:10])
+        return json.dumps(FakeGroq._cards(words, count))
+
+    @staticmethod
+    def _cards(words: List[str], count: int) -> List[Dict[str, str]]:
+        return [{
+            "question": f"What is {words[i % len(words)] if words else 'this'}?",
+            "answer": f"It is described in the text ({i + 1}).",
+            "difficulty": ("easy", "medium", "hard")[i % 3],
+        } for i in range(count)]
@@ -0,0 +1,98 @@
+"""Check how long the server and CLIs take to import.
+
+Run from this directory:
+
+    python import_budget.py
+    python import_budget.py --module batch --budget 600 --repeat 5
+
+Each module is imported in a fresh interpreter with `python -X importtime`. The command
+fails (exit status 1) when the median import time is over budget or a heavy dependency
+that should only load on first use (the Groq SDK, pypdf, the OCR libraries) was imported.
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from typing import List, Dict, Any
+
+# Milliseconds. The API's floor is FastAPI itself, which takes about half a second.
+BUDGETS = {"api": 900, "batch": 400, "model": 300}
+LAZY_MODULES = ("groq", "httpx", "pypdf", "pytesseract", "pdf2image", "PIL")
+
+
+def measure_import(module: str) -> Dict[str, Any]:
+    """Import `module` in a new interpreter and return its import time profile.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        Dict[str, Any]: The total import time in milliseconds, the time spent in each package
+            imported directly by `module` and every top-level package that was imported.
+    """
+    # A missing key must not matter: clients are created on first use.
+    env = dict(os.environ, GROQ_API_KEY=os.getenv("GROQ_API_KEY", ""))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise Exception(f"import {module} failed:\n{result.stderr}")
+    packages: Dict[str, float] = {}
+    imported = set()
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # The header row.
+        # Nesting is shown by indentation: two spaces per level after the first.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        milliseconds = int(cumulative) / 1000
+        imported.add(name.split(".")[0])
+        if depth == 0 and name == module:
+            total = milliseconds
+        elif depth == 1:
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + milliseconds
+    return {"total": total, "packages": packages, "imported": imported}
+
+
+def check_module(module: str, budget: float, repeat: int) -> List[str]:
+    """Measure `module` `repeat` times and return the budget violations."""
+    runs = [measure_import(module) for _ in range(repeat)]
+    total = statistics.median(run["total"] for run in runs)
+    imported = set().union(*(run["imported"] for run in runs))
+    slowest = sorted(runs[0]["packages"].items(), key=lambda item: item[1], reverse=True)[:5]
+    print(f"{module}: {total:.0f} ms (budget {budget:.0f} ms); slowest: "
+          + ", ".join(f"{name} {milliseconds:.0f} ms" for name, milliseconds in slowest))
+
+    problems = []
+    if total > budget:
+        problems.append(f"{module} takes {total:.0f} ms to import, over its {budget:.0f} ms budget")
+    for name in LAZY_MODULES:
+        if name in imported:
+            problems.append(f"{module} imports {name} eagerly")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time budgets of the server and CLIs.")
+    parser.add_argument("--module", nargs="+", default=list(BUDGETS), help="Modules to check.")
+    parser.add_argument("--budget", type=float, default=None,
+                        help="Budget in milliseconds for every module, instead of the defaults.")
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per module; the median is checked.")
+    args = parser.parse_args()
+
+    problems = []
+    for module in args.module:
+        budget = args.budget if args.budget is not None else BUDGETS.get(module, 300)
+        problems.extend(check_module(module, budget, args.repeat))
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Job:
+    """A flash card generation job.
+
+    The job's status, progress events and cards live in its JobStore, so a job started by one
+    server process can be followed from any other process sharing the store.
+    """
+    id: str
+    filename: str
+    store: "JobStore" = field(repr=False)
+
+    @property
+    def status(self) -> str:
+        return self.store._status(self.id)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def cards(self) -> List[Dict[str, Any]]:
+        return self.store._cards(self.id)
+
+    def report(self, event: Dict[str, Any]):
+        """Record a progress event. Safe to call from worker threads.
+
+        Args:
+            event (Dict[str, Any]): The event, with at least a 'stage' field.
+        """
+        self.store._append(self.id, event)
+
+    def finish(self, cards: List[Dict[str, Any]], deck: Optional[str] = None):
+        self.store._append(self.id, {"stage": "done", "num_cards": len(cards), "deck": deck},
+                           status="done", cards=cards, deck=deck)
+
+    def fail(self, error: str):
+        self.store._append(self.id, {"stage": "error", "detail": error}, status="failed", error=error)
+
+    def events_since(self, index: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Return the events recorded after `index` and whether the job has finished.
+
+        Args:
+            index (int): The number of events the caller has already seen.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], bool]: The new events and the finished flag.
+        """
+        return self.store._events_since(self.id, index)
+
+    def to_json(self) -> Dict[str, Any]:
+        return self.store._to_json(self.id)
+
+
+class JobStore:
+    """Registry of jobs in a SQLite file. Finished jobs are dropped after `ttl` seconds.
+
+    Every server worker process opens the same file, so whichever worker receives a status
+    or event request sees the job no matter which one runs it. Without a path the jobs are
+    kept in memory and only visible to this process.
+
+    A job whose worker died never finishes on its own; once it has reported nothing for
+    `stale_after` seconds it is failed, so it is purged like any other.
+    """
+
+    def __init__(self, ttl: int = 3600, path: Optional[str] = None, stale_after: int = 900):
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.path = path
+        self._lock = threading.Lock()
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Other processes may hold the write lock briefly; wait for it rather than failing.
+        self._conn = sqlite3.connect(path or ":memory:", timeout=30, check_same_thread=False)
+        if path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                filename TEXT,
+                status TEXT NOT NULL,
+                cards TEXT,
+                deck TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL,
+                finished_at REAL
+            )""")
+        # Stores created before updated_at existed.
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "updated_at" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN updated_at REAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                stage TEXT,
+                event TEXT NOT NULL,
+                PRIMARY KEY (job_id, position)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+        self._conn.commit()
+
+    def create(self, filename: str) -> Job:
+        self.purge()
+        job = Job(id=uuid.uuid4().hex, filename=filename, store=self)
+        with self._lock, self._conn:
+            now = time.time()
+            self._conn.execute("INSERT INTO jobs (id, filename, status, created_at, updated_at) "
+                               "VALUES (?, ?, 'queued', ?, ?)", (job.id, filename, now, now))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT filename FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(id=job_id, filename=row[0], store=self) if row is not None else None
+
+    def purge(self):
+        self.fail_unfinished("Job stopped responding", idle_for=self.stale_after)
+        expired = time.time() - self.ttl
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM job_events WHERE job_id IN "
+                               "(SELECT id FROM jobs WHERE finished_at < ?)", (expired,))
+            self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (expired,))
+
+    def fail_unfinished(self, error: str, job_ids: Optional[List[str]] = None,
+                        idle_for: Optional[float] = None) -> int:
+        """Fail queued and running jobs, recording an error event for each.
+
+        Args:
+            error (str): The error reported to the jobs' clients.
+            job_ids (Optional[List[str]]): Only these jobs; None for all of them.
+            idle_for (Optional[float]): Only jobs that have reported nothing for this many seconds.
+
+        Returns:
+            int: The number of jobs failed.
+        """
+        query = "SELECT id FROM jobs WHERE status IN ('queued', 'running')"
+        params: List[Any] = []
+        if job_ids is not None:
+            query += f" AND id IN ({', '.join('?' * len(job_ids))})"
+            params += job_ids
+        if idle_for is not None:
+            query += " AND COALESCE(updated_at, created_at) < ?"
+            params.append(time.time() - idle_for)
+        with self._lock:
+            stuck = [job_id for job_id, in self._conn.execute(query, params).fetchall()]
+        for job_id in stuck:
+            self._append(job_id, {"stage": "error", "detail": error}, status="failed", error=error)
+        return len(stuck)
+
+    def _append(self, job_id: str, event: Dict[str, Any], status: Optional[str] = None,
+                cards: Optional[List[Dict[str, Any]]] = None, deck: Optional[str] = None,
+                error: Optional[str] = None):
+        # The event and the status change are committed together, so readers never see one without the other.
+        # A finished job takes no more events, e.g. from a worker that turns up after the job was
+        # failed as stale; the check is part of the insert, so no other process can slip in between.
+        with self._lock, self._conn:
+            inserted = self._conn.execute(
+                "INSERT INTO job_events (job_id, position, stage, event) "
+                "SELECT ?, (SELECT COUNT(*) FROM job_events WHERE job_id = ?), ?, ? FROM jobs "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (job_id, job_id, event.get("stage"), json.dumps(event, ensure_ascii=False), job_id)).rowcount
+            if not inserted:
+                return
+            now = time.time()
+            if status is None:
+                self._conn.execute("UPDATE jobs SET status = 'running', updated_at = ? "
+                                   "WHERE id = ? AND status IN ('queued', 'running')", (now, job_id))
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, cards = ?, deck = ?, error = ?, updated_at = ?, finished_at = ? "
+                    "WHERE id = ? AND status IN ('queued', 'running')",
+                    (status, json.dumps(cards, ensure_ascii=False) if cards is not None else None, deck, error,
+                     now, now, job_id))
+
+    def _status(self, job_id: str) -> str:
+        with self._lock:
+            return self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+    def _cards(self, job_id: str) -> List[Dict[str, Any]]:
+        # The final deck once finished; until then, the cards reported so far.
+        with self._lock:
+            row = self._conn.execute("SELECT cards FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row[0] is not None:
+                return json.loads(row[0])
+            rows = self._conn.execute("SELECT event FROM job_events WHERE job_id = ? AND stage = 'card' "
+                                      "ORDER BY position", (job_id,)).fetchall()
+        # Later events for the same index replace or remove the card.
+        cards: Dict[int, Dict[str, Any]] = {}
+        for event, in rows:
+            event = json.loads(event)
+            if event.get("removed"):
+                cards.pop(event["index"], None)
+            else:
+                cards[event["index"]] = event["card"]
+        return [cards[index] for index in sorted(cards)]
+
+    def _events_since(self, job_id: str, index: int) -> Tuple[List[Dict[str, Any]], bool]:
+        with self._lock:
+            # The status is read first: the final event is committed with it, so a finished
+            # job's events are all returned.
+            status = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            rows = self._conn.execute("SELECT event FROM job_events WHERE job_id = ? AND position >= ? "
+                                      "ORDER BY position", (job_id, index)).fetchall()
+        return [json.loads(event) for event, in rows], status in ("done", "failed")
+
+    def _to_json(self, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            filename, status, deck, error = self._conn.execute(
+                "SELECT filename, status, deck, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            row = self._conn.execute("SELECT event FROM job_events WHERE job_id = ? ORDER BY position DESC LIMIT 1",
+                                     (job_id,)).fetchone()
+        return {
+            "job_id": job_id,
+            "filename": filename,
+            "status": status,
+            "progress": json.loads(row[0]) if row is not None else None,
+            "flashcards": self._cards(job_id),
+            "deck": deck,
+            "error": error,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,144 @@
+import json
+from typing import List, Any, Optional
+
+
+class JsonArrayStream:
+    """Incrementally pull the elements out of a JSON array as model output arrives.
+
+    The array is either the first one in the text or, with `key`, the value of the first
+    "key": [...] member at any depth. An array that closes without a single valid element,
+    such as "[note]" in prose before the JSON, is passed over for the next one. Each element is decoded on its own as soon as it is
+    complete, so text around the JSON, a malformed element or a truncated tail only costs
+    the elements it touches instead of the whole response.
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.items: List[Any] = []
+        # Elements that were complete but not valid JSON.
+        self.skipped = 0
+        # True once an array has been opened / the target array has been closed.
+        self.found = False
+        self.complete = False
+        # Whether the scan is inside the candidate array, and the skipped count when it opened.
+        self._open = False
+        self._skipped_before = 0
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._array_depth = None
+        self._element_start = None
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._key_pending = False
+
+    def feed(self, text: str) -> List[Any]:
+        """Add more output and return the elements it completed.
+
+        Args:
+            text (str): The next piece of the response.
+
+        Returns:
+            List[Any]: The newly decoded elements, in order.
+        """
+        start = len(self.items)
+        self._buffer += text
+        while self._pos < len(self._buffer) and not self.complete:
+            self._step(self._buffer[self._pos])
+            self._pos += 1
+        # Everything before the current element has been consumed.
+        keep = self._element_start if self._element_start is not None else self._pos
+        if self._in_string and self._element_start is None:
+            keep = self._string_start
+        if keep > 0:
+            self._buffer = self._buffer[keep:]
+            self._pos -= keep
+            self._string_start -= keep
+            if self._element_start is not None:
+                self._element_start -= keep
+        return self.items[start:]
+
+    def _step(self, char: str):
+        pos = self._pos
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if not self._open:
+                    self._last_string = self._buffer[self._string_start + 1:pos]
+            return
+        if char == '"':
+            self._in_string = True
+            self._string_start = pos
+            self._key_pending = False
+            if self._open and self._depth == self._array_depth and self._element_start is None:
+                self._element_start = pos
+            return
+        if char.isspace():
+            return
+
+        if not self._open:
+            if char == "[" and (self.key is None or self._key_pending):
+                self._depth += 1
+                self._array_depth = self._depth
+                self.found = self._open = True
+                self._skipped_before = self.skipped
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+            self._key_pending = char == ":" and self.key is not None and self._last_string == self.key
+            return
+
+        if self._depth == self._array_depth:
+            if char in ",]":
+                if self._element_start is not None:
+                    self._emit(self._buffer[self._element_start:pos])
+                if char == "]":
+                    self._depth -= 1
+                    if self.items:
+                        self.complete = True
+                    else:
+                        # Nothing usable: prose in brackets rather than the JSON. Keep looking.
+                        self._open = False
+                        self._array_depth = None
+                        self._key_pending = False
+                        self.skipped = self._skipped_before
+            elif char in "{[":
+                self._element_start = pos
+                self._depth += 1
+            elif self._element_start is None:
+                self._element_start = pos
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+            if self._depth == self._array_depth:
+                self._emit(self._buffer[self._element_start:pos + 1])
+
+    def _emit(self, text: str):
+        self._element_start = None
+        try:
+            self.items.append(json.loads(text))
+        except json.JSONDecodeError:
+            self.skipped += 1
+
+
+def parse_json_items(text: str, key: Optional[str] = None) -> List[Any]:
+    """Recover every valid element of a JSON array from a complete, possibly damaged response.
+
+    Args:
+        text (str): The model output.
+        key (str): Read the array stored under this key instead of the first array.
+
+    Returns:
+        List[Any]: The elements that could be decoded.
+    """
+    stream = JsonArrayStream(key)
+    stream.feed(text)
+    return stream.items
@@ -0,0 +1,107 @@
+import re
+from typing import Dict, List, Optional, Iterable
+
+# Languages that can be detected, with their Tesseract language packs.
+TESSERACT_CODES = {
+    "english": "eng",
+    "italian": "ita",
+    "french": "fra",
+    "spanish": "spa",
+    "german": "deu",
+    "portuguese": "por",
+    "russian": "rus",
+    "greek": "ell",
+}
+
+# Scanned documents are expected in any of these unless configured otherwise; ReadDocs only
+# uses those whose Tesseract pack is installed, so a host with just English still works.
+DEFAULT_OCR_LANGUAGES = ["english", "italian", "french", "spanish", "german", "portuguese"]
+
+# The most frequent function words of each Latin-script language. Content words are left out:
+# they are shared across languages far more often than articles and prepositions.
+STOPWORDS = {
+    "english": set("the of and to in is that it was for on are as with by this be at from or which an were not "
+                   "have has had but their they its been also".split()),
+    "italian": set("il lo la gli le di che è e un una per non con del della dei delle sono nel nella al alla "
+                   "anche come più ma si da degli questo".split()),
+    "french": set("le la les de des du et est un une que qui dans pour pas sur au aux avec ce cette sont par "
+                  "plus ou il elle ne se".split()),
+    "spanish": set("el la los las de del y que en un una es por con para no se al lo como más pero sus su "
+                   "fue son este esta".split()),
+    "german": set("der die das und ist nicht ein eine zu den von mit sich des auf für im dem auch es an als "
+                  "wurde sind werden aus bei".split()),
+    "portuguese": set("o a os as de do da dos das e que em um uma para com não por se na no mais como foi "
+                      "ao pelo pela são".split()),
+}
+
+# Non-Latin scripts identify the language on their own.
+SCRIPTS = [
+    ("russian", re.compile(r"[Ѐ-ӿ]")),
+    ("greek", re.compile(r"[Ͱ-Ͽ]")),
+]
+WORD = re.compile(r"[^\W\d_]+")
+
+
+def detect_language(text: str, min_words: int = 8, max_chars: int = 20000) -> Optional[str]:
+    """Guess the language of a text from its script and its most common words.
+
+    Cheap enough to run on every page: one pass over the words, no models.
+
+    Args:
+        text (str): The text, e.g. one page.
+        min_words (int): The number of stopwords needed for a confident guess.
+        max_chars (int): Only the start of longer texts is looked at.
+
+    Returns:
+        Optional[str]: The language name (a key of TESSERACT_CODES), or None if unsure.
+    """
+    text = text[:max_chars]
+    letters = sum(1 for char in text if char.isalpha())
+    if letters == 0:
+        return None
+    for language, pattern in SCRIPTS:
+        if len(pattern.findall(text)) > letters / 2:
+            return language
+    counts = {language: 0 for language in STOPWORDS}
+    for word in WORD.findall(text.lower()):
+        for language, words in STOPWORDS.items():
+            if word in words:
+                counts[language] += 1
+    ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    (best, hits), (_, runner_up) = ranked[0], ranked[1]
+    # Short stopwords such as "de" or "a" are shared; require a clear winner.
+    if hits < min_words or hits < 1.3 * runner_up:
+        return None
+    return best
+
+
+def document_language(pages: Iterable) -> Optional[str]:
+    """Return the language of most of the text of a document.
+
+    Args:
+        pages (Iterable): Pages with `language` and `text` attributes, e.g. PageText.
+
+    Returns:
+        Optional[str]: The language covering the most characters, or None if no page was recognized.
+    """
+    chars: Dict[str, int] = {}
+    for page in pages:
+        if page.language is not None:
+            chars[page.language] = chars.get(page.language, 0) + len(page.text)
+    return max(chars, key=chars.get) if chars else None
+
+
+def tesseract_languages(languages: List[str]) -> str:
+    """Join language names into a Tesseract language argument such as 'eng+ita'."""
+    return "+".join(TESSERACT_CODES[language] for language in languages)
+
+
+def resolve_target(requested: Optional[str], source: Optional[str]) -> str:
+    """Pick the language the cards are written in.
+
+    "auto" (or nothing) means the language of the document, falling back to English.
+    """
+    requested = (requested or "auto").lower()
+    if requested == "auto":
+        return source or "english"
+    return requested
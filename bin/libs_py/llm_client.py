@@ -0,0 +1,219 @@
+import sys
+import time
+import random
+import threading
+from concurrent.futures import Future
+from typing import List, Dict, Optional, Any, Callable
+
+from cache import ResponseCache
+from chunking import estimate_tokens
+from metrics import LLM_REQUESTS, LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_RETRIES, LLM_COALESCED
+
+
+def rate_limit_errors() -> tuple:
+    """Return the errors the backends raise when their rate limit is exceeded.
+
+    The groq errors are only included once the groq SDK has been imported, which
+    backends.make_client does for the Groq client: only that client raises them, and other
+    backends must work without the SDK installed.
+    """
+    from backends import BackendRateLimitError
+    groq = sys.modules.get("groq")
+    return (BackendRateLimitError,) + ((groq.RateLimitError,) if groq is not None else ())
+
+
+def retryable_errors() -> tuple:
+    """Return the backend errors worth retrying: rate limits, server errors and network failures."""
+    import httpx
+    from backends import BackendServerError
+    groq = sys.modules.get("groq")
+    groq_errors = (groq.InternalServerError, groq.APIConnectionError, groq.APITimeoutError) if groq is not None else ()
+    return rate_limit_errors() + groq_errors + (BackendServerError, httpx.TransportError)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: int = 1):
+        """Block until `amount` units are available and take them.
+
+        Requests larger than the whole bucket are let through once it is full, leaving it
+        in debt, so that one oversized prompt cannot wait forever.
+
+        Args:
+            amount (int): The number of units to take.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                needed = min(amount, self.capacity)
+                if now >= self.paused_until and self.level >= needed:
+                    self.level -= amount
+                    return
+                wait = max(self.paused_until - now, (needed - self.level) / self.rate)
+            time.sleep(wait)
+
+    def adjust(self, amount: int):
+        """Take (positive) or give back (negative) units once the real cost is known."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level - amount)
+
+    def pause(self, seconds: float):
+        """Hold every caller back for `seconds`, e.g. after the server answered 429."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimitedClient:
+    """Chat completions of one LLM backend, shared by every request in the process.
+
+    Requests are admitted through request-per-minute and token-per-minute buckets, retried
+    with jittered exponential backoff (honoring Retry-After on 429s), and identical prompts
+    that are already in flight are answered by a single request.
+    """
+
+    def __init__(self, client=None, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_completion_tokens: int = 1024, base_delay: float = 1.0, max_delay: float = 60.0,
+                 client_factory: Optional[Callable[[], Any]] = None):
+        # Without a client, `client_factory` creates one for the first request, so building
+        # this object neither imports the SDK nor needs credentials.
+        self._client = client
+        self.client_factory = client_factory
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        # Charged up front for the response; corrected once the real usage is known.
+        self.max_completion_tokens = max_completion_tokens
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "coalesced": 0, "tokens": 0}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            if self.client_factory is None:
+                raise ValueError("RateLimitedClient needs a client or a client_factory")
+            self._client = self.client_factory()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def complete(self, model: str, messages: List[Dict[str, str]], temperature: float, max_attempts: int = 3,
+                 response_format: Optional[Dict[str, Any]] = None) -> str:
+        """Return the completion for `messages`, sharing the request with identical concurrent calls.
+
+        Args:
+            model (str): The model name.
+            messages (List[Dict[str, str]]): The chat messages.
+            temperature (float): The sampling temperature.
+            max_attempts (int): The number of attempts before giving up.
+            response_format (Dict[str, Any]): Structured output format passed to the API, e.g. a JSON schema.
+
+        Returns:
+            str: The generated content.
+        """
+        key = ResponseCache.make_key(model, messages, temperature, response_format)
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.stats["coalesced"] += 1
+                LLM_COALESCED.inc()
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(self._complete_with_retry(model, messages, temperature, max_attempts, response_format))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def _complete_with_retry(self, model: str, messages: List[Dict[str, str]], temperature: float,
+                             max_attempts: int, response_format: Optional[Dict[str, Any]] = None) -> str:
+        # Only sent when set, so clients without structured output support keep working.
+        options = {"response_format": response_format} if response_format is not None else {}
+        estimated = sum(estimate_tokens(message["content"]) for message in messages) + self.max_completion_tokens
+        for attempt in range(max_attempts):
+            if self.request_bucket:
+                self.request_bucket.acquire()
+            if self.token_bucket:
+                self.token_bucket.acquire(estimated)
+            try:
+                self._count("requests")
+                with LLM_REQUEST_SECONDS.time():
+                    completion = self.client.chat.completions.create(
+                        messages=messages,
+                        model=model,
+                        temperature=temperature,
+                        **options,
+                    )
+            except retryable_errors() as e:
+                LLM_REQUESTS.inc(status="error")
+                if attempt == max_attempts - 1:
+                    raise
+                self._count("retries")
+                LLM_RETRIES.inc(reason=type(e).__name__)
+                delay = self._retry_delay(e, attempt)
+                if isinstance(e, rate_limit_errors()):
+                    self._count("rate_limited")
+                    # Everyone is over the limit, not just this request.
+                    for bucket in (self.request_bucket, self.token_bucket):
+                        if bucket:
+                            bucket.pause(delay)
+                time.sleep(delay)
+                continue
+            except Exception:
+                LLM_REQUESTS.inc(status="error")
+                raise
+
+            LLM_REQUESTS.inc(status="ok")
+            usage = getattr(completion, "usage", None)
+            if usage is not None and usage.total_tokens is not None:
+                self._count("tokens", usage.total_tokens)
+                LLM_TOKENS.inc(usage.prompt_tokens or 0, kind="prompt")
+                LLM_TOKENS.inc(usage.completion_tokens or 0, kind="completion")
+                if self.token_bucket:
+                    self.token_bucket.adjust(usage.total_tokens - estimated)
+            return completion.choices[0].message.content
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        # Full jitter keeps concurrent retries from arriving in lockstep.
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,180 @@
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Tuple, Callable, Optional, Sequence
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self.values.items()]
+
+
+class Gauge(Metric):
+    """A value that is either set directly or read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple, float] = {}
+        self.functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        with self._lock:
+            self.functions[self._key(labels)] = function
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self.values)
+            functions = dict(self.functions)
+        values.update({key: function() for key, function in functions.items()})
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self.values: Dict[Tuple, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self.values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        # Added to every sample, e.g. {"worker": "1234"}: each server process has its own
+        # registry, and without it series from different workers would be mixed up.
+        self.labels: Dict[str, str] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        if self.labels:
+            extra = _format_labels(tuple(self.labels), tuple(self.labels.values()))[1:-1]
+            lines = [line if line.startswith("#") else _add_labels(line, extra) for line in lines]
+        return "\n".join(lines) + "\n"
+
+
+def _add_labels(sample: str, labels: str) -> str:
+    name, rest = sample.split(" ", 1)
+    if name.endswith("}"):
+        return f"{name[:-1]},{labels}}} {rest}"
+    return f"{name}{{{labels}}} {rest}"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "flashcards_stage_seconds", "Time spent in each pipeline stage.", ["stage"]))
+PAGES = REGISTRY.register(Counter(
+    "flashcards_pages_total", "PDF pages read, by extraction method.", ["method"]))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "flashcards_llm_requests_total", "Requests sent to the LLM backend.", ["status"]))
+LLM_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "flashcards_llm_request_seconds", "Latency of single LLM requests, excluding rate limiting."))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "flashcards_llm_tokens_total", "Tokens reported by the LLM backend.", ["kind"]))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "flashcards_llm_retries_total", "LLM requests retried, by cause.", ["reason"]))
+LLM_COALESCED = REGISTRY.register(Counter(
+    "flashcards_llm_coalesced_total", "LLM calls answered by an identical in-flight request."))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "flashcards_cache_requests_total", "Cache lookups, by cache and result.", ["cache", "result"]))
+POOL_PENDING = REGISTRY.register(Gauge(
+    "flashcards_pool_pending", "Jobs queued or running in each worker pool.", ["pool"]))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "flashcards_http_request_seconds", "HTTP request latency.", ["method", "path", "status"]))
+
+
+def timed(stage: str, histogram: Optional[Histogram] = None):
+    """Decorator recording the duration of every call under `stage`."""
+    histogram = histogram or STAGE_SECONDS
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(stage=stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
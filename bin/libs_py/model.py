@@ -1,12 +1,154 @@
 import os
+import re
+import copy
 import json
-from typing import List, Dict, Optional
-from dataclasses import dataclass
-from groq import Groq
-from pypdf import PdfReader
-import pytesseract
-from pdf2image import convert_from_path
-import pytesseract
+import hashlib
+import functools
+import threading
+import multiprocessing
+from collections import deque, Counter
+from typing import List, Dict, Optional, Any, Callable, Iterator, Tuple, Union, TYPE_CHECKING
+from dataclasses import dataclass, replace
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from chunking import chunk_text, allocate_cards, group_chunks, split_sections, section_hash
+from json_stream import parse_json_items, JsonArrayStream
+from dedup import deduplicate, shingles
+from quality import review_cards, card_issues, auto_num_cards
+from cache import ResponseCache
+from llm_client import RateLimitedClient
+from backends import BACKENDS, make_client
+from metrics import timed, PAGES
+from ocr_preprocess import OcrPreset, PRESETS, DEFAULT_PRESET, get_preset, preprocess
+from language import detect_language, tesseract_languages, TESSERACT_CODES, DEFAULT_OCR_LANGUAGES
+
+# The LLM SDKs, pypdf, pytesseract and pdf2image are imported where they are used: together they
+# take most of a second to import, and many processes (the API before its first upload,
+# OCR workers, the CLIs) never need some of them.
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+
+# Receives progress events such as {"stage": "ocr", "page": 3, "pages": 10}.
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class CardStream:
+    """Reports cards through a progress callback as soon as they exist, and again when they change.
+
+    Every card gets a stable 'index' on its first {"stage": "card"} event. Later events with the
+    same index replace it ("update": true), e.g. once it is translated, or remove it
+    ("removed": true), e.g. when it turns out to be a duplicate. Cards are identified by any
+    hashable key chosen by the caller.
+    """
+
+    def __init__(self, on_progress: ProgressCallback):
+        self.on_progress = on_progress
+        self._indices: Dict[Any, int] = {}
+        self._sent: Dict[Any, Dict[str, Any]] = {}
+
+    def add(self, key, card: Dict[str, Any]):
+        self._indices[key] = len(self._indices)
+        self._sent[key] = card
+        self.on_progress({"stage": "card", "index": self._indices[key], "card": card})
+
+    def update(self, key, card: Dict[str, Any]):
+        """Send `card` in place of the card sent under `key`, unless only its section differs."""
+        if key not in self._indices:
+            self.add(key, card)
+            return
+        previous = self._sent[key]
+        if {**previous, "section": None} == {**card, "section": None}:
+            return
+        self._sent[key] = card
+        self.on_progress({"stage": "card", "index": self._indices[key], "card": card, "update": True})
+
+    def remove(self, key):
+        if self._sent.pop(key, None) is not None:
+            self.on_progress({"stage": "card", "index": self._indices[key], "removed": True})
+
+    def clear(self):
+        for key in list(self._sent):
+            self.remove(key)
+
+# The LLM calls that can be routed to their own model (GenerationSettings.stage_models).
+# Categorizing, extracting concepts and summarizing are easy enough for a small fast model;
+# the cards themselves benefit from a stronger one.
+STAGES = ("categorize", "concepts", "summarize", "qa_pairs", "generate_cards", "analyze_chunk", "translate",
+          "translate_cards")
+
+CATEGORIES = ["History", "Science", "Math", "Literature", "Art", "Technology", "Biology", "Chemistry", "Physics",
+              "Geography"]
+
+# Shape of the single response used by fused generation. Cards come last so a truncated
+# response still carries the category and concepts.
+FUSED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "category": {"type": "string", "enum": CATEGORIES},
+        "key_concepts": {"type": "array", "items": {"type": "string"}},
+        "cards": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "answer": {"type": "string"},
+                    "difficulty": {"type": "string", "enum": ["easy", "medium", "hard"]},
+                },
+                "required": ["question", "answer", "difficulty"],
+            },
+        },
+    },
+    "required": ["category", "key_concepts", "cards"],
+}
+FUSED_CATEGORY = re.compile(r'"category"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def parse_json_array(response: str) -> list:
+    """Parse a JSON array from an LLM response, ignoring any text around it.
+
+    A response that is not valid JSON as a whole still yields every element that is,
+    so one malformed or truncated card does not cost the rest.
+
+    Args:
+        response (str): The raw model output.
+
+    Returns:
+        list: The parsed array.
+
+    Raises:
+        json.JSONDecodeError: If no JSON array can be found.
+    """
+    try:
+        result = json.loads(response)
+        if isinstance(result, list):
+            return result
+    except json.JSONDecodeError:
+        pass
+    stream = JsonArrayStream()
+    stream.feed(response)
+    if not stream.found:
+        raise json.JSONDecodeError("Expected a JSON array", response, 0)
+    return stream.items
+
+
+def valid_cards(items: list) -> List[Dict[str, str]]:
+    """Keep the parsed cards that have a non-empty question and answer.
+
+    Args:
+        items (list): Parsed elements of a card array.
+
+    Returns:
+        List[Dict[str, str]]: The usable cards.
+    """
+    cards = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        question, answer = item.get('question'), item.get('answer')
+        if isinstance(question, str) and isinstance(answer, str) and question.strip() and answer.strip():
+            cards.append(item)
+    return cards
 
 
 @dataclass
@@ -15,39 +157,129 @@ class FlashCard:
     answer: str
     category: Optional[str] = None
     difficulty: Optional[str] = None
+    # Hash of the document section the card was generated from.
+    section: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class GenerationSettings:
+    """How AnalyzeDocs generates cards. Frozen, so a generation in progress cannot be changed under it."""
+    target_language: str = "english"
+    model: str = "mixtral-8x7b-32768"
+    temperature: float = 0.7
+    # Upper bound on the document text sent in a single request.
+    chunk_tokens: int = 8000
+    # Fused mode asks for category, concepts and cards in one request per chunk instead
+    # of four. `structured_output` constrains that response: "json_schema" sends
+    # FUSED_SCHEMA, "json_object" only asks for JSON, None relies on the prompt alone.
+    fused: bool = False
+    structured_output: Optional[str] = "json_schema"
+    # Cards whose question is at least this similar to an earlier card's, with a matching
+    # answer (see dedup.deduplicate), are dropped before translation and replaced where
+    # possible; None keeps every card.
+    dedup_threshold: Optional[float] = 0.6
+    # Check the cards locally and regenerate those that fail (see quality.py).
+    quality_check: bool = True
+    # Model per stage (see STAGES), e.g. {"categorize": "llama-3.1-8b-instant"}; the other
+    # stages use `model`. Kept as sorted (stage, model) pairs so the settings stay hashable.
+    stage_models: Tuple[Tuple[str, str], ...] = ()
+
+    def __post_init__(self):
+        if self.structured_output not in ("json_schema", "json_object", None):
+            raise ValueError(f"Unsupported structured output mode: {self.structured_output}")
+        stage_models = dict(self.stage_models)
+        unknown = set(stage_models) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}. Use any of: {', '.join(STAGES)}")
+        object.__setattr__(self, "target_language", self.target_language.lower())
+        object.__setattr__(self, "stage_models", tuple(sorted(stage_models.items())))
+
+    def model_for(self, stage: Optional[str]) -> str:
+        """Return the model that runs `stage`."""
+        return dict(self.stage_models).get(stage, self.model)
 
 
 class AnalyzeDocs:
-    def __init__(self, target_language="english", model="mixtral-8x7b-32768"):
-        self.target_language = target_language.lower()
-        self.model = model
-        self.client_groq = Groq(api_key=os.getenv("GROQ_API_KEY"))
-        if not os.getenv("GROQ_API_KEY"):
-            raise ValueError("GROQ_API_KEY environment variable not set")
+    def __init__(self, target_language="english", model="mixtral-8x7b-32768", max_workers: int = 4,
+                 chunk_tokens: int = 8000, cache: Optional[ResponseCache] = None,
+                 requests_per_minute: int = 0, tokens_per_minute: int = 0, client=None,
+                 fused: bool = False, structured_output: Optional[str] = "json_schema",
+                 dedup_threshold: Optional[float] = 0.6, quality_check: bool = True, backend: str = "groq",
+                 stage_models: Optional[Dict[str, str]] = None):
+        self.settings = GenerationSettings(target_language, model, 0.7, chunk_tokens, fused, structured_output,
+                                           dedup_threshold, quality_check, tuple((stage_models or {}).items()))
+        # Responses are looked up here before calling the model; None disables caching.
+        self.cache = cache
+        # Retries are handled by RateLimitedClient, which knows about the shared rate limits.
+        # `backend` picks the client (see backends.BACKENDS); `client` replaces it entirely,
+        # e.g. with a configured fake_groq.FakeGroq for benchmarks. The client is only
+        # created for the first request.
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown LLM backend: {backend}. Use one of: {', '.join(BACKENDS)}")
+        self.llm = RateLimitedClient(client, requests_per_minute, tokens_per_minute,
+                                     client_factory=functools.partial(make_client, backend))
+        # Shared, bounded pool for independent LLM calls; the clients are thread-safe.
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="groq")
 
-    def generate_with_groq(self, messages: List[Dict[str, str]], retry_count=3) -> str:
-        """Generate content using the GROQ API with retry logic.
+    # Read-only views of the settings; use with_settings() for a variant.
+    target_language = property(lambda self: self.settings.target_language)
+    model = property(lambda self: self.settings.model)
+    temperature = property(lambda self: self.settings.temperature)
+    chunk_tokens = property(lambda self: self.settings.chunk_tokens)
+    fused = property(lambda self: self.settings.fused)
+    structured_output = property(lambda self: self.settings.structured_output)
+    dedup_threshold = property(lambda self: self.settings.dedup_threshold)
+    quality_check = property(lambda self: self.settings.quality_check)
+    stage_models = property(lambda self: self.settings.stage_models)
+
+    def with_settings(self, **changes) -> "AnalyzeDocs":
+        """Return an AnalyzeDocs with some settings changed.
+
+        The copy shares the client, rate limits, cache and thread pool with this instance, so
+        it is cheap to make one per request; neither instance affects the other's settings.
+
+        Args:
+            **changes: GenerationSettings fields to change, e.g. fused=True.
+
+        Returns:
+            AnalyzeDocs: The configured copy.
+        """
+        variant = copy.copy(self)
+        variant.settings = replace(self.settings, **changes)
+        return variant
+
+    def generate_with_groq(self, messages: List[Dict[str, str]], retry_count=3, use_cache: bool = True,
+                           response_format: Optional[Dict[str, Any]] = None, stage: Optional[str] = None) -> str:
+        """Generate content using the configured LLM backend with rate limiting and retry logic.
         
         Args:
             messages (List[Dict[str, str]]): A list of messages to send to the API.
-            retry_count (int): The number of times to retry the request.
+            retry_count (int): The number of attempts for retryable errors (429, 5xx, network).
+            use_cache (bool): Look the request up in the response cache and store the result.
+            response_format (Dict[str, Any]): Structured output format, e.g. a JSON schema.
+            stage (str): The pipeline stage making the call (see STAGES), which picks the model.
         
         Returns:
             str: The generated content.
         """
-        for attempt in range(retry_count):
-            try:
-                completion = self.client_groq.chat.completions.create(
-                    messages=messages,
-                    model=self.model,
-                    temperature=0.7,
-                )
-                return completion.choices[0].message.content
-            except Exception as e:
-                if attempt == retry_count - 1:
-                    raise Exception(f"Failed to generate content after {retry_count} attempts: {str(e)}")
-                continue
+        model = self.settings.model_for(stage)
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = ResponseCache.make_key(model, messages, self.temperature, response_format)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
 
+        try:
+            content = self.llm.complete(model, messages, self.temperature, max_attempts=retry_count,
+                                        response_format=response_format)
+        except Exception as e:
+            raise Exception(f"Failed to generate content after {retry_count} attempts: {str(e)}")
+        if cache_key is not None:
+            self.cache.set(cache_key, content)
+        return content
+
+    @timed("concepts")
     def extract_key_concepts(self, text: str) -> List[str]:
         """Extract key concepts and terminology from the text.
         
@@ -62,13 +294,14 @@ class AnalyzeDocs:
 Return the result as a JSON array of strings. Each string should be a key concept or term."""},
             {"role": "user", "content": text}
         ]
-        response = self.generate_with_groq(messages)
+        response = self.generate_with_groq(messages, stage="concepts")
         # print("Key points: ", response)
         try:
-            return json.loads(response)
+            return [concept for concept in parse_json_array(response) if isinstance(concept, str)]
         except json.JSONDecodeError:
             return []
 
+    @timed("categorize")
     def categorize_content(self, text: str) -> str:
         """Determine the subject category of the content.
         
@@ -79,15 +312,16 @@ Return the result as a JSON array of strings. Each string should be a key concep
             str: The category name.
         """
         messages = [
-            {"role": "system", "content": """Determine the main subject category of the content. 
-Choose from the following categories: History, Science, Math, Literature, Art, Technology, Biology, Chemistry, Physics, Geography.
+            {"role": "system", "content": f"""Determine the main subject category of the content. 
+Choose from the following categories: {', '.join(CATEGORIES)}.
 Return only the category name as a string."""},
             {"role": "user", "content": text}
         ]
-        response = self.generate_with_groq(messages)
+        response = self.generate_with_groq(messages, stage="categorize")
         # print("Categorized content", response)
         return response
     
+    @timed("summarize")
     def summarize_text(self, text: str) -> str:
         """Summarize long text into key points.
         
@@ -102,10 +336,11 @@ Return only the category name as a string."""},
 Return the summary as a bullet-point list. Each bullet point should be concise and capture a main idea."""},
             {"role": "user", "content": text}
         ]
-        response = self.generate_with_groq(messages)
+        response = self.generate_with_groq(messages, stage="summarize")
         # print("Summarization: ", response)
         return response
         
+    @timed("qa_pairs")
     def generate_qa_pairs(self, summary: str) -> List[Dict[str, str]]:
         """Generate relevant Q&A pairs from the summary.
         
@@ -121,89 +356,553 @@ Return the result as a JSON array. Each object in the array should have 'questio
 The questions should be clear and the answers should be concise."""},
             {"role": "user", "content": summary}
         ]
-        response = self.generate_with_groq(messages)
+        response = self.generate_with_groq(messages, stage="qa_pairs")
         # print("QA generation: ", response)
         try:
-            response = response.strip()
-            if not response.startswith('['):
-                response = response[response.find('['):]
-            if not response.endswith(']'):
-                response = response[:response.rfind(']')+1]
-            return json.loads(response)
+            return parse_json_array(response)
         except json.JSONDecodeError:
             print("Warning: Could not parse JSON response. Returning empty list.")
             return []
         
-    def translate_content(self, content: str) -> str:
+    @timed("translate")
+    def translate_content(self, content: str, language: Optional[str] = None) -> str:
         """Translate content to target language.
         
         Args:
             content (str): The content to translate.
+            language (str): The language to translate to. Defaults to the instance's target language.
         
         Returns:
             str: The translated content.
         """
-        if self.target_language.lower() == "english":
+        language = (language or self.target_language).lower()
+        if language == "english":
             return content
 
         messages = [
-            {"role": "system", "content": f"""Translate the following text to {self.target_language}. 
+            {"role": "system", "content": f"""Translate the following text to {language}. 
 Maintain any technical terms and ensure the translation is appropriate for a school context. 
 Return only the translated text."""},
             {"role": "user", "content": content}
         ]
-        result = self.generate_with_groq(messages)
+        result = self.generate_with_groq(messages, stage="translate")
         return result
 
-    def process_document(self, text: str, num_cards: int = 3) -> List[FlashCard]:
-        """Process document and generate flash cards with difficulty levels and categories.
+    @timed("translate_cards")
+    def translate_cards(self, qa_pairs: List[Dict[str, str]], max_chars: int = 4000,
+                        language: Optional[str] = None) -> List[Dict[str, str]]:
+        """Translate the questions and answers of a whole deck in batched requests.
+
+        Cards are sent as a JSON array of {"id", "question", "answer"} objects, split into
+        chunks of at most `max_chars` characters, and the results are mapped back by id.
+        Cards missing from a garbled or partial response are translated one field at a time.
+
+        Args:
+            qa_pairs (List[Dict[str, str]]): Objects with 'question' and 'answer' fields.
+            max_chars (int): The maximum size of the card payload sent in a single request.
+            language (str): The language to translate to. Defaults to the instance's target language.
+
+        Returns:
+            List[Dict[str, str]]: Copies of the input objects with translated 'question' and 'answer'.
+        """
+        language = (language or self.target_language).lower()
+        if language == "english":
+            return qa_pairs
+
+        chunks, current, size = [], [], 0
+        for idx, qa in enumerate(qa_pairs):
+            item = {"id": idx, "question": qa['question'], "answer": qa['answer']}
+            item_size = len(json.dumps(item, ensure_ascii=False))
+            if current and size + item_size > max_chars:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(item)
+            size += item_size
+        if current:
+            chunks.append(current)
+
+        translated = {}
+        for result in self.executor.map(self._translate_chunk, chunks, [language] * len(chunks)):
+            translated.update(result)
+
+        output = []
+        for idx, qa in enumerate(qa_pairs):
+            item = dict(qa)
+            if idx in translated:
+                item['question'], item['answer'] = translated[idx]
+            else:
+                item['question'] = self.translate_content(qa['question'], language)
+                item['answer'] = self.translate_content(qa['answer'], language)
+            output.append(item)
+        return output
+
+    def _translate_chunk(self, chunk: List[Dict[str, str]], language: str) -> Dict[int, tuple]:
+        messages = [
+            {"role": "system", "content": f"""Translate the 'question' and 'answer' fields of every object in the following JSON array to {language}. 
+Maintain any technical terms and ensure the translation is appropriate for a school context. 
+Keep the 'id' field unchanged and return only the JSON array."""},
+            {"role": "user", "content": json.dumps(chunk, ensure_ascii=False)}
+        ]
+        try:
+            items = parse_json_array(self.generate_with_groq(messages, stage="translate_cards"))
+        except Exception as e:
+            print(f"Warning: batched translation failed: {e}")
+            return {}
+
+        expected = {item['id'] for item in chunk}
+        result = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            idx, question, answer = item.get('id'), item.get('question'), item.get('answer')
+            if idx in expected and isinstance(question, str) and isinstance(answer, str) and question and answer:
+                result[idx] = (question, answer)
+        return result
+
+    @timed("generate_cards")
+    def generate_cards(self, summary: str, key_concepts: List[str], num_cards: int,
+                       language_instruction: str = "") -> List[Dict[str, str]]:
+        """Generate question/answer/difficulty objects from a summary.
         
         Args:
-            text (str): The text content to process.
-            num_cards (int): The number of flash cards to generate.
+            summary (str): The summary to base the cards on.
+            key_concepts (List[str]): The concepts the cards should focus on.
+            num_cards (int): The number of cards to ask for.
+            language_instruction (str): Extra instruction appended to the system prompt.
         
         Returns:
-            List[FlashCard]: A list of FlashCard objects.
+            List[Dict[str, str]]: The parsed cards, or an empty list if the response was not valid JSON.
         """
-        # print("Raw text before categorize: ", text)
-        category = self.categorize_content(text)
-        summary = self.summarize_text(text)
-        key_concepts = self.extract_key_concepts(text)
-
         messages = [
             {"role": "system", "content": f"""Generate {num_cards} flash cards based on the following text. 
 Focus on the key concepts: {', '.join(key_concepts)}. 
 Return the result as a JSON array. Each object in the array should have the following fields: 
 'question', 'answer', 'difficulty' (easy/medium/hard). 
-The questions should be clear and the answers should be concise."""},
+The questions should be clear and the answers should be concise.{language_instruction}"""},
             {"role": "user", "content": summary}
         ]
-        
-        response = self.generate_with_groq(messages)
+        response = self.generate_with_groq(messages, stage="generate_cards")
         # print(response)
         try:
-            qa_pairs = json.loads(response)
+            return valid_cards(parse_json_array(response))
         except json.JSONDecodeError:
             return []
 
-        flash_cards = []
+    @timed("analyze_chunk")
+    def analyze_chunk(self, text: str, num_cards: int, language_instruction: str = "") -> tuple:
+        """Categorize a text, extract its key concepts and generate cards in a single request.
+
+        Whatever part of the response is valid is kept: a malformed card is dropped and a
+        truncated response still yields the cards completed before the cut.
+
+        Args:
+            text (str): The text content to process.
+            num_cards (int): The number of cards to ask for.
+            language_instruction (str): Extra instruction appended to the system prompt.
+
+        Returns:
+            tuple: The category (or None), the key concepts and the cards.
+        """
+        messages = [
+            {"role": "system", "content": f"""Analyze the following text and create flash cards from it. 
+Return a single JSON object with these fields, in this order: 
+'category': the main subject category, one of {', '.join(CATEGORIES)}. 
+'key_concepts': a JSON array of strings with the key concepts and terminology. 
+'cards': a JSON array of {num_cards} objects with the fields 'question', 'answer' and 'difficulty' (easy/medium/hard), focused on the key concepts. 
+The questions should be clear and the answers should be concise. Return only the JSON object.{language_instruction}"""},
+            {"role": "user", "content": text}
+        ]
+        response_format = None
+        if self.structured_output == "json_schema":
+            response_format = {"type": "json_schema",
+                               "json_schema": {"name": "flash_cards", "schema": FUSED_SCHEMA}}
+        elif self.structured_output == "json_object":
+            response_format = {"type": "json_object"}
+        response = self.generate_with_groq(messages, response_format=response_format, stage="analyze_chunk")
+
         try:
-            for qa in qa_pairs:
-                translated_q = self.translate_content(qa['question'])
-                translated_a = self.translate_content(qa['answer'])
+            result = json.loads(response)
+        except json.JSONDecodeError:
+            result = None
+        if isinstance(result, dict):
+            category, key_concepts, cards = result.get('category'), result.get('key_concepts'), result.get('cards')
+        else:
+            match = FUSED_CATEGORY.search(response)
+            category = match.group(1) if match else None
+            key_concepts = parse_json_items(response, "key_concepts")
+            cards = parse_json_items(response, "cards")
+        if not isinstance(category, str) or not category.strip():
+            category = None
+        key_concepts = [concept for concept in key_concepts or [] if isinstance(concept, str)]
+        cards = valid_cards(cards if isinstance(cards, list) else [])
+        return category, key_concepts, cards[:num_cards]
 
-                card = FlashCard(
-                    prompt=translated_q,
-                    answer=translated_a,
+    @timed("process_document")
+    def process_document(self, text: str, num_cards: Union[int, str] = 3, translate_in_prompt: bool = False,
+                         language: Optional[str] = None,
+                         on_progress: Optional[ProgressCallback] = None,
+                         previous: Optional[Dict[str, List[FlashCard]]] = None,
+                         source_language: Optional[str] = None, use_cache: bool = True) -> List[FlashCard]:
+        """Process document and generate flash cards with difficulty levels and categories.
+        
+        Args:
+            text (str): The text content to process.
+            num_cards (Union[int, str]): The number of flash cards to generate, or "auto" to
+                size the deck from the amount of content in the text.
+            translate_in_prompt (bool): Ask for the cards directly in the target language
+                instead of translating them afterwards.
+            language (str): The target language. Defaults to the instance's target language.
+            on_progress (ProgressCallback): Called as each analysis step finishes and with
+                every card as soon as it is ready.
+            previous (Dict[str, List[FlashCard]]): Cards of an earlier version of the document,
+                by section hash. Sections that did not change keep their cards and only the
+                changed text is sent to the model.
+            source_language (str): The language of the text, if known. When it is also the
+                target language, the cards are written in it directly rather than translated.
+            use_cache (bool): Look the LLM requests up in the response cache and store their
+                results. False sends every request to the model, e.g. for a fresh set of cards.
+        
+        Returns:
+            List[FlashCard]: A list of FlashCard objects, each tagged with its section.
+        """
+        if not use_cache and self.cache is not None:
+            # A copy without the cache, like with_settings(), so concurrent requests keep theirs.
+            uncached = copy.copy(self)
+            uncached.cache = None
+            return uncached.process_document(text, num_cards, translate_in_prompt, language, on_progress, previous,
+                                             source_language)
+        # print("Raw text before categorize: ", text)
+        language = (language or self.target_language).lower()
+        fold_translation = language != "english" and (translate_in_prompt or language == source_language)
+        language_instruction = ""
+        if fold_translation:
+            language_instruction = f"""
+Write the 'question' and 'answer' fields in {language}, keeping any technical terms."""
+
+        if num_cards == "auto":
+            num_cards = auto_num_cards(text)
+            if on_progress:
+                on_progress({"stage": "analysis", "step": "budget", "num_cards": num_cards})
+
+        # Cards are reported as each chunk's request finishes, then corrected as the quality
+        # review, deduplication and translation change them.
+        stream = CardStream(on_progress) if on_progress else None
+        sections = split_sections(text) or [text]
+        hashes = [section_hash(section) for section in sections]
+        reused: Dict[int, List[FlashCard]] = {}
+        if previous:
+            reused = {index: previous[digest] for index, digest in enumerate(hashes) if digest in previous}
+            changed = [index for index in range(len(sections)) if index not in reused]
+            reused_cards = sum(len(cards) for cards in reused.values())
+            if on_progress:
+                on_progress({"stage": "analysis", "step": "reuse", "sections": len(sections),
+                             "changed": len(changed), "reused": reused_cards})
+            if stream:
+                # Unchanged sections' cards are ready right away.
+                for index, cards in reused.items():
+                    for position, card in enumerate(cards):
+                        stream.add(("reused", index, position), self.flashcards_to_json([card])[0])
+            # Only the changed text is analyzed, for the cards the reused ones leave of the
+            # budget; they are spread over the changed sections like over any document's chunks.
+            text = "\n\n".join(sections[index] for index in changed)
+            num_cards = max(0, num_cards - reused_cards)
+            if not changed or not num_cards:
+                return self._assemble_cards(sections, hashes, reused, [], None, stream)
+
+        # Long documents are split so every request fits the model's context; the cards are
+        # spread evenly across chunks in proportion to their size. When there are fewer cards
+        # than chunks, the chunks without cards join the nearest chunk with some, and each
+        # such group is generated from the summaries of its chunks. Short documents are a
+        # single chunk.
+        chunks = chunk_text(text, self.chunk_tokens)
+        card_counts = allocate_cards([len(chunk) for chunk in chunks], num_cards)
+        work = [([chunks[index] for index in group], sum(card_counts[index] for index in group))
+                for group in group_chunks(card_counts)]
+        if self.fused:
+            category, results = self._generate_fused(work, num_cards, language_instruction, on_progress, stream)
+        else:
+            category, results = self._generate_staged(work, num_cards, language_instruction, on_progress, stream)
+        # A card's stream key is its chunk and position, which the quality review keeps.
+        keys = [(chunk, position) for chunk, (_, _, cards) in enumerate(results) for position in range(len(cards))]
+        if self.quality_check:
+            results = self._improve_cards(results, language_instruction, on_progress)
+        qa_pairs = [qa for _, _, cards in results for qa in cards]
+        if stream:
+            for key, qa in zip(keys, qa_pairs):
+                stream.update(key, self._card_json(qa, category))
+        if self.dedup_threshold:
+            # Overlapping chunks ask about the same things; drop repeats before paying to translate them.
+            kept, duplicates = deduplicate(qa_pairs, self.dedup_threshold)
+            kept_ids = {id(qa) for qa in kept}
+            if stream:
+                for key, qa in zip(keys, qa_pairs):
+                    if id(qa) not in kept_ids:
+                        stream.remove(key)
+            removed = Counter(key[0] for key, qa in zip(keys, qa_pairs) if id(qa) not in kept_ids)
+            keys = [key for key, qa in zip(keys, qa_pairs) if id(qa) in kept_ids]
+            qa_pairs = kept
+            if duplicates:
+                qa_pairs, keys = self._top_up(results, qa_pairs, keys, removed, language_instruction, category,
+                                              stream)
+                if on_progress:
+                    on_progress({"stage": "analysis", "step": "dedup", "duplicates": len(duplicates),
+                                 "replaced": len(qa_pairs) - len(kept)})
+
+        # Cards are tagged with their section before translation, while they still share the
+        # document's language.
+        card_sections = self._match_sections(qa_pairs, sections, hashes, set(reused))
+        new_cards = []
+        try:
+            if not fold_translation:
+                if on_progress and language != "english":
+                    on_progress({"stage": "translation", "language": language})
+                qa_pairs = self.translate_cards(qa_pairs, language=language)
+            for key, qa, section in zip(keys, qa_pairs, card_sections):
+                new_cards.append((section, key, FlashCard(
+                    prompt=qa['question'],
+                    answer=qa['answer'],
                     category=category,
-                    difficulty=qa.get('difficulty', 'medium')
-                )
-                flash_cards.append(card)
+                    difficulty=qa.get('difficulty', 'medium'),
+                    section=hashes[section]
+                )))
         except Exception as e:
             print(f"Error while creating flashcards: {e}")
+            if stream:
+                stream.clear()
             return []
+        return self._assemble_cards(sections, hashes, reused, new_cards, category, stream)
+
+    @staticmethod
+    def _match_sections(qa_pairs: List[Dict[str, str]], sections: List[str], hashes: List[str],
+                        exclude: set) -> List[int]:
+        # A card belongs to the section sharing most of its question and answer shingles.
+        candidates = [(index, shingles(section)) for index, section in enumerate(sections) if index not in exclude]
+        matches = []
+        for qa in qa_pairs:
+            features = shingles(f"{qa.get('question', '')} {qa.get('answer', '')}")
+            best = max(candidates, key=lambda candidate: len(features & candidate[1]))
+            matches.append(best[0])
+        return matches
+
+    def _assemble_cards(self, sections: List[str], hashes: List[str], reused: Dict[int, List[FlashCard]],
+                        new_cards: List[tuple], category: Optional[str],
+                        stream: Optional[CardStream]) -> List[FlashCard]:
+        # Reused and new cards are merged back into document order; the stream gets the final
+        # version of any card that changed since it was reported.
+        by_section: Dict[int, List[tuple]] = {
+            index: [(("reused", index, position), card) for position, card in enumerate(cards)]
+            for index, cards in reused.items()}
+        for section, key, card in new_cards:
+            by_section.setdefault(section, []).append((key, card))
+        flash_cards = []
+        for index in range(len(sections)):
+            for key, card in by_section.get(index, []):
+                flash_cards.append(FlashCard(card.prompt, card.answer, category or card.category,
+                                             card.difficulty, hashes[index]))
+                if stream:
+                    stream.update(key, self.flashcards_to_json([flash_cards[-1]])[0])
         return flash_cards
 
+    def _generate_fused(self, work: List[tuple], num_cards: int, language_instruction: str,
+                        on_progress: Optional[ProgressCallback], stream: Optional[CardStream] = None) -> tuple:
+        # One request per group. A group of one chunk sends the chunk itself; a larger one
+        # sends the summaries of its chunks, so every part of the document is seen. The most
+        # common category among the requests stands for the whole document.
+        if on_progress:
+            on_progress({"stage": "generation", "num_cards": num_cards})
+        summary_futures = self._summarize_chunks(work, on_progress, summarize_single=False)
+        futures: List[Optional[Future]] = [None] * len(work)
+        contexts = [texts[0] for texts, _ in work]
+        # Single chunks go first; groups wait for their summaries.
+        for index in sorted(range(len(work)), key=lambda index: summary_futures[index] is not None):
+            if summary_futures[index] is not None:
+                contexts[index] = "\n\n".join(future.result() for future in summary_futures[index])
+            futures[index] = self.executor.submit(self.analyze_chunk, contexts[index], work[index][1],
+                                                  language_instruction)
+            if on_progress:
+                event = {"step": "cards", "chunk": index + 1, "chunks": len(work)}
+                futures[index].add_done_callback(functools.partial(self._report_step, on_progress, event))
+        outputs = self._collect(futures, stream, lambda output: output[2], lambda output: output[0])
+        categories = Counter(chunk_category for chunk_category, _, _ in outputs if chunk_category)
+        category = categories.most_common(1)[0][0] if categories else None
+        results = [(context, key_concepts, cards) for context, (_, key_concepts, cards) in zip(contexts, outputs)]
+        return category, results
+
+    def _generate_staged(self, work: List[tuple], num_cards: int, language_instruction: str,
+                         on_progress: Optional[ProgressCallback], stream: Optional[CardStream] = None) -> tuple:
+        # Map: every chunk is summarized and the analysis calls run concurrently. A group of
+        # one chunk takes its concepts from the chunk; a larger group from its joined summaries.
+        if not work:
+            return None, []
+        single = len(work) == 1 and len(work[0][0]) == 1
+        category_future = self.executor.submit(self.categorize_content, work[0][0][0]) if single else None
+        summary_futures = self._summarize_chunks(work, on_progress, summarize_single=True)
+        concepts_futures = [self.executor.submit(self.extract_key_concepts, texts[0]) if len(texts) == 1 else None
+                            for texts, _ in work]
+        if on_progress:
+            for index, future in enumerate(concepts_futures):
+                if future is not None:
+                    event = {"step": "concepts", "chunk": index + 1, "chunks": len(work)}
+                    future.add_done_callback(functools.partial(self._report_step, on_progress, event))
+
+        # Reduce: the summaries of each group are merged into the text its cards are made from.
+        summaries = []
+        for index, group in enumerate(summary_futures):
+            summaries.append("\n\n".join(future.result() for future in group))
+            if concepts_futures[index] is None:
+                concepts_futures[index] = self.executor.submit(self.extract_key_concepts, summaries[index])
+                if on_progress:
+                    event = {"step": "concepts", "chunk": index + 1, "chunks": len(work)}
+                    concepts_futures[index].add_done_callback(
+                        functools.partial(self._report_step, on_progress, event))
+        if category_future is None:
+            # The document is categorized from all of its summaries, not its first chunk.
+            category_future = self.executor.submit(
+                self.categorize_content, chunk_text("\n\n".join(summaries), self.chunk_tokens)[0])
+        if on_progress:
+            category_future.add_done_callback(
+                functools.partial(self._report_step, on_progress, {"step": "category"}))
+
+        card_futures, inputs = [], []
+        for (_, count), summary, concepts_future in zip(work, summaries, concepts_futures):
+            key_concepts = concepts_future.result()
+            inputs.append((summary, key_concepts))
+            card_futures.append(self.executor.submit(
+                self.generate_cards, summary, key_concepts, count, language_instruction))
+        if on_progress:
+            on_progress({"stage": "generation", "num_cards": num_cards})
+        # The category is usually ready long before the cards, which are reported with it.
+        category = category_future.result()
+        outputs = self._collect(card_futures, stream, lambda cards: cards, lambda cards: category)
+        results = [(summary, key_concepts, cards) for (summary, key_concepts), cards in zip(inputs, outputs)]
+        return category, results
+
+    def _collect(self, futures: List[Future], stream: Optional[CardStream], cards_of: Callable,
+                 category_of: Callable) -> list:
+        # Wait for every chunk's request, reporting its cards as soon as it finishes, and return
+        # the outputs in chunk order.
+        index_of = {future: index for index, future in enumerate(futures)}
+        outputs = [None] * len(futures)
+        for future in as_completed(futures):
+            index = index_of[future]
+            outputs[index] = future.result()
+            if stream:
+                for position, qa in enumerate(cards_of(outputs[index])):
+                    stream.add((index, position), self._card_json(qa, category_of(outputs[index])))
+        return outputs
+
+    def _card_json(self, qa: Dict[str, str], category: Optional[str]) -> Dict[str, Any]:
+        return self.flashcards_to_json([FlashCard(qa['question'], qa['answer'], category,
+                                                  qa.get('difficulty', 'medium'))])[0]
+
+    def _summarize_chunks(self, work: List[tuple], on_progress: Optional[ProgressCallback],
+                          summarize_single: bool) -> List[Optional[List[Future]]]:
+        # Summary futures of each group's chunks; None for one-chunk groups unless `summarize_single`.
+        total = sum(len(texts) for texts, _ in work)
+        futures, position = [], 0
+        for texts, _ in work:
+            if len(texts) == 1 and not summarize_single:
+                futures.append(None)
+            else:
+                group = []
+                for offset, text in enumerate(texts):
+                    future = self.executor.submit(self.summarize_text, text)
+                    if on_progress:
+                        event = {"step": "summary", "chunk": position + offset + 1, "chunks": total}
+                        future.add_done_callback(functools.partial(self._report_step, on_progress, event))
+                    group.append(future)
+                futures.append(group)
+            position += len(texts)
+        return futures
+
+    def _top_up(self, results: List[tuple], qa_pairs: List[Dict[str, str]], keys: List[tuple], removed: Counter,
+                language_instruction: str, category: Optional[str], stream: Optional[CardStream]) -> tuple:
+        """Replace the cards dropped as duplicates with new cards from the same chunks.
+
+        Each chunk that lost cards gets one request for that many cards, listing the questions
+        it already has. New cards that repeat the deck (or fail the quality checks) are left
+        out, so the deck can still come out smaller than asked.
+
+        Returns:
+            tuple: The cards and their stream keys, with the replacements appended.
+        """
+        futures = {}
+        for chunk, count in removed.items():
+            context, concepts, _ = results[chunk]
+            asked = "; ".join(qa['question'] for key, qa in zip(keys, qa_pairs) if key[0] == chunk)
+            hint = f"\nAsk about other things than these questions: {asked}" if asked else ""
+            futures[chunk] = self.executor.submit(self.generate_cards, context, concepts, count,
+                                                  language_instruction + hint)
+        keys = list(keys)
+        for chunk, future in futures.items():
+            candidates = [qa for qa in future.result()[:removed[chunk]]
+                          if not (self.quality_check and card_issues(qa))]
+            # The deck is already free of duplicates, so it is kept whole and only new cards can go.
+            merged, _ = deduplicate(qa_pairs + candidates, self.dedup_threshold)
+            for position, qa in enumerate(merged[len(qa_pairs):]):
+                keys.append((chunk, "top-up", position))
+                if stream:
+                    stream.add(keys[-1], self._card_json(qa, category))
+            qa_pairs = merged
+        return qa_pairs, keys
+
+    def _improve_cards(self, results: List[tuple], language_instruction: str,
+                       on_progress: Optional[ProgressCallback]) -> List[tuple]:
+        """Check the cards of every chunk and regenerate only those that fail.
+
+        The deck is reviewed as a whole (see quality.review_cards). Each chunk with failing
+        cards gets one more request, for exactly that many cards, focused on the concepts
+        no card covers yet and the difficulties the deck lacks. A failing card is replaced
+        only by a card that passes; otherwise it is kept.
+
+        Args:
+            results (List[tuple]): (text or summary, key concepts, cards) of each chunk.
+            language_instruction (str): The instruction the cards were generated with.
+            on_progress (ProgressCallback): Receives a 'quality' analysis event.
+
+        Returns:
+            List[tuple]: The results with the failing cards replaced where possible.
+        """
+        cards = [card for _, _, chunk_cards in results for card in chunk_cards]
+        report = review_cards(cards, [concept for _, concepts, _ in results for concept in concepts])
+        if not report.issues:
+            return results
+
+        hints = "\nKeep every answer short and do not restate the question in it."
+        if report.underrepresented:
+            hints += f"\nMake the cards {' or '.join(report.underrepresented)} in difficulty."
+        uncovered = set(report.uncovered)
+        futures, offset = [], 0
+        for context, concepts, chunk_cards in results:
+            failing = [index for index in range(len(chunk_cards)) if offset + index in report.issues]
+            offset += len(chunk_cards)
+            if not failing:
+                futures.append(None)
+                continue
+            focus = [concept for concept in concepts if concept in uncovered] or concepts
+            futures.append((failing, self.executor.submit(
+                self.generate_cards, context, focus, len(failing), language_instruction + hints)))
+
+        improved, replaced = [], 0
+        for (context, concepts, chunk_cards), pending in zip(results, futures):
+            if pending is not None:
+                failing, future = pending
+                chunk_cards = list(chunk_cards)
+                replacements = [card for card in future.result() if not card_issues(card)]
+                for index, card in zip(failing, replacements):
+                    chunk_cards[index] = card
+                    replaced += 1
+            improved.append((context, concepts, chunk_cards))
+        if on_progress:
+            on_progress({"stage": "analysis", "step": "quality", "failed": len(report.issues),
+                         "replaced": replaced, "coverage": round(report.coverage, 2)})
+        return improved
+
+    @staticmethod
+    def _report_step(on_progress: ProgressCallback, event: Dict[str, Any], future):
+        if future.exception() is None:
+            on_progress({"stage": "analysis", **event})
+
     def save_flashcards(self, cards: List[FlashCard], filename: str):
         """Save flash cards to a JSON file.
         
@@ -245,19 +944,33 @@ The questions should be clear and the answers should be concise."""},
             cards.append(card)
         return cards
 
-    def generate_flashcards(self, text: str, num_cards: int = 3, save_to: str = None, language: str = None) -> List[FlashCard]:
+    def generate_flashcards(self, text: str, num_cards: Union[int, str] = 3, save_to: str = None, language: str = None,
+                            translate_in_prompt: bool = False,
+                            on_progress: Optional[ProgressCallback] = None,
+                            previous: Optional[Dict[str, List[FlashCard]]] = None,
+                            source_language: Optional[str] = None, use_cache: bool = True) -> List[FlashCard]:
         """Generate flash cards from text content.
         
         Args:
             text (str): The text content to generate flash cards from.
-            num_cards (int): The number of flash cards to generate.
+            num_cards (Union[int, str]): The number of flash cards to generate, or "auto".
             save_to (str): The filename to save the flash cards to.
+            language (str): The target language for this call. Defaults to the instance's target language.
+            translate_in_prompt (bool): Generate the cards directly in the target language.
+            on_progress (ProgressCallback): Receives progress events while the cards are generated.
+            previous (Dict[str, List[FlashCard]]): Cards of an earlier version of the text, by
+                section hash, to reuse for the sections that did not change.
+            source_language (str): The language of the text, e.g. from ReadDocs; a target in
+                the same language needs no translation.
+            use_cache (bool): Use the LLM response cache; False always calls the model.
         
         Returns:
             List[FlashCard]: A list of FlashCard objects.
         """
-        self.target_language = language if language is not None else self.target_language
-        cards = self.process_document(text, num_cards)
+        # The language is passed down rather than stored on the instance, so concurrent
+        # requests sharing one AnalyzeDocs cannot overwrite each other's target language.
+        cards = self.process_document(text, num_cards, translate_in_prompt, language, on_progress, previous,
+                                      source_language, use_cache)
         if save_to:
             self.save_flashcards(cards, save_to)
         return cards
@@ -273,12 +986,15 @@ The questions should be clear and the answers should be concise."""},
         """
         data = []
         for card in cards:
-            data.append({
+            item = {
                 "prompt": card.prompt,
                 "answer": card.answer,
                 "category": card.category,
                 "difficulty": card.difficulty
-            })
+            }
+            if card.section is not None:
+                item["section"] = card.section
+            data.append(item)
         return data
 
     def generate_flashcards_from_file(self, filename: str, num_cards: int = 3, save_to: str = None) -> List[FlashCard]:
@@ -297,25 +1013,402 @@ The questions should be clear and the answers should be concise."""},
         return self.generate_flashcards(text, num_cards, save_to)
 
 
+def ocr_pdf_page(file_path: str, page_number: int, lang: str = "eng",
+                 preset: OcrPreset = PRESETS[DEFAULT_PRESET]) -> Optional[str]:
+    """Rasterize, clean up and OCR a single PDF page. Runs in the OCR worker processes.
+
+    Args:
+        file_path (str): The path to the PDF file.
+        page_number (int): The 1-based page number.
+        lang (str): The Tesseract language code.
+        preset (OcrPreset): The resolution, preprocessing and page segmentation to use.
+
+    Returns:
+        Optional[str]: The text content of the page, or None if the page is blank.
+    """
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    # Poppler renders straight to grayscale when color is not needed, which is faster too.
+    images = convert_from_path(file_path, dpi=preset.dpi, first_page=page_number, last_page=page_number,
+                               grayscale=preset.mode != "color")
+    texts = []
+    for image in images:
+        page = preprocess(image, preset)
+        if page is None:
+            # Next to no ink: a quick pass on the page as rendered tells a blank page from a
+            # sparse one, such as a title or a page number, which then gets read properly.
+            if not pytesseract.image_to_string(image.convert("L"), lang=lang, config="--psm 6").strip():
+                continue
+            page = preprocess(image, replace(preset, skip_blank=False))
+        texts.append(pytesseract.image_to_string(page, lang=lang, config=preset.tesseract_config))
+    return "".join(texts) if texts else None
+
+
+def ocr_language_sample(file_path: str, page_number: int, lang: str, dpi: int = 100) -> str:
+    """OCR a page at low resolution with several language packs, to find out its language.
+
+    Runs in the OCR worker processes; a fraction of the cost of reading the page properly.
+    """
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number, last_page=page_number, grayscale=True)
+    return "".join(pytesseract.image_to_string(image, lang=lang, config="--psm 6") for image in images)
+
+
+def is_plausible_text(text: str, min_chars: int = 20, min_ratio: float = 0.7, image_coverage: float = 0.0,
+                      min_chars_per_page: int = 300) -> bool:
+    """Check whether an embedded PDF text layer looks like real text rather than noise.
+
+    Scanned pages usually have no text layer at all; broken font encodings produce
+    runs of symbols and replacement characters instead of words. A scan can also carry a
+    stamped header or Bates number as text over the image, so a page mostly covered by
+    images needs a text layer long enough for its size, or it is OCR'd.
+
+    Args:
+        text (str): The extracted text.
+        min_chars (int): The minimum number of visible characters.
+        min_ratio (float): The minimum share of letters, digits and common punctuation.
+        image_coverage (float): The share of the page covered by images (see image_coverage).
+        min_chars_per_page (int): The visible characters expected of a page-sized image
+            that was made searchable, scaled by the coverage of pages at least half images.
+
+    Returns:
+        bool: True if the text can be used instead of OCR.
+    """
+    visible = [c for c in text if not c.isspace()]
+    if len(visible) < min_chars:
+        return False
+    if image_coverage >= 0.5 and len(visible) < min_chars_per_page * image_coverage:
+        return False
+    readable = sum(1 for c in visible if c.isalnum() or c in ".,;:!?'\"()[]-/%")
+    return readable / len(visible) >= min_ratio
+
+
+def page_content_hash(page) -> Optional[str]:
+    """Hash the raw content of a PDF page: its content stream, rotation and every XObject it draws.
+
+    Scanned pages share near-identical content streams, so the embedded images are what
+    tells them apart.
+
+    Args:
+        page (PageObject): The pypdf page.
+
+    Returns:
+        Optional[str]: The hex digest, or None if the page could not be hashed.
+    """
+    digest = hashlib.sha256()
+    try:
+        digest.update(f"{page.rotation}:{list(page.mediabox)}".encode())
+        contents = page.get_contents()
+        if contents is not None:
+            digest.update(contents.get_data())
+        _hash_xobjects(page.get("/Resources"), digest)
+    except Exception as e:
+        print(f"Warning: could not hash page content: {e}")
+        return None
+    return digest.hexdigest()
+
+
+def image_coverage(page) -> float:
+    """Return the share of a PDF page's area covered by the images it draws.
+
+    Each image is drawn into the unit square mapped by the current transformation matrix,
+    so its area is the determinant of the matrix; overlaps are counted twice, which is
+    why the result is capped at 1.
+
+    Args:
+        page (PageObject): The pypdf page.
+
+    Returns:
+        float: Between 0 and 1; 0 if the page could not be read.
+    """
+    try:
+        page_area = abs(float(page.mediabox.width) * float(page.mediabox.height))
+        contents = page.get_contents()
+        if not page_area or contents is None:
+            return 0.0
+        area = _image_area(contents.operations, page.get("/Resources"), page.pdf, [1, 0, 0, 1, 0, 0])
+    except Exception as e:
+        print(f"Warning: could not measure page images: {e}")
+        return 0.0
+    return min(1.0, area / page_area)
+
+
+def _image_area(operations, resources, pdf, matrix: List[float], depth: int = 0) -> float:
+    from pypdf.generic import ContentStream
+
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    xobjects = xobjects.get_object() if xobjects is not None else {}
+    area, stack = 0.0, []
+    for operands, operator in operations:
+        if operator == b"q":
+            stack.append(matrix)
+        elif operator == b"Q" and stack:
+            matrix = stack.pop()
+        elif operator == b"cm":
+            matrix = _concat([float(value) for value in operands], matrix)
+        elif operator == b"Do" and operands and operands[0] in xobjects:
+            xobject = xobjects[operands[0]].get_object()
+            if xobject.get("/Subtype") == "/Image":
+                area += abs(matrix[0] * matrix[3] - matrix[1] * matrix[2])
+            elif xobject.get("/Subtype") == "/Form" and depth < 5:
+                form_matrix = [float(value) for value in xobject.get("/Matrix", [1, 0, 0, 1, 0, 0])]
+                area += _image_area(ContentStream(xobject, pdf).operations, xobject.get("/Resources"), pdf,
+                                    _concat(form_matrix, matrix), depth + 1)
+    return area
+
+
+def _concat(m: List[float], n: List[float]) -> List[float]:
+    # The PDF matrix product m x n, for [a b c d e f] standing for [[a b 0] [c d 0] [e f 1]].
+    return [m[0] * n[0] + m[1] * n[2], m[0] * n[1] + m[1] * n[3],
+            m[2] * n[0] + m[3] * n[2], m[2] * n[1] + m[3] * n[3],
+            m[4] * n[0] + m[5] * n[2] + n[4], m[4] * n[1] + m[5] * n[3] + n[5]]
+
+
+def _hash_xobjects(resources, digest, depth: int = 0):
+    if resources is None or depth > 5:
+        return
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return
+    for name, ref in sorted(xobjects.get_object().items()):
+        xobject = ref.get_object()
+        digest.update(name.encode())
+        digest.update(xobject.get_data())
+        if xobject.get("/Subtype") == "/Form":
+            _hash_xobjects(xobject.get("/Resources"), digest, depth + 1)
+
+
+@dataclass
+class PageText:
+    page: int
+    text: str
+    method: str  # "text_layer", "ocr", "ocr_cache", "blank" or "text"
+    # Detected language of the page, e.g. "italian"; None if unsure.
+    language: Optional[str] = None
+
+
 class ReadDocs:
-    def __init__(self, data_dir="input"):
+    def __init__(self, data_dir="input", max_workers: Optional[int] = None, batch_size: Optional[int] = None,
+                 use_text_layer: bool = True, ocr_cache: Optional[ResponseCache] = None,
+                 ocr_preset: str = DEFAULT_PRESET, ocr_languages: Optional[List[str]] = None):
         self.data_dir = data_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Pages rasterized or OCR'd at once; this bounds peak memory per document.
+        self.batch_size = batch_size or 2 * self.max_workers
+        self.use_text_layer = use_text_layer
+        # OCR output of previously seen pages, keyed by page content and language.
+        self.ocr_cache = ocr_cache
+        # How scanned pages are rasterized and preprocessed; see ocr_preprocess.PRESETS.
+        self.ocr_preset = get_preset(ocr_preset)
+        # Languages scanned documents are expected to be in, the first being the fallback.
+        # Unless a language is given, each document's language is detected among those whose
+        # Tesseract pack is installed (see available_ocr_languages).
+        self.ocr_languages = ocr_languages or DEFAULT_OCR_LANGUAGES
+        unknown = [language for language in self.ocr_languages if language not in TESSERACT_CODES]
+        if unknown:
+            raise ValueError(f"Unsupported OCR languages: {', '.join(unknown)}")
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @functools.cached_property
+    def available_ocr_languages(self) -> List[str]:
+        """Return the OCR languages whose Tesseract pack is installed, in configured order.
+
+        Falls back to the first configured language, with a warning, when none is installed
+        or Tesseract cannot be queried; OCR then fails with Tesseract's own error.
+        """
+        import pytesseract
+
+        try:
+            installed = set(pytesseract.get_languages(config=""))
+        except Exception as e:
+            print(f"Could not list the installed Tesseract languages: {e}")
+            return self.ocr_languages[:1]
+        available = [language for language in self.ocr_languages if TESSERACT_CODES[language] in installed]
+        missing = [language for language in self.ocr_languages if language not in available]
+        if missing:
+            print(f"Tesseract language packs not installed, skipping: {', '.join(missing)}")
+        return available or self.ocr_languages[:1]
 
-    def read_pdf(self, file_path: str, lang: str = "eng") -> str:
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Created on first use so that instances which never read a PDF don't spawn workers.
+        # By then the server and the LLM pool are running threads, and a forked child could
+        # inherit a lock one of them holds, so the workers are started from a clean process.
+        with self._executor_lock:
+            if self._executor is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(method))
+            return self._executor
+
+    def close(self):
+        """Shut down the OCR worker processes, if any were started."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def extract_text_layer(self, reader: "PdfReader", page_number: int) -> Optional[str]:
+        """Return the embedded text of a page, or None if it is missing or unusable.
+
+        Args:
+            reader (PdfReader): The opened PDF.
+            page_number (int): The 1-based page number.
+
+        Returns:
+            Optional[str]: The page text, or None if the page needs OCR.
+        """
+        if not self.use_text_layer:
+            return None
+        try:
+            page = reader.pages[page_number - 1]
+            text = page.extract_text() or ""
+        except Exception as e:
+            print(f"Warning: could not extract text layer of page {page_number}: {e}")
+            return None
+        if not is_plausible_text(text):
+            return None
+        # Only pages with some text pay for walking their drawing operations.
+        return text if is_plausible_text(text, image_coverage=image_coverage(page)) else None
+
+    def detect_pdf_language(self, file_path: str, reader: "PdfReader") -> Optional[str]:
+        """Find out the language of a PDF from a sample of its pages.
+
+        Text layers are used when there are any; otherwise the first and middle pages are
+        OCR'd at low resolution with all of the available OCR languages until one is
+        recognized. With a single OCR language there is nothing to detect.
+
+        Args:
+            file_path (str): The path to the PDF file.
+            reader (PdfReader): The opened PDF.
+
+        Returns:
+            Optional[str]: The language name, or None if it could not be determined.
+        """
+        num_pages = len(reader.pages)
+        sample = sorted({1, (num_pages + 1) // 2}) if num_pages else []
+        text_layers = {page: self.extract_text_layer(reader, page) for page in sample}
+        language = detect_language(" ".join(filter(None, text_layers.values())))
+        if language is not None:
+            return language
+        if len(self.available_ocr_languages) == 1:
+            return self.available_ocr_languages[0]
+        for page in sample:
+            if text_layers[page] is not None:
+                continue
+            ocr_text = self.executor.submit(ocr_language_sample, file_path, page,
+                                            tesseract_languages(self.available_ocr_languages)).result()
+            language = detect_language(ocr_text)
+            if language is not None:
+                return language
+        return None
+
+    def iter_pdf_pages(self, file_path: str, lang: Optional[str] = None) -> Iterator[PageText]:
+        """Extract a PDF page by page, yielding text in page order.
+
+        Pages with a usable text layer are read directly, and pages whose content was OCR'd
+        before come from the OCR cache. The rest are rasterized and OCR'd across the worker
+        processes, with at most `batch_size` pages in flight at once so memory stays bounded
+        no matter how long the document is.
+
+        Args:
+            file_path (str): The path to the PDF file.
+            lang (str): The Tesseract language code. Detected from the document by default.
+
+        Yields:
+            PageText: The text of each page, how it was extracted and its language.
+        """
+        from pypdf import PdfReader
+
+        reader = PdfReader(file_path)
+        num_pages = len(reader.pages)
+        pending = deque()
+        next_page = 1
+        try:
+            while pending or next_page <= num_pages:
+                while next_page <= num_pages and len(pending) < self.batch_size:
+                    text = self.extract_text_layer(reader, next_page)
+                    if text is None and lang is None:
+                        # Only documents that need OCR pay for detecting their language. An
+                        # undetected or uninstalled language falls back to the first available
+                        # one: OCR with several packs at once is several times slower.
+                        language = self.detect_pdf_language(file_path, reader)
+                        if language not in self.available_ocr_languages:
+                            language = self.available_ocr_languages[0]
+                        lang = TESSERACT_CODES[language]
+                    pending.append(self._start_page(file_path, reader, next_page, lang, text))
+                    next_page += 1
+                page_number, method, result, cache_key = pending.popleft()
+                if method == "ocr":
+                    result = result.result()
+                    if result is None:
+                        method, result = "blank", ""
+                    if cache_key is not None:
+                        self.ocr_cache.set(cache_key, result)
+                PAGES.inc(method=method)
+                yield PageText(page=page_number, text=result, method=method, language=detect_language(result))
+        finally:
+            for _, method, result, _ in pending:
+                if method == "ocr":
+                    result.cancel()
+
+    def _start_page(self, file_path: str, reader: "PdfReader", page_number: int, lang: Optional[str],
+                    text: Optional[str]) -> tuple:
+        if text is not None:
+            return page_number, "text_layer", text, None
+
+        cache_key = None
+        if self.ocr_cache is not None:
+            content_hash = page_content_hash(reader.pages[page_number - 1])
+            if content_hash is not None:
+                cache_key = hashlib.sha256(
+                    f"{content_hash}:{lang}:{self.ocr_preset.signature}".encode()).hexdigest()
+                cached = self.ocr_cache.get(cache_key)
+                if cached is not None:
+                    return page_number, "ocr_cache", cached, None
+
+        future = self.executor.submit(ocr_pdf_page, file_path, page_number, lang, self.ocr_preset)
+        return page_number, "ocr", future, cache_key
+
+    def read_pdf_pages(self, file_path: str, lang: Optional[str] = None,
+                       on_progress: Optional[ProgressCallback] = None) -> List[PageText]:
+        """Read the pages of a PDF file, using OCR only where there is no usable text layer.
+
+        Args:
+            file_path (str): The path to the PDF file.
+            lang (str): The Tesseract language code. Detected from the document by default.
+            on_progress (ProgressCallback): Called after each page has been read.
+
+        Returns:
+            List[PageText]: The pages in order.
+        """
+        from pypdf import PdfReader
+
+        num_pages = len(PdfReader(file_path).pages)
+        pages = []
+        for page in self.iter_pdf_pages(file_path, lang):
+            pages.append(page)
+            if on_progress:
+                on_progress({"stage": "page", "page": page.page, "pages": num_pages, "method": page.method})
+        return pages
+
+    def read_pdf(self, file_path: str, lang: Optional[str] = None,
+                 on_progress: Optional[ProgressCallback] = None) -> str:
         """Read text content from a PDF file.
         
         Args:
             file_path (str): The path to the PDF file.
+            lang (str): The Tesseract language code. Detected from the document by default.
+            on_progress (ProgressCallback): Called after each page has been read.
         
         Returns:
             str: The text content of the PDF.
         """
-        images = convert_from_path(file_path)
-
-        text = ""
-        for image in images:
-            text += pytesseract.image_to_string(image, lang=lang)
-        return text
+        return "\n".join(page.text for page in self.read_pdf_pages(file_path, lang, on_progress))
         
     def read_text(self, file_path: str) -> str:
         """Read text content from a text file.
@@ -329,20 +1422,40 @@ class ReadDocs:
         with open(file_path, 'r') as file:
             return file.read()
 
-    def read_document(self, file_type: str, file_name: str) -> str:
+    @timed("read_document")
+    def read_document_pages(self, file_type: str, file_name: str,
+                            on_progress: Optional[ProgressCallback] = None,
+                            lang: Optional[str] = None) -> List[PageText]:
+        """Read a document file page by page, recording how each page was extracted and its language.
+
+        Args:
+            file_type (str): The type of file (pdf or text).
+            file_name (str): The name of the file.
+            on_progress (ProgressCallback): Receives per-page progress for PDFs.
+            lang (str): The Tesseract language code for scanned pages. Detected by default.
+
+        Returns:
+            List[PageText]: The pages in order. Text files are a single page.
+        """
+        file_path = os.path.join(self.data_dir, file_name)
+        if file_type == "pdf":
+            return self.read_pdf_pages(file_path, lang, on_progress)
+        elif file_type == "text":
+            text = self.read_text(file_path)
+            return [PageText(page=1, text=text, method="text", language=detect_language(text))]
+        else:
+            raise ValueError("Invalid file type. Only PDF and text files are allowed.")
+
+    def read_document(self, file_type: str, file_name: str, on_progress: Optional[ProgressCallback] = None) -> str:
         """Read text content from a document file.
         
         Args:
             file_type (str): The type of file (pdf or text).
             file_nae (str): The name of the file.
+            on_progress (ProgressCallback): Receives per-page progress for PDFs.
         
         Returns:
             str: The text content of the document.
         """
-        file_path = os.path.join(self.data_dir, file_name)
-        if file_type == "pdf":
-            return self.read_pdf(file_path)
-        elif file_type == "text":
-            return self.read_text(file_path)
-        else:
-            raise ValueError("Invalid file type. Only PDF and text files are allowed.")
\ No newline at end of file
+        pages = self.read_document_pages(file_type, file_name, on_progress)
+        return "\n".join(page.text for page in pages)
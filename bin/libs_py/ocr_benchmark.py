@@ -0,0 +1,167 @@
+"""Measure OCR speed and accuracy of each preprocessing preset on a sample of scanned pages.
+
+Run from this directory (needs Tesseract and Poppler):
+
+    python ocr_benchmark.py --pages 12 --presets fast balanced accurate legacy --output ../bench
+
+The sample corpus is generated deterministically: pages of known text rendered as images,
+with the defects of real scans (small rotations, gray or uneven paper, speckles, faded
+ink, two-column pages and blank pages), saved as an image-only PDF with its ground truth.
+Accuracy is the similarity of the OCR output to that text, word by word.
+"""
+import os
+import json
+import time
+import random
+import difflib
+import argparse
+import platform
+from dataclasses import asdict
+from typing import Dict, Any
+
+from benchmark import synthetic_text, git_commit, peak_rss_mb
+from model import ReadDocs
+from ocr_preprocess import PRESETS
+
+PAGE_SIZE = (1700, 2200)  # Letter at 200 DPI.
+MARGIN = 150
+
+
+def render_page(text: str, rng: random.Random, columns: int = 1):
+    """Render `text` as a degraded scan and return the image and the text that fit on it."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    paper = rng.randint(215, 250)
+    ink = rng.randint(0, 90)
+    font = ImageFont.load_default(size=30)
+    image = Image.new("L", PAGE_SIZE, paper)
+    draw = ImageDraw.Draw(image)
+    column_width = (PAGE_SIZE[0] - 2 * MARGIN - 60 * (columns - 1)) // columns
+    words, placed, line = text.split(), [], []
+    x_start, y = MARGIN, MARGIN
+    for word in words:
+        candidate = " ".join(line + [word])
+        if line and draw.textlength(candidate, font=font) > column_width:
+            draw.text((x_start, y), " ".join(line), fill=ink, font=font)
+            placed.extend(line)
+            line, y = [], y + 44
+            if y > PAGE_SIZE[1] - MARGIN:
+                if x_start + column_width + 60 >= PAGE_SIZE[0] - MARGIN:
+                    break
+                x_start, y = x_start + column_width + 60, MARGIN
+        line.append(word)
+    else:
+        draw.text((x_start, y), " ".join(line), fill=ink, font=font)
+        placed.extend(line)
+    add_noise(image, rng)
+    angle = rng.uniform(-3, 3)
+    image = image.rotate(angle, resample=Image.BICUBIC, expand=False, fillcolor=paper)
+    return image, " ".join(placed)
+
+
+def add_noise(image, rng: random.Random, speckles: int = 1500):
+    from PIL import ImageDraw
+
+    draw = ImageDraw.Draw(image)
+    for _ in range(speckles):
+        x, y = rng.randrange(PAGE_SIZE[0]), rng.randrange(PAGE_SIZE[1])
+        draw.point((x, y), fill=rng.randint(0, 160))
+
+
+def make_scans(data_dir: str, num_pages: int, seed: int = 0) -> Dict[str, Any]:
+    """Write the sample scanned PDF and its ground truth.
+
+    Every sixth page is blank apart from speckles and every fifth is set in two columns.
+
+    Returns:
+        Dict[str, Any]: The PDF file name and the expected text of each page.
+    """
+    from PIL import Image
+
+    os.makedirs(data_dir, exist_ok=True)
+    rng = random.Random(seed)
+    images, truth = [], []
+    for number in range(1, num_pages + 1):
+        if number % 6 == 0:
+            image = Image.new("L", PAGE_SIZE, rng.randint(215, 250))
+            add_noise(image, rng)
+            images.append(image)
+            truth.append("")
+            continue
+        image, text = render_page(synthetic_text(3000, seed=seed + number), rng, columns=2 if number % 5 == 0 else 1)
+        images.append(image)
+        truth.append(text)
+    name = f"ocr_sample_{num_pages}.pdf"
+    images[0].save(os.path.join(data_dir, name), save_all=True, append_images=images[1:], resolution=200)
+    with open(os.path.join(data_dir, f"ocr_sample_{num_pages}.json"), "w") as f:
+        json.dump(truth, f)
+    return {"file_name": name, "truth": truth}
+
+
+def word_accuracy(expected: str, actual: str) -> float:
+    """Share of the expected words recovered in order; 1.0 when both are empty."""
+    expected_words, actual_words = expected.lower().split(), actual.lower().split()
+    if not expected_words:
+        return 1.0 if not actual_words else 0.0
+    matcher = difflib.SequenceMatcher(None, expected_words, actual_words, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / len(expected_words)
+
+
+def bench_preset(data_dir: str, sample: Dict[str, Any], preset: str, workers: int) -> Dict[str, Any]:
+    read_docs = ReadDocs(data_dir=data_dir, max_workers=workers, use_text_layer=False, ocr_preset=preset)
+    try:
+        start = time.perf_counter()
+        pages = read_docs.read_document_pages("pdf", sample["file_name"])
+        elapsed = time.perf_counter() - start
+    finally:
+        read_docs.close()
+    scores = [word_accuracy(expected, page.text) for expected, page in zip(sample["truth"], pages)]
+    text_scores = [score for score, expected in zip(scores, sample["truth"]) if expected]
+    return {
+        "preset": preset,
+        "settings": asdict(PRESETS[preset]),
+        "pages": len(pages),
+        "wall_time": round(elapsed, 3),
+        "pages_per_second": round(len(pages) / elapsed, 3),
+        "accuracy": round(sum(text_scores) / len(text_scores), 4) if text_scores else None,
+        "worst_page_accuracy": round(min(text_scores), 4) if text_scores else None,
+        "blank_pages_skipped": sum(1 for page in pages if page.method == "blank"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR preprocessing presets on a sample scanned corpus.")
+    parser.add_argument("--pages", type=int, default=12, help="Pages in the sample corpus.")
+    parser.add_argument("--presets", nargs="+", choices=list(PRESETS), default=list(PRESETS))
+    parser.add_argument("--workers", type=int, default=None, help="OCR processes (default: CPU count).")
+    parser.add_argument("--data-dir", default="../bench/ocr_corpus")
+    parser.add_argument("--output", default="../bench")
+    args = parser.parse_args()
+
+    sample = make_scans(args.data_dir, args.pages)
+    results = []
+    for preset in args.presets:
+        result = bench_preset(args.data_dir, sample, preset, args.workers)
+        print(f"{preset:>9}: {result['pages_per_second']:.2f} pages/s, accuracy {result['accuracy']}, "
+              f"worst page {result['worst_page_accuracy']}, {result['blank_pages_skipped']} blank pages skipped")
+        results.append(result)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": vars(args),
+        "presets": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"ocr_benchmark_{time.strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+from typing import List, Optional, TYPE_CHECKING
+from dataclasses import dataclass
+
+# Share of dark pixels below which a page may be blank. A lone page number has about 0.00004
+# and a one-word title page ten times that, so only pages with next to no ink qualify; they
+# are then checked with a quick OCR pass (see model.ocr_pdf_page) before being dropped.
+BLANK_MAX_INK = 0.00002
+
+# Pillow is only needed by the OCR worker processes; it is imported there, on first use.
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+@dataclass(frozen=True)
+class OcrPreset:
+    """How a scanned page is rasterized and cleaned up before Tesseract reads it."""
+    name: str
+    # Rasterization resolution. Tesseract works best around 300 DPI; lower is much faster.
+    dpi: int
+    # "color" passes the page as rendered, "grayscale" drops color, "binarize" also
+    # thresholds it to black and white (Otsu), which helps on uneven or faded scans.
+    mode: str
+    # Estimate and undo small rotations of the scan.
+    deskew: bool
+    # Pages with next to no ink get a quick OCR pass instead of the full preprocessing, and
+    # are dropped if it reads nothing.
+    skip_blank: bool
+    # Tesseract page segmentation mode: 3 finds columns and blocks, 6 assumes one uniform
+    # block of text and skips most of the layout analysis.
+    psm: int
+
+    def __post_init__(self):
+        if self.mode not in ("color", "grayscale", "binarize"):
+            raise ValueError(f"Unsupported OCR image mode: {self.mode}")
+
+    @property
+    def tesseract_config(self) -> str:
+        return f"--psm {self.psm}"
+
+    @property
+    def signature(self) -> str:
+        """Identify the settings, so cached OCR output is not reused across different presets."""
+        # The blank threshold is part of it, so pages dropped under an older one are read again.
+        blank = BLANK_MAX_INK if self.skip_blank else 0
+        return f"{self.dpi}:{self.mode}:{int(self.deskew)}:{blank}:{self.psm}"
+
+
+# From fastest to most accurate; see ocr_benchmark.py for their measured pages/sec and accuracy.
+PRESETS = {
+    "fast": OcrPreset("fast", dpi=150, mode="grayscale", deskew=False, skip_blank=True, psm=6),
+    "balanced": OcrPreset("balanced", dpi=200, mode="grayscale", deskew=True, skip_blank=True, psm=3),
+    "accurate": OcrPreset("accurate", dpi=300, mode="binarize", deskew=True, skip_blank=True, psm=3),
+    # What pages were OCR'd with before presets existed.
+    "legacy": OcrPreset("legacy", dpi=200, mode="color", deskew=False, skip_blank=False, psm=3),
+}
+# The other presets are faster, but are not the default until ocr_benchmark.py has measured
+# their accuracy on real scans.
+DEFAULT_PRESET = "legacy"
+
+
+def get_preset(name: str) -> OcrPreset:
+    """Return the preset called `name`.
+
+    Raises:
+        ValueError: If there is no such preset.
+    """
+    if name not in PRESETS:
+        raise ValueError(f"Unknown OCR preset: {name}. Use one of: {', '.join(PRESETS)}")
+    return PRESETS[name]
+
+
+def otsu_threshold(histogram: List[int]) -> int:
+    """Return the gray level that best separates the ink from the background of a 256-bin histogram."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background, weighted_background = 0, 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def binarize(image: "Image.Image") -> "Image.Image":
+    """Threshold a grayscale image to black text on white at its Otsu level."""
+    threshold = otsu_threshold(image.histogram())
+    return image.point(lambda value: 255 if value > threshold else 0)
+
+
+def is_blank(image: "Image.Image", max_ink: float = BLANK_MAX_INK) -> bool:
+    """Check whether a grayscale page has next to no ink, apart from scanner noise.
+
+    Args:
+        image (Image.Image): The page in grayscale.
+        max_ink (float): The largest share of dark pixels a blank page may have.
+
+    Returns:
+        bool: True if the page has no meaningful content.
+    """
+    # A small copy is enough to count ink and much cheaper to scan than the full page.
+    thumbnail = image.copy()
+    thumbnail.thumbnail((600, 600))
+    histogram = thumbnail.histogram()
+    pixels = sum(histogram)
+    # Ink is whatever is clearly darker than the paper, whatever shade the paper is.
+    paper = max(range(256), key=lambda level: histogram[level])
+    dark = sum(histogram[:max(0, paper - 80)])
+    return pixels == 0 or dark / pixels <= max_ink
+
+
+def estimate_skew(image: "Image.Image", max_angle: float = 5.0) -> float:
+    """Estimate the rotation of the text lines in degrees, counterclockwise.
+
+    Lines of text give sharp peaks in the row sums of the page when they are horizontal,
+    so the angle whose rotation maximizes the variance of those sums is taken. A coarse
+    search over +-`max_angle` is refined around the best angle.
+
+    Args:
+        image (Image.Image): The page in grayscale.
+        max_angle (float): The largest rotation considered.
+
+    Returns:
+        float: The estimated angle; rotating by its negative straightens the page.
+    """
+    from PIL import Image, ImageOps
+
+    small = ImageOps.invert(image.convert("L"))
+    small.thumbnail((800, 800))
+
+    def score(angle: float) -> float:
+        rotated = small.rotate(angle, resample=Image.BILINEAR, expand=False, fillcolor=0)
+        # Averaging every row down to one pixel gives the row sums without a Python loop.
+        rows = rotated.resize((1, rotated.height), Image.BOX).tobytes()
+        mean = sum(rows) / len(rows)
+        return sum((value - mean) ** 2 for value in rows)
+
+    best = max(range(-int(max_angle), int(max_angle) + 1), key=lambda angle: score(-angle))
+    return max((best + step * 0.25 for step in range(-3, 4)), key=lambda angle: score(-angle))
+
+
+def deskew(image: "Image.Image", min_angle: float = 0.3) -> "Image.Image":
+    """Rotate a page so its text lines are horizontal; nearly straight pages are left alone."""
+    from PIL import Image
+
+    angle = estimate_skew(image)
+    if abs(angle) < min_angle:
+        return image
+    return image.rotate(-angle, resample=Image.BICUBIC, expand=True, fillcolor="white")
+
+
+def preprocess(image: "Image.Image", preset: OcrPreset) -> Optional["Image.Image"]:
+    """Prepare a rendered page for Tesseract.
+
+    Args:
+        image (Image.Image): The rendered page.
+        preset (OcrPreset): The preprocessing steps to apply.
+
+    Returns:
+        Optional[Image.Image]: The processed page, or None if it looks blank and only needs
+            a quick check.
+    """
+    page = image if preset.mode == "color" else image.convert("L")
+    if preset.skip_blank and is_blank(page.convert("L")):
+        return None
+    if preset.deskew:
+        page = deskew(page)
+    if preset.mode == "binarize":
+        page = binarize(page)
+    return page
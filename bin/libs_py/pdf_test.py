@@ -61,16 +61,15 @@ def pdfplumber_extract_text(pdf_path):
 
 if __name__ == "__main__":
 
-    from pdf2image import convert_from_path
-    import pytesseract
+    from model import ReadDocs
 
-    # Convert PDF pages to images
-    images = convert_from_path("input/wwi_russia.pdf")
-
-    # Extract text from each image
-    for image in images:
-        text = pytesseract.image_to_string(image, lang='ita')  # Use 'ita' for Italian text
-        print(text)
+    # The Tesseract language (Italian for this document) is detected from the first pages,
+    # among the languages given here whose pack is installed.
+    read_docs = ReadDocs(data_dir="input", use_text_layer=False, ocr_languages=["italian", "english"])
+    for page in read_docs.read_pdf_pages("input/wwi_russia.pdf"):
+        print(f"Page {page.page} ({page.language}):")
+        print(page.text)
+    read_docs.close()
     '''
     pdf_file_path = "input/wwi_russia.pdf"  # Replace with the actual path
     extracted_text = pdfplumber_extract_text(pdf_file_path)
@@ -0,0 +1,118 @@
+import re
+from typing import List, Dict, Set
+from dataclasses import dataclass, field
+
+from dedup import normalize
+
+# A card fails if its question is too short to be clear, its answer is missing or too long
+# to learn, or its answer mostly restates the question.
+MIN_QUESTION_WORDS = 3
+MAX_ANSWER_WORDS = 60
+MAX_ANSWER_OVERLAP = 0.7
+DIFFICULTIES = ("easy", "medium", "hard")
+# Decks of at least this many cards should not have more than this share at one difficulty.
+BALANCED_DECK_SIZE = 5
+MAX_DIFFICULTY_SHARE = 0.7
+
+# The "auto" card budget: one card per this many distinct terms, within these bounds.
+TERMS_PER_CARD = 45
+MIN_AUTO_CARDS = 3
+MAX_AUTO_CARDS = 60
+# Dates, numbers and names mid-sentence: the facts flash cards are usually made of.
+FACT = re.compile(r"(?<![.!?]\s)(?<!^)\b(?:\d{2,4}|[A-Z][\w-]+)\b", re.MULTILINE)
+
+
+def content_words(text: str) -> Set[str]:
+    return set(normalize(text).split())
+
+
+def card_issues(card: Dict[str, str]) -> List[str]:
+    """Return what is wrong with a card; an empty list means it passes.
+
+    Args:
+        card (Dict[str, str]): An object with 'question' and 'answer' fields.
+
+    Returns:
+        List[str]: Short descriptions of the problems found.
+    """
+    question, answer = card.get("question", ""), card.get("answer", "")
+    issues = []
+    if len(question.split()) < MIN_QUESTION_WORDS:
+        issues.append("question too short")
+    answer_words = len(answer.split())
+    if answer_words == 0:
+        issues.append("empty answer")
+    elif answer_words > MAX_ANSWER_WORDS:
+        issues.append("answer too long")
+    answer_terms = content_words(answer)
+    if answer_terms and len(answer_terms & content_words(question)) / len(answer_terms) > MAX_ANSWER_OVERLAP:
+        issues.append("answer repeats the question")
+    return issues
+
+
+@dataclass
+class QualityReport:
+    """The result of checking a deck of cards against the concepts of its document."""
+    # Failing cards by index, with their problems.
+    issues: Dict[int, List[str]] = field(default_factory=dict)
+    # Number of distinct key concepts checked, and those no card asks or answers about.
+    concepts: int = 0
+    uncovered: List[str] = field(default_factory=list)
+    difficulties: Dict[str, int] = field(default_factory=dict)
+    # Difficulties the deck has too few cards of.
+    underrepresented: List[str] = field(default_factory=list)
+
+    @property
+    def coverage(self) -> float:
+        """Share of the key concepts covered by at least one card."""
+        return 1.0 - len(self.uncovered) / self.concepts if self.concepts else 1.0
+
+
+def review_cards(cards: List[Dict[str, str]], concepts: List[str]) -> QualityReport:
+    """Score a deck locally, without any LLM call.
+
+    Args:
+        cards (List[Dict[str, str]]): Objects with 'question', 'answer' and 'difficulty' fields.
+        concepts (List[str]): The key concepts of the source text, e.g. from extract_key_concepts.
+
+    Returns:
+        QualityReport: The failing cards, uncovered concepts and difficulty balance.
+    """
+    report = QualityReport(concepts=len(set(concepts)))
+    terms = set()
+    for index, card in enumerate(cards):
+        problems = card_issues(card)
+        if problems:
+            report.issues[index] = problems
+        terms |= content_words(f"{card.get('question', '')} {card.get('answer', '')}")
+        difficulty = card.get("difficulty") if card.get("difficulty") in DIFFICULTIES else "medium"
+        report.difficulties[difficulty] = report.difficulties.get(difficulty, 0) + 1
+
+    # A concept counts as covered when most of its words appear in some card.
+    for concept in dict.fromkeys(concepts):
+        concept_terms = content_words(concept)
+        if concept_terms and len(concept_terms & terms) < len(concept_terms) / 2:
+            report.uncovered.append(concept)
+
+    if len(cards) >= BALANCED_DECK_SIZE and max(report.difficulties.values()) > MAX_DIFFICULTY_SHARE * len(cards):
+        report.underrepresented = [difficulty for difficulty in DIFFICULTIES
+                                   if report.difficulties.get(difficulty, 0) < len(cards) / (2 * len(DIFFICULTIES))]
+    return report
+
+
+def auto_num_cards(text: str) -> int:
+    """Size a deck from how much there is to learn in a text.
+
+    Counts distinct content words, with distinct facts (numbers, dates and names) counted
+    twice. Vocabulary grows much more slowly than length when a text repeats itself, so
+    long but thin documents get fewer cards than short dense ones of the same size would
+    suggest.
+
+    Args:
+        text (str): The document text.
+
+    Returns:
+        int: The number of cards to generate.
+    """
+    terms = len(content_words(text)) + len(set(FACT.findall(text)))
+    return max(MIN_AUTO_CARDS, min(MAX_AUTO_CARDS, round(terms / TERMS_PER_CARD)))
@@ -0,0 +1,43 @@
+from cache import ResponseCache
+from model import AnalyzeDocs
+
+
+def stored_bytes(cache):
+    return cache._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def test_size_total_follows_writes_and_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=100)
+    cache.set("a", "x" * 40)
+    cache.set("b", "y" * 40)
+    cache.set("a", "z" * 10)
+    assert cache.stats()["bytes"] == stored_bytes(cache) == 50
+
+    cache.set("c", "w" * 70)
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] == stored_bytes(cache) == 80
+
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
+
+
+def test_size_total_of_an_existing_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path)
+    cache.set("a", "x" * 30)
+    cache._conn.execute("DROP TABLE cache_size")
+    cache._conn.commit()
+
+    assert ResponseCache(path).stats()["bytes"] == 30
+
+
+def test_requests_can_skip_the_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+    analyze_docs = AnalyzeDocs(backend="fake", cache=cache)
+    text = "Photosynthesis turns light into chemical energy. " * 20
+
+    analyze_docs.generate_flashcards(text, 2, use_cache=False)
+    assert cache.stats()["entries"] == 0
+    analyze_docs.generate_flashcards(text, 2)
+    assert cache.stats()["entries"] > 0
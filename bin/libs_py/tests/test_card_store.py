@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+
+import pytest
+
+from card_store import CardStore, export_anki, export_csv, export_json
+from test_dedup import NEAR_MISSES, DUPLICATES
+
+
+def card(prompt, answer="An answer", section="s1"):
+    return {"prompt": prompt, "answer": answer, "category": "History", "difficulty": "easy", "section": section}
+
+
+def test_decks_remember_the_requested_card_count(tmp_path):
+    store = CardStore(str(tmp_path / "cards.sqlite3"))
+    five = store.add_cards([card("What is a treaty?")], source="a.txt", language="english", num_cards=5)
+    auto = store.add_cards([card("What is a parliament?")], source="a.txt", language="english", num_cards="auto")
+    unknown = store.add_cards([card("What is a senate?")], source="a.txt", language="english")
+
+    assert store.requested_cards(five) == "5"
+    assert store.requested_cards(auto) == "auto"
+    assert store.requested_cards(unknown) is None
+    store.delete_deck(five)
+    assert store.requested_cards(five) is None
+
+
+def test_pages_follow_insertion_order_and_filters(tmp_path):
+    store = CardStore(str(tmp_path / "cards.sqlite3"))
+    english = store.add_cards([card(f"English question {index}?") for index in range(5)],
+                              source="a.txt", language="english")
+    store.add_cards([card(f"Domanda {index}?") for index in range(3)], source="b.txt", language="italian")
+
+    first = store.query(limit=2, language="english")
+    second = store.query(after=first[-1]["id"], limit=2, language="english")
+    last = store.query(after=second[-1]["id"], limit=2, language="english")
+    assert [c["prompt"] for c in first + second + last] == [f"English question {index}?" for index in range(5)]
+    assert len(last) == 1 and all(c["deck"] == english for c in first + second + last)
+
+    assert [c["prompt"] for c in store.iter_cards(batch_size=2, source="b.txt")] == \
+        ["Domanda 0?", "Domanda 1?", "Domanda 2?"]
+    assert store.count() == 8
+    assert store.count(language="italian", difficulty="easy") == 3
+    # None means "any value", as for a filter left out of the request.
+    assert store.count(language=None) == 8
+    with pytest.raises(ValueError):
+        store.query(prompt="English question 0?")
+
+
+def test_decks_by_source_and_section(tmp_path):
+    store = CardStore(str(tmp_path / "cards.sqlite3"))
+    old = store.add_cards([card("What is a treaty?")], source="a.txt", language="english", sections=["s1"])
+    new = store.add_cards([card("What is a senate?", section="s2"), card("What is a law?", section=None)],
+                          source="a.txt", language="english", sections=["s1", "s2"])
+
+    assert store.latest_deck("a.txt") == store.latest_deck("a.txt", language="english") == new
+    assert store.latest_deck("a.txt", language="italian") is None
+    sections = store.deck_sections(new)
+    assert list(sections) == ["s1", "s2"]
+    assert sections["s1"] == []
+    assert [c["prompt"] for c in sections["s2"]] == ["What is a senate?"]
+
+    assert store.delete_deck(new) == 2
+    assert store.delete_deck(new) == 0
+    assert store.deck_sections(new) == {}
+    assert store.latest_deck("a.txt") == old
+    assert store.count() == 1
+
+
+EXPORTED = [
+    {"id": 1, "deck": "d", "source": "a.txt", "language": "italian", "category": "World History",
+     "difficulty": "hard", "prompt": "Perché \"Versailles\"?", "answer": "Trattato,\tfirmato\nnel 1919"},
+    {"id": 2, "deck": "d", "source": "a.txt", "language": "italian", "category": None,
+     "difficulty": None, "prompt": "Chi?", "answer": "Wilson"},
+]
+
+
+def test_exports_round_trip():
+    assert json.loads("".join(export_json(EXPORTED))) == EXPORTED
+    assert json.loads("".join(export_json([]))) == []
+
+    rows = list(csv.DictReader(io.StringIO("".join(export_csv(EXPORTED)))))
+    assert [row["prompt"] for row in rows] == [c["prompt"] for c in EXPORTED]
+    assert rows[0]["answer"] == EXPORTED[0]["answer"]
+    assert rows[1]["category"] == ""
+
+    lines = "".join(export_anki(EXPORTED)).splitlines()
+    assert lines[:3] == ["#separator:tab", "#html:false", "#tags column:3"]
+    assert lines[3].split("\t") == ['Perché "Versailles"?', "Trattato, firmato nel 1919", "World_History hard"]
+    assert lines[4].split("\t") == ["Chi?", "Wilson", ""]
+
+
+def stored(card):
+    return {"prompt": card["question"], "answer": card["answer"], "category": None, "difficulty": "medium"}
+
+
+def test_near_misses_are_not_duplicates_across_decks(tmp_path):
+    store = CardStore(str(tmp_path / "cards.sqlite3"))
+    store.add_cards([stored(first) for first, _ in NEAR_MISSES], language="english")
+
+    matches = store.find_duplicates([stored(second) for _, second in NEAR_MISSES], language="english")
+    assert matches == [None] * len(NEAR_MISSES)
+
+
+def test_duplicates_are_found_across_decks(tmp_path):
+    store = CardStore(str(tmp_path / "cards.sqlite3"))
+    store.add_cards([stored(first) for first, _ in DUPLICATES], language="english")
+    ids = [card["id"] for card in store.iter_cards()]
+
+    assert store.find_duplicates([stored(second) for _, second in DUPLICATES], language="english") == ids
+    assert store.find_duplicates([stored(second) for _, second in DUPLICATES], language="italian") == [None] * 3
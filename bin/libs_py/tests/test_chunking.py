@@ -0,0 +1,77 @@
+from benchmark import synthetic_text
+from chunking import allocate_cards, estimate_tokens, group_chunks, section_hash, split_sections
+
+
+def test_allocate_cards_is_proportional():
+    assert allocate_cards([10, 20, 30], 6) == [1, 2, 3]
+    assert allocate_cards([100, 300], 8) == [2, 6]
+
+
+def test_allocate_cards_sums_to_total():
+    for weights in ([7, 3, 9, 1], [1] * 13, [500, 1, 1, 500]):
+        for total in range(0, 30):
+            counts = allocate_cards(weights, total)
+            assert sum(counts) == total
+            assert all(count >= 0 for count in counts)
+
+
+def test_allocate_cards_spreads_few_cards_over_the_whole_document():
+    counts = allocate_cards([100] * 50, 10)
+    assert sum(counts) == 10
+    assert max(counts) == 1
+    cards_at = [index for index, count in enumerate(counts) if count]
+    # One card in every stretch of five chunks, not ten cards in the first ten chunks.
+    assert [index // 5 for index in cards_at] == list(range(10))
+
+
+def test_allocate_cards_without_weights():
+    assert allocate_cards([0, 0, 0], 3) == [1, 1, 1]
+    assert allocate_cards([], 0) == []
+
+
+def test_group_chunks_covers_every_chunk():
+    counts = allocate_cards([100] * 50, 10)
+    groups = group_chunks(counts)
+    assert len(groups) == 10
+    assert [index for group in groups for index in group] == list(range(50))
+    assert all(sum(1 for index in group if counts[index]) == 1 for group in groups)
+
+
+def test_group_chunks_attaches_to_nearest():
+    assert group_chunks([0, 0, 1, 0, 0, 0, 1]) == [[0, 1, 2, 3, 4], [5, 6]]
+    assert group_chunks([2, 0, 1]) == [[0, 1], [2]]
+    assert group_chunks([0, 0]) == []
+
+
+def test_split_sections_keeps_the_whole_text():
+    text = synthetic_text(30000, 5)
+    sections = split_sections(text)
+    assert len(sections) > 5
+    assert "\n\n".join(sections) == text
+    # A section is closed by the paragraph that takes it past the limit, so it overshoots by less than one paragraph.
+    longest = max(estimate_tokens(paragraph) for paragraph in text.split("\n\n"))
+    assert all(estimate_tokens(section) < 1000 + longest for section in sections)
+
+
+def test_split_sections_starts_a_section_at_each_heading():
+    text = "# Causes\n\nThe treaty was harsh.\n\n# Consequences\n\nThe economy collapsed."
+    assert split_sections(text) == ["# Causes\n\nThe treaty was harsh.", "# Consequences\n\nThe economy collapsed."]
+
+
+def test_an_edit_only_changes_its_own_section():
+    text = synthetic_text(30000, 5)
+    paragraphs = text.split("\n\n")
+    before = [section_hash(section) for section in split_sections(text)]
+    # A paragraph in the middle grows and one near the start is removed.
+    paragraphs[len(paragraphs) // 2] += " Parliament ratified the treaty in the spring."
+    del paragraphs[3]
+    after = [section_hash(section) for section in split_sections("\n\n".join(paragraphs))]
+
+    # Each edit changes its section, and at most the next one when it moves a boundary.
+    assert len(set(before) - set(after)) <= 4
+    assert len(set(after) - set(before)) <= 4
+
+
+def test_section_hash_ignores_whitespace():
+    assert section_hash("The treaty  was\nsigned.\n") == section_hash("  The treaty was signed.")
+    assert section_hash("The treaty was signed.") != section_hash("The treaty was signed in 1919.")
@@ -0,0 +1,57 @@
+import pytest
+
+from dedup import deduplicate, distinguishing_tokens
+
+
+def card(question, answer):
+    return {"question": question, "answer": answer, "difficulty": "medium"}
+
+
+# Questions that look alike but ask different things.
+NEAR_MISSES = [
+    (card("When did World War I begin?", "1914"), card("When did World War II begin?", "1939")),
+    (card("Who was the first president of the United States?", "George Washington"),
+     card("Who was the second president of the United States?", "John Adams")),
+    (card("What is the capital of France?", "Paris"), card("What is the capital of Spain?", "Madrid")),
+    (card("What does Newton's first law state?",
+          "An object stays at rest or in uniform motion unless acted on by a force"),
+     card("What does Newton's second law state?", "Force equals mass times acceleration")),
+    (card("What is the boiling point of water at sea level?", "100 degrees Celsius"),
+     card("What is the freezing point of water at sea level?", "0 degrees Celsius")),
+]
+
+# The same card, worded differently.
+DUPLICATES = [
+    (card("When did World War I begin?", "In 1914"), card("In what year did World War I begin?", "1914")),
+    (card("What is photosynthesis?", "The process by which plants convert light into chemical energy"),
+     card("What is photosynthesis?", "The process plants use to turn light energy into chemical energy")),
+    (card("What is the main function of the mitochondria?", "Producing energy for the cell as ATP"),
+     card("What is the function of the mitochondria?", "They produce energy for the cell as ATP")),
+]
+
+
+@pytest.mark.parametrize("first, second", NEAR_MISSES)
+def test_near_misses_are_kept(first, second):
+    kept, duplicates = deduplicate([first, second])
+    assert kept == [first, second]
+    assert duplicates == []
+
+
+@pytest.mark.parametrize("first, second", DUPLICATES)
+def test_duplicates_are_dropped(first, second):
+    kept, duplicates = deduplicate([first, second])
+    assert kept == [first]
+    assert duplicates == [(second, 0)]
+
+
+def test_deck_keeps_first_of_each_duplicate():
+    deck = [second for _, second in DUPLICATES] + [near for pair in NEAR_MISSES[1:] for near in pair] + \
+        [first for first, _ in DUPLICATES]
+    kept, duplicates = deduplicate(deck)
+    assert kept == deck[:-len(DUPLICATES)]
+    assert duplicates == [(first, index) for index, (first, _) in enumerate(DUPLICATES)]
+
+
+def test_distinguishing_tokens():
+    assert distinguishing_tokens("When did World War II begin? In 1939.") == {"ii", "1939"}
+    assert distinguishing_tokens("Who was the first president?") == {"first"}
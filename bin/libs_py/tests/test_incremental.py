@@ -0,0 +1,36 @@
+from benchmark import synthetic_text
+from chunking import split_sections, section_hash
+from model import AnalyzeDocs
+
+
+def previous_deck(text, cards):
+    previous = {section_hash(section): [] for section in split_sections(text)}
+    for card in cards:
+        previous[card.section].append(card)
+    return previous
+
+
+def test_revisions_keep_the_requested_deck_size():
+    analyze_docs = AnalyzeDocs(backend="fake")
+    text = synthetic_text(30000, 7)
+    cards = analyze_docs.generate_flashcards(text, 10)
+    assert len(cards) == 10
+    for revision in range(3):
+        sections = split_sections(text)
+        sections[revision * 3] += f" A remark number {revision} about parliament and treaties."
+        revised = "\n\n".join(sections)
+        new_cards = analyze_docs.generate_flashcards(revised, 10, previous=previous_deck(text, cards))
+        assert len(new_cards) == 10
+        # Only the edited section's cards are regenerated.
+        assert len({card.prompt for card in new_cards} & {card.prompt for card in cards}) >= 8
+        text, cards = revised, new_cards
+
+
+def test_unchanged_document_reuses_every_card():
+    analyze_docs = AnalyzeDocs(backend="fake")
+    text = synthetic_text(12000, 3)
+    cards = analyze_docs.generate_flashcards(text, 6)
+    calls = analyze_docs.llm.get_stats()["requests"]
+    again = analyze_docs.generate_flashcards(text, 6, previous=previous_deck(text, cards))
+    assert [card.prompt for card in again] == [card.prompt for card in cards]
+    assert analyze_docs.llm.get_stats()["requests"] == calls
@@ -0,0 +1,50 @@
+import time
+
+from jobs import JobStore
+
+
+def test_fail_unfinished_only_touches_listed_jobs(tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.sqlite3"))
+    queued, running, other = store.create("a.pdf"), store.create("b.pdf"), store.create("c.pdf")
+    running.report({"stage": "read"})
+
+    assert store.fail_unfinished("Server shut down", job_ids=[queued.id, running.id]) == 2
+    assert queued.status == running.status == "failed"
+    assert other.status == "queued"
+    events, finished = running.events_since(0)
+    assert finished and events[-1] == {"stage": "error", "detail": "Server shut down"}
+
+
+def test_stale_jobs_are_failed_and_purged(tmp_path):
+    store = JobStore(ttl=0, path=str(tmp_path / "jobs.sqlite3"), stale_after=0)
+    job = store.create("a.pdf")
+    job.report({"stage": "read"})
+    time.sleep(0.01)
+
+    store.purge()
+    assert store.get(job.id) is None
+
+
+def test_finished_job_stays_finished(tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.sqlite3"))
+    job = store.create("a.pdf")
+    store.fail_unfinished("Job stopped responding", job_ids=[job.id])
+
+    job.finish([{"question": "Q", "answer": "A"}])
+    assert job.status == "failed"
+    assert job.to_json()["error"] == "Job stopped responding"
+
+
+def test_failed_job_takes_no_more_events(tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.sqlite3"))
+    job = store.create("a.pdf")
+    job.report({"stage": "card", "index": 0, "card": {"prompt": "Q1", "answer": "A1"}})
+    store.fail_unfinished("Job stopped responding", job_ids=[job.id])
+
+    # The worker carries on, unaware the job was given up on.
+    job.report({"stage": "card", "index": 1, "card": {"prompt": "Q2", "answer": "A2"}})
+    job.finish([{"prompt": "Q1", "answer": "A1"}, {"prompt": "Q2", "answer": "A2"}])
+    events, finished = job.events_since(0)
+    assert finished
+    assert [event["stage"] for event in events] == ["card", "error"]
+    assert job.cards == [{"prompt": "Q1", "answer": "A1"}]
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from json_stream import JsonArrayStream, parse_json_items
+from model import parse_json_array, valid_cards
+
+CARDS = [{"question": "What is a treaty?", "answer": "A formal agreement [between states]"},
+         {"question": 'What is a "senate"?', "answer": "An assembly, e.g. of Rome"}]
+ARRAY = json.dumps(CARDS)
+
+
+def feed_in_pieces(stream, text, size):
+    items = []
+    for start in range(0, len(text), size):
+        items += stream.feed(text[start:start + size])
+    return items
+
+
+def test_truncated_tail_keeps_the_complete_elements():
+    truncated = ARRAY[:-1] + ', {"question": "What is a vote?", "answ'
+    assert parse_json_items(truncated) == CARDS
+    assert parse_json_array(truncated) == CARDS
+
+
+def test_stray_bracket_in_prose_is_skipped():
+    response = f"Some [note] then the cards:\n{ARRAY}"
+    assert parse_json_items(response) == CARDS
+    assert parse_json_array(response) == CARDS
+    stream = JsonArrayStream()
+    assert feed_in_pieces(stream, response, 3) == CARDS
+    assert stream.skipped == 0
+
+
+def test_malformed_element_is_skipped():
+    response = ARRAY[:-1] + ', {"question": "What is a vote?" "answer": "A choice"}, ' + json.dumps(CARDS[0]) + "]"
+    stream = JsonArrayStream()
+    assert stream.feed(response) == CARDS + CARDS[:1]
+    assert stream.skipped == 1
+    assert stream.complete
+
+
+def test_valid_cards_needs_a_question_and_an_answer():
+    items = CARDS + [{"question": "What is a vote?", "answer": "  "}, {"question": "Who?"}, ["Q", "A"],
+                     {"question": None, "answer": "A"}]
+    assert valid_cards(items) == CARDS
+
+
+def test_keyed_array_ignores_other_arrays():
+    response = json.dumps({"category": "History", "key_concepts": ["treaty", "senate"], "cards": CARDS})
+    assert parse_json_items(response, "cards") == CARDS
+    assert parse_json_items(response, "key_concepts") == ["treaty", "senate"]
+
+
+def test_closing_fence_split_across_chunks():
+    response = f"```json\n{ARRAY}\n```"
+    for size in (1, 2, 5, 7):
+        stream = JsonArrayStream()
+        assert feed_in_pieces(stream, response, size) == CARDS
+        assert stream.complete
+
+
+def test_empty_array_and_missing_array():
+    assert parse_json_array("[]") == []
+    with pytest.raises(json.JSONDecodeError):
+        parse_json_array("No cards, sorry.")
@@ -0,0 +1,62 @@
+import pytesseract
+
+from language import (DEFAULT_OCR_LANGUAGES, detect_language, document_language, resolve_target,
+                      tesseract_languages)
+from model import PageText, ReadDocs
+
+SAMPLES = {
+    "english": "The treaty was signed in the palace of Versailles and it is one of the documents that "
+               "ended the war. The terms were harsh for Germany, which had to accept the blame.",
+    "italian": "Il trattato fu firmato nella reggia di Versailles ed è uno dei documenti che posero fine "
+               "alla guerra. Le condizioni per la Germania furono dure e non sono mai state accettate.",
+    "french": "Le traité est signé dans le château de Versailles et il met fin à la guerre. Les conditions "
+              "sont dures pour l'Allemagne, qui ne les accepte pas et qui se sent humiliée par ce texte.",
+    "german": "Der Vertrag wurde im Schloss von Versailles unterzeichnet und ist eines der Dokumente, die den "
+              "Krieg beendeten. Die Bedingungen waren für das Reich hart und wurden nicht akzeptiert.",
+    "russian": "Версальский договор был подписан в 1919 году и завершил Первую мировую войну.",
+    "greek": "Η Συνθήκη των Βερσαλλιών υπογράφηκε το 1919 και τερμάτισε τον Πρώτο Παγκόσμιο Πόλεμο.",
+}
+
+
+def test_default_languages_are_filtered_by_the_installed_packs(monkeypatch):
+    monkeypatch.setattr(pytesseract, "get_languages", lambda config="": ["eng", "ita", "osd"])
+    read_docs = ReadDocs()
+    assert read_docs.ocr_languages == DEFAULT_OCR_LANGUAGES
+    assert read_docs.available_ocr_languages == ["english", "italian"]
+
+
+def test_english_only_hosts_fall_back_to_english(monkeypatch):
+    monkeypatch.setattr(pytesseract, "get_languages", lambda config="": ["eng"])
+    assert ReadDocs().available_ocr_languages == ["english"]
+
+
+def test_detect_language():
+    for language, text in SAMPLES.items():
+        assert detect_language(text) == language
+
+
+def test_detect_language_is_unsure_of_little_text():
+    assert detect_language("") is None
+    assert detect_language("1919 - 2024") is None
+    assert detect_language("The treaty of Versailles.") is None
+    # "de" and "la" are as French as they are Spanish: no clear winner.
+    assert detect_language("de la de la de la de la de la") is None
+
+
+def test_document_language_weighs_pages_by_length():
+    pages = [PageText(1, SAMPLES["english"][:40], "ocr", "english"),
+             PageText(2, SAMPLES["italian"], "text_layer", "italian"),
+             PageText(3, "", "blank")]
+    assert document_language(pages) == "italian"
+    assert document_language([PageText(1, "42", "ocr")]) is None
+
+
+def test_tesseract_languages():
+    assert tesseract_languages(["english", "italian"]) == "eng+ita"
+    assert tesseract_languages(["greek"]) == "ell"
+
+
+def test_resolve_target():
+    assert resolve_target("auto", "italian") == "italian"
+    assert resolve_target(None, None) == "english"
+    assert resolve_target("French", "italian") == "french"
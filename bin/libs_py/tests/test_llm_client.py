@@ -0,0 +1,22 @@
+import sys
+
+import pytest
+
+from backends import BackendRateLimitError
+from fake_groq import FakeGroq
+from llm_client import RateLimitedClient
+
+
+def test_rate_limits_are_retried_without_the_groq_sdk(monkeypatch):
+    # None in sys.modules makes `import groq` fail, as on a host without the SDK.
+    monkeypatch.setitem(sys.modules, "groq", None)
+    fake = FakeGroq(latency=0.0, requests_per_minute=1)
+    client = RateLimitedClient(fake, max_delay=0.01)
+    messages = [{"role": "user", "content": "Categorize this text: photosynthesis"}]
+
+    client.complete("model", messages, 0.7)
+    # The fake stays over its limit for a minute, so every retry is rejected too.
+    with pytest.raises(BackendRateLimitError):
+        client.complete("model", messages + [{"role": "user", "content": "again"}], 0.7)
+    assert fake.rate_limited == 3
+    assert client.get_stats()["rate_limited"] == 2
@@ -0,0 +1,18 @@
+from metrics import Registry, Counter, Histogram
+
+
+def test_registry_labels_every_sample():
+    registry = Registry()
+    pages = registry.register(Counter("pages_total", "Pages.", ["method"]))
+    calls = registry.register(Counter("calls_total", "Calls."))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", buckets=(1.0,)))
+    pages.inc(method="ocr")
+    calls.inc()
+    latency.observe(0.5)
+    registry.labels["worker"] = "42"
+
+    lines = registry.render().splitlines()
+    assert 'pages_total{method="ocr",worker="42"} 1' in lines
+    assert 'calls_total{worker="42"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0",worker="42"} 1' in lines
+    assert all('worker="42"' in line for line in lines if not line.startswith("#"))
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from ocr_preprocess import PRESETS, DEFAULT_PRESET, is_blank, preprocess
+
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+ImageFont = pytest.importorskip("PIL.ImageFont")
+
+PAGE_SIZE = (1700, 2200)
+
+
+def page_with(text, size):
+    image = Image.new("L", PAGE_SIZE, 245)
+    ImageDraw.Draw(image).text((600, 900), text, fill=20, font=ImageFont.load_default(size=size))
+    return image
+
+
+def test_sparse_pages_are_not_blank():
+    assert not is_blank(page_with("Chapter 3", 60))
+    assert not is_blank(page_with("Appendix", 40))
+    assert not is_blank(page_with("Notes", 24))
+
+
+def test_empty_and_speckled_pages_are_blank():
+    assert is_blank(Image.new("L", PAGE_SIZE, 245))
+    image = Image.new("L", PAGE_SIZE, 230)
+    rng = random.Random(0)
+    draw = ImageDraw.Draw(image)
+    for _ in range(1500):
+        draw.point((rng.randrange(PAGE_SIZE[0]), rng.randrange(PAGE_SIZE[1])), fill=rng.randint(0, 160))
+    assert is_blank(image)
+
+
+def test_default_preset_reads_every_page():
+    assert not PRESETS[DEFAULT_PRESET].skip_blank
+    assert preprocess(Image.new("L", PAGE_SIZE, 245), PRESETS[DEFAULT_PRESET]) is not None
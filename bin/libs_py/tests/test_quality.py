@@ -0,0 +1,49 @@
+from quality import card_issues, review_cards, auto_num_cards, MIN_AUTO_CARDS, MAX_AUTO_CARDS
+
+
+def card(question, answer, difficulty="medium"):
+    return {"question": question, "answer": answer, "difficulty": difficulty}
+
+
+def test_good_card_passes():
+    assert card_issues(card("When was the Treaty of Versailles signed?", "On 28 June 1919")) == []
+
+
+def test_card_issues():
+    assert card_issues(card("Versailles?", "1919")) == ["question too short"]
+    assert card_issues(card("When was the treaty signed?", "")) == ["empty answer"]
+    assert card_issues(card("What did the treaty say?", "word " * 61)) == ["answer too long"]
+    assert card_issues(card("What is the capital of France?", "The capital of France")) == \
+        ["answer repeats the question"]
+
+
+def test_review_reports_failing_cards_and_coverage():
+    cards = [card("When was the Treaty of Versailles signed?", "In 1919", "easy"),
+             card("Versailles?", "1919", "easy")]
+    report = review_cards(cards, ["Treaty of Versailles", "League of Nations", "League of Nations"])
+    assert report.issues == {1: ["question too short"]}
+    assert report.concepts == 2
+    assert report.uncovered == ["League of Nations"]
+    assert report.coverage == 0.5
+
+
+def test_review_flags_one_sided_difficulty():
+    cards = [card(f"What happened in the year {1900 + index}?", f"Event number {index}", "easy")
+             for index in range(6)]
+    report = review_cards(cards, [])
+    assert report.difficulties == {"easy": 6}
+    assert report.underrepresented == ["medium", "hard"]
+    assert review_cards(cards[:4], []).underrepresented == []
+
+
+def facts(count):
+    return " ".join(f"Reign number {index} began in {1000 + index}." for index in range(count))
+
+
+def test_auto_budget_grows_with_content_within_bounds():
+    assert auto_num_cards("") == MIN_AUTO_CARDS
+    short, dense = auto_num_cards(facts(200)), auto_num_cards(facts(600))
+    assert MIN_AUTO_CARDS <= short < dense < MAX_AUTO_CARDS
+    # Repeating a text adds no new terms, so no cards.
+    assert auto_num_cards(facts(200) * 5) == short
+    assert auto_num_cards(facts(5000)) == MAX_AUTO_CARDS
@@ -0,0 +1,57 @@
+from pypdf import PdfReader
+
+from model import ReadDocs, image_coverage, is_plausible_text
+
+BATES = "CONFIDENTIAL ACME-000123 Page 1"
+PARAGRAPH = ("The treaty was signed by both parliaments after a long debate about trade and borders. " * 6).strip()
+
+
+def make_pdf(path, drawing: str, text: str):
+    """Write a one-page PDF that draws a 1x1 image with `drawing` and shows `text` in lines."""
+    lines = " ".join(f"({text[start:start + 90]}) Tj 0 -12 Td" for start in range(0, len(text), 90))
+    content = f"q {drawing} /Im1 Do Q BT /F1 10 Tf 20 760 Td {lines} ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 5 0 R /Resources "
+        b"<< /Font << /F1 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica >> >> /XObject << /Im1 4 0 R >> >> >>",
+        b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray /BitsPerComponent 8 "
+        b"/Length 1 >>\nstream\n\x80\nendstream",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+    ]
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(pdf)
+    return PdfReader(str(path))
+
+
+def test_image_coverage_follows_the_transformation(tmp_path):
+    assert image_coverage(make_pdf(tmp_path / "full.pdf", "612 0 0 792 0 0 cm", BATES).pages[0]) == 1.0
+    logo = make_pdf(tmp_path / "logo.pdf", "1 0 0 1 30 30 cm 61.2 0 0 79.2 0 0 cm", BATES).pages[0]
+    assert abs(image_coverage(logo) - 0.01) < 1e-9
+
+
+def test_stamped_scan_is_ocrd(tmp_path):
+    read_docs = ReadDocs()
+    scan = make_pdf(tmp_path / "scan.pdf", "612 0 0 792 0 0 cm", BATES)
+    assert read_docs.extract_text_layer(scan, 1) is None
+    # A searchable scan, with the page's text over the image, keeps its text layer.
+    searchable = make_pdf(tmp_path / "searchable.pdf", "612 0 0 792 0 0 cm", PARAGRAPH * 2)
+    assert read_docs.extract_text_layer(searchable, 1) is not None
+    # So does a text page with a small logo.
+    letter = make_pdf(tmp_path / "letter.pdf", "61.2 0 0 79.2 0 0 cm", BATES)
+    assert read_docs.extract_text_layer(letter, 1) is not None
+
+
+def test_plausible_text():
+    assert is_plausible_text(PARAGRAPH)
+    assert not is_plausible_text("p. 3")
+    assert not is_plausible_text("��#@$%^&*~`|<>" * 5)
+    assert not is_plausible_text(BATES, image_coverage=0.9)
+    assert is_plausible_text(BATES, image_coverage=0.2)
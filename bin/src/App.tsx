@@ -10,6 +10,7 @@ import { Toaster } from 'react-hot-toast';
 function MainContent() {
   const { user } = useAuth();
   const [flashcards, setFlashcards] = useState<Flashcard[]>([]);
+  const [deckId, setDeckId] = useState<string | null>(null);
   const [showRegister, setShowRegister] = useState(false);
 
   if (!user.isAuthenticated) {
@@ -26,8 +27,14 @@ function MainContent() {
 
   return (
     <div className="min-h-screen bg-gray-50 py-12">
-      <FileUpload onFlashcardsReceived={setFlashcards} />
-      {flashcards.length > 0 && <FlashcardList flashcards={flashcards} />}
+      <FileUpload
+        onFlashcardsReceived={(cards) => {
+          setFlashcards(cards);
+          setDeckId(null);
+        }}
+        onDeckSaved={setDeckId}
+      />
+      {(flashcards.length > 0 || deckId) && <FlashcardList flashcards={flashcards} deckId={deckId} />}
     </div>
   );
 }
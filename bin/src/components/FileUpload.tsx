@@ -6,18 +6,83 @@ import toast from 'react-hot-toast';
 
 interface FileUploadProps {
   onFlashcardsReceived: (flashcards: Flashcard[]) => void;
+  onDeckSaved?: (deckId: string) => void;
 }
 
 const MAX_FILE_SIZE = 5 * 1024 * 1024; // 5MB
+const API_URL = 'http://127.0.0.1:8000';
 
-export function FileUpload({ onFlashcardsReceived }: FileUploadProps) {
+interface JobEvent {
+  stage: 'page' | 'read' | 'analysis' | 'generation' | 'language' | 'translation' | 'card' | 'done' | 'error';
+  page?: number;
+  pages?: number;
+  method?: string;
+  step?: string;
+  chunk?: number;
+  chunks?: number;
+  num_cards?: number;
+  duplicates?: number;
+  failed?: number;
+  replaced?: number;
+  language?: string;
+  source?: string | null;
+  index?: number;
+  card?: Flashcard;
+  update?: boolean;
+  removed?: boolean;
+  deck?: string | null;
+  detail?: string;
+}
+
+function describeEvent(event: JobEvent): string {
+  switch (event.stage) {
+    case 'page':
+      return `Read page ${event.page} of ${event.pages}...`;
+    case 'read':
+      return 'Analyzing document...';
+    case 'analysis':
+      if (event.step === 'dedup') {
+        return `Replaced ${event.replaced ?? 0} of ${event.duplicates} duplicate flashcards...`;
+      }
+      if (event.step === 'budget') {
+        return `Planning ${event.num_cards} flashcards for this document...`;
+      }
+      if (event.step === 'quality') {
+        return `Replaced ${event.replaced} of ${event.failed} flashcards that failed quality checks...`;
+      }
+      return event.chunks
+        ? `Finished ${event.step} for part ${event.chunk} of ${event.chunks}...`
+        : `Finished ${event.step}...`;
+    case 'generation':
+      return `Generating ${event.num_cards} flashcards...`;
+    case 'language':
+      return event.source
+        ? `Detected ${event.source}, writing flashcards in ${event.language}...`
+        : `Writing flashcards in ${event.language}...`;
+    case 'translation':
+      return `Translating to ${event.language}...`;
+    case 'card':
+      if (event.removed) {
+        return `Removed flashcard ${(event.index ?? 0) + 1}...`;
+      }
+      return event.update
+        ? `Revised flashcard ${(event.index ?? 0) + 1}...`
+        : `Received flashcard ${(event.index ?? 0) + 1}...`;
+    default:
+      return '';
+  }
+}
+
+export function FileUpload({ onFlashcardsReceived, onDeckSaved }: FileUploadProps) {
   const [file, setFile] = useState<File | null>(null);
   const [uploading, setUploading] = useState(false);
   const [error, setError] = useState('');
   const [language, setLanguage] = useState('english');
   const [numFlashcards, setNumFlashcards] = useState(5);
+  const [autoFlashcards, setAutoFlashcards] = useState(false);
   const [flashcards, setFlashcards] = useState<Flashcard[]>([]);
   const [textPreview, setTextPreview] = useState<string>('');
+  const [progress, setProgress] = useState('');
   const { user } = useAuth();
 
   useEffect(() => {
@@ -57,20 +122,52 @@ export function FileUpload({ onFlashcardsReceived }: FileUploadProps) {
     }
   };
 
+  const streamJobEvents = async (jobId: string, onEvent: (event: JobEvent) => void) => {
+    const response = await fetch(`${API_URL}/jobs/${jobId}/events`, {
+      headers: {
+        Authorization: `Bearer ${user.token}`,
+      },
+    });
+    if (!response.ok || !response.body) {
+      throw new Error('Could not follow job progress');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const messages = buffer.split('\n\n');
+      buffer = messages.pop() ?? '';
+      for (const message of messages) {
+        const data = message
+          .split('\n')
+          .filter((line) => line.startsWith('data: '))
+          .map((line) => line.slice(6))
+          .join('\n');
+        if (data) onEvent(JSON.parse(data));
+      }
+    }
+  };
+
   const handleUpload = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!file) return;
 
     setUploading(true);
     setError('');
+    setProgress('Uploading...');
+    setFlashcards([]);
 
     const formData = new FormData();
     formData.append('document', file);
     formData.append('language', language);
-    formData.append('num_flashcards', numFlashcards.toString());
+    formData.append('num_flashcards', autoFlashcards ? 'auto' : numFlashcards.toString());
 
     try {
-      const response = await fetch('http://127.0.0.1:8000/upload', {
+      const response = await fetch(`${API_URL}/jobs/`, {
         method: 'POST',
         headers: {
           Authorization: `Bearer ${user.token}`,
@@ -82,18 +179,43 @@ export function FileUpload({ onFlashcardsReceived }: FileUploadProps) {
         throw new Error('Upload failed');
       }
 
-      const responseData = await response.json();
-      const generatedFlashcards: Flashcard[] = responseData.flashcards;
-      console.log(generatedFlashcards)
-      console.log(generatedFlashcards.length)
-      setFlashcards(generatedFlashcards);
-      onFlashcardsReceived(generatedFlashcards);
+      const { job_id: jobId } = await response.json();
+      // Cards by index: later events for an index revise or remove the card.
+      const cardsByIndex = new Map<number, Flashcard>();
+      let failed = false;
+
+      // Each part of the document's cards arrive as soon as they are generated, so show
+      // them before the whole document is done.
+      await streamJobEvents(jobId, (event) => {
+        if (event.stage === 'card' && event.index !== undefined) {
+          if (event.removed) {
+            cardsByIndex.delete(event.index);
+          } else if (event.card) {
+            cardsByIndex.set(event.index, event.card);
+          }
+          const generatedFlashcards = [...cardsByIndex.entries()]
+            .sort(([a], [b]) => a - b)
+            .map(([, card]) => card);
+          setFlashcards(generatedFlashcards);
+          onFlashcardsReceived(generatedFlashcards);
+        } else if (event.stage === 'done' && event.deck) {
+          onDeckSaved?.(event.deck);
+        } else if (event.stage === 'error') {
+          failed = true;
+        }
+        setProgress(describeEvent(event));
+      });
+
+      if (failed) {
+        throw new Error('Generation failed');
+      }
       toast.success('Flashcards generated successfully!');
     } catch (err) {
       setError('Failed to upload document');
       toast.error('Failed to generate flashcards');
     } finally {
       setUploading(false);
+      setProgress('');
     }
   };
 
@@ -196,6 +318,7 @@ export function FileUpload({ onFlashcardsReceived }: FileUploadProps) {
             onChange={(e) => setLanguage(e.target.value)}
             className="p-2 border border-gray-300 rounded-md focus:ring-blue-500 focus:border-blue-500"
           >
+            <option value="auto">Same as document</option>
             <option value="english">English</option>
             <option value="spanish">Spanish</option>
             <option value="french">French</option>
@@ -206,7 +329,7 @@ export function FileUpload({ onFlashcardsReceived }: FileUploadProps) {
 
         <div className="flex flex-col space-y-2">
           <label htmlFor="num-flashcards" className="text-sm font-medium text-gray-700">
-            Number of Flashcards: {numFlashcards}
+            Number of Flashcards: {autoFlashcards ? 'Auto' : numFlashcards}
           </label>
           <input
             type="range"
@@ -214,9 +337,19 @@ export function FileUpload({ onFlashcardsReceived }: FileUploadProps) {
             min="1"
             max="20"
             value={numFlashcards}
+            disabled={autoFlashcards}
             onChange={(e) => setNumFlashcards(Number(e.target.value))}
             className="w-full accent-blue-600"
           />
+          <label className="flex items-center space-x-2 text-sm text-gray-700">
+            <input
+              type="checkbox"
+              checked={autoFlashcards}
+              onChange={(e) => setAutoFlashcards(e.target.checked)}
+              className="accent-blue-600"
+            />
+            <span>Size the deck to the document</span>
+          </label>
         </div>
 
         <button
@@ -234,6 +367,10 @@ export function FileUpload({ onFlashcardsReceived }: FileUploadProps) {
           )}
         </button>
 
+        {uploading && progress && (
+          <p className="text-sm text-gray-600 text-center">{progress}</p>
+        )}
+
         {flashcards.length > 0 && (
           <button
             type="button"
@@ -1,27 +1,101 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
+import { useAuth } from '../context/AuthContext';
 import { Flashcard } from '../types';
 import { ChevronLeft, ChevronRight} from 'lucide-react';
 
 interface FlashcardListProps {
   flashcards: Flashcard[];
+  deckId?: string | null;
 }
 
-export function FlashcardList({ flashcards }: FlashcardListProps) {
+interface CardPage {
+  cards: Flashcard[];
+  next: number | null;
+  total?: number;
+}
+
+const API_URL = 'http://127.0.0.1:8000';
+const PAGE_SIZE = 50;
+// Fetch the next page when this many loaded cards are left to study.
+const PREFETCH_MARGIN = 5;
+
+export function FlashcardList({ flashcards, deckId }: FlashcardListProps) {
   const [currentIndex, setCurrentIndex] = useState(0);
   const [isFlipped, setIsFlipped] = useState(false);
   const [mastered, setMastered] = useState<Set<number>>(new Set());
+  const [cards, setCards] = useState<Flashcard[]>(flashcards);
+  const [total, setTotal] = useState(flashcards.length);
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [loading, setLoading] = useState(false);
+  const [difficulty, setDifficulty] = useState('');
+  const { user } = useAuth();
+
+  // Saved decks are read from the card store a page at a time instead of all at once.
+  const loadPage = useCallback(async (after: number) => {
+    if (!deckId) return;
+    setLoading(true);
+    try {
+      const params = new URLSearchParams({ deck: deckId, after: after.toString(), limit: PAGE_SIZE.toString() });
+      if (difficulty) params.set('difficulty', difficulty);
+      const response = await fetch(`${API_URL}/cards?${params}`, {
+        headers: {
+          Authorization: `Bearer ${user.token}`,
+        },
+      });
+      if (!response.ok) {
+        throw new Error('Could not load flashcards');
+      }
+      const page: CardPage = await response.json();
+      setCards((prev) => (after === 0 ? page.cards : [...prev, ...page.cards]));
+      setNextCursor(page.next);
+      if (page.total !== undefined) setTotal(page.total);
+    } catch (err) {
+      console.error(err);
+      setNextCursor(null);
+    } finally {
+      setLoading(false);
+    }
+  }, [deckId, difficulty, user.token]);
+
+  useEffect(() => {
+    if (!deckId) {
+      setCards(flashcards);
+      setTotal(flashcards.length);
+      setNextCursor(null);
+    }
+  }, [deckId, flashcards]);
+
+  useEffect(() => {
+    setCurrentIndex(0);
+    setIsFlipped(false);
+    setMastered(new Set());
+    loadPage(0);
+  }, [loadPage]);
+
+  useEffect(() => {
+    if (nextCursor !== null && !loading && currentIndex >= cards.length - PREFETCH_MARGIN) {
+      loadPage(nextCursor);
+    }
+  }, [currentIndex, cards.length, nextCursor, loading, loadPage]);
 
-  const currentCard = flashcards[currentIndex];
-  const progress = ((currentIndex + 1) / flashcards.length) * 100;
+  const currentCard = cards[currentIndex];
+  const progress = total > 0 ? ((currentIndex + 1) / total) * 100 : 0;
 
   const handleNext = () => {
     setIsFlipped(false);
-    setCurrentIndex((prev) => (prev + 1) % flashcards.length);
+    setCurrentIndex((prev) => {
+      if (prev + 1 < cards.length) return prev + 1;
+      // Wrap around only once every page is loaded; otherwise wait for the next page.
+      return nextCursor === null ? 0 : prev;
+    });
   };
 
   const handlePrevious = () => {
     setIsFlipped(false);
-    setCurrentIndex((prev) => (prev - 1 + flashcards.length) % flashcards.length);
+    setCurrentIndex((prev) => {
+      if (prev > 0) return prev - 1;
+      return nextCursor === null ? Math.max(cards.length - 1, 0) : 0;
+    });
   };
 
   const toggleMastered = () => {
@@ -36,10 +110,32 @@ export function FlashcardList({ flashcards }: FlashcardListProps) {
     });
   };
 
+  if (!currentCard) {
+    return (
+      <div className="max-w-4xl mx-auto p-6 text-center text-gray-600">
+        {loading ? 'Loading flashcards...' : 'No flashcards match this filter.'}
+      </div>
+    );
+  }
+
   return (
     <div className="max-w-4xl mx-auto p-6">
       <div className="mb-6">
-        <h2 className="text-2xl font-bold text-gray-900">Flashcards</h2>
+        <div className="flex items-center justify-between">
+          <h2 className="text-2xl font-bold text-gray-900">Flashcards</h2>
+          {deckId && (
+            <select
+              value={difficulty}
+              onChange={(e) => setDifficulty(e.target.value)}
+              className="px-3 py-1 text-sm border border-gray-300 rounded-md"
+            >
+              <option value="">All difficulties</option>
+              <option value="easy">Easy</option>
+              <option value="medium">Medium</option>
+              <option value="hard">Hard</option>
+            </select>
+          )}
+        </div>
         <div className="mt-2 flex items-center gap-4">
           <div className="flex-1">
             <div className="h-2 bg-gray-200 rounded-full">
@@ -50,7 +146,7 @@ export function FlashcardList({ flashcards }: FlashcardListProps) {
             </div>
           </div>
           <span className="text-sm text-gray-600">
-            {currentIndex + 1} / {flashcards.length}
+            {currentIndex + 1} / {total}
           </span>
         </div>
       </div>
@@ -126,7 +222,7 @@ export function FlashcardList({ flashcards }: FlashcardListProps) {
       <div className="mt-6">
         <div className="flex items-center justify-between text-sm text-gray-600">
           <span>Mastered: {mastered.size}</span>
-          <span>Remaining: {flashcards.length - mastered.size}</span>
+          <span>Remaining: {total - mastered.size}</span>
         </div>
       </div>
     </div>